@@ -0,0 +1,32 @@
+"""DataToken command line."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import sys
+import logging
+import argparse
+
+from datatoken.cli import prefetch
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m datatoken.cli')
+    parser.add_argument('--verbose', action='store_true')
+    subparsers = parser.add_subparsers(dest='command')
+
+    prefetch_parser = subparsers.add_parser(
+        'prefetch', help='resolve the whole marketplace into the on-disk document cache')
+    prefetch.add_arguments(prefetch_parser)
+    prefetch_parser.set_defaults(func=prefetch.run)
+
+    args = parser.parse_args(argv)
+    if not getattr(args, 'func', None):
+        parser.print_help()
+        return 2
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
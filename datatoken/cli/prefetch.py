@@ -0,0 +1,48 @@
+"""Prefetch command."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import sys
+import time
+
+from datatoken.config import Config
+from datatoken.service.prefetch import PrefetchService
+
+
+def add_arguments(parser):
+    """Declare the prefetch arguments."""
+    parser.add_argument('--config', type=str, default=None,
+                        help='config file, CONFIG_FILE or ./config.ini if not set')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='parallel resolves, the storage backend concurrency by default')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='maximum resolves per second, unlimited by default')
+    parser.add_argument('--quiet', action='store_true',
+                        help='only print the final report')
+
+
+def run(args):
+    """
+    Fill the on-disk document cache of this node before it takes traffic,
+    the in-memory caches of this process are lost when it exits.
+    """
+    config = Config(filename=args.config)
+    prefetch_service = PrefetchService(config)
+
+    def _progress(kind, done, total, failed):
+        sys.stdout.write(f'\rprefetch {kind}: {done}/{total}, {failed} failed')
+        if done == total:
+            sys.stdout.write('\n')
+        sys.stdout.flush()
+
+    start = time.monotonic()
+    report = prefetch_service.prefetch(
+        max_workers=args.workers, rate=args.rate,
+        progress=None if args.quiet else _progress)
+
+    print(f'prefetched {report["dt"]["prefetched"]} dts and '
+          f'{report["op"]["prefetched"]} op templates in {time.monotonic() - start:.1f}s')
+    print(f'failed: {report["dt"]["failed"]} dts, {report["op"]["failed"]} op templates')
+    print(f'cache: {report["cache"]}')
+
+    return 1 if report['dt']['failed'] or report['op']['failed'] else 0
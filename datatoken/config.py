@@ -8,12 +8,22 @@ from os import getenv
 from pathlib import Path
 from configparser import ConfigParser
 from datatoken.web3.web3_provider import Web3Provider
+from datatoken.store.ipfs_provider import DEFAULT_POOL_SIZE
+from datatoken.store.storage_backend import BACKEND_IPFS
+from datatoken.store.local_blockstore import DEFAULT_STORAGE_PATH
+from datatoken.store.doc_cache import DEFAULT_CACHE_PATH, DEFAULT_CACHE_SIZE, DEFAULT_CACHE_ITEMS
 
 NAME_ARTIFACTS_PATH = 'artifacts_path'
 NAME_ADDRESS_FILE = 'address_file'
 NAME_NETWORK_URL = 'network_url'
 NAME_NETWORK = 'network_name'
 NAME_IPFS_ENDPOINT = 'ipfs_endpoint'
+NAME_IPFS_POOL_SIZE = 'ipfs_pool_size'
+NAME_STORAGE_BACKEND = 'storage_backend'
+NAME_STORAGE_PATH = 'storage_path'
+NAME_CACHE_PATH = 'cache_path'
+NAME_CACHE_SIZE = 'cache_size'
+NAME_CACHE_ITEMS = 'cache_items'
 
 class Config(ConfigParser):
     def __init__(self, filename=None, options_dict=None):
@@ -54,9 +64,47 @@ class Config(ConfigParser):
 
     @property
     def ipfs_endpoint(self):
-        """get the name of the network."""
+        """get the ipfs api endpoint."""
         return self.get(self._keeper_section, NAME_IPFS_ENDPOINT)
 
+    @property
+    def ipfs_pool_size(self):
+        """get the maximum number of pooled ipfs clients."""
+        return self.getint(
+            self._keeper_section, NAME_IPFS_POOL_SIZE, fallback=DEFAULT_POOL_SIZE)
+
+    @property
+    def storage_backend(self):
+        """get the storage backend name, ipfs or local."""
+        return self.get(
+            self._keeper_section, NAME_STORAGE_BACKEND, fallback=BACKEND_IPFS)
+
+    @property
+    def storage_path(self):
+        """get the root directory of the local blockstore."""
+        _path_string = self.get(
+            self._keeper_section, NAME_STORAGE_PATH, fallback=DEFAULT_STORAGE_PATH)
+        return Path(_path_string).expanduser().resolve()
+
+    @property
+    def cache_path(self):
+        """get the directory of the document cache."""
+        _path_string = self.get(
+            self._keeper_section, NAME_CACHE_PATH, fallback=DEFAULT_CACHE_PATH)
+        return Path(_path_string).expanduser().resolve()
+
+    @property
+    def cache_size(self):
+        """get the byte budget of the on-disk document cache."""
+        return self.getint(
+            self._keeper_section, NAME_CACHE_SIZE, fallback=DEFAULT_CACHE_SIZE)
+
+    @property
+    def cache_items(self):
+        """get the item budget of the in-memory document cache."""
+        return self.getint(
+            self._keeper_section, NAME_CACHE_ITEMS, fallback=DEFAULT_CACHE_ITEMS)
+
     @property
     def artifacts_path(self):
         """get the contracts artifact file path."""
@@ -2,17 +2,109 @@
 #  Modified from common-utils-py library.
 #  Copyright 2018 Ocean Protocol Foundation
 
+import sys
 import copy
 import json
 
 from datatoken.core.dt_helper import PREFIX
+from datatoken.core.merkle import hash_leaf, merkle_root, merkle_path, verify_path
 from datatoken.core.metadata import Metadata
 from datatoken.core.service import Service
-from datatoken.core.utils import get_timestamp, calc_checksum
+from datatoken.core.schema import Field, Any, Str, List, Dict, compile_schema, format_errors
+from datatoken.core.utils import get_timestamp, calc_checksum, CHECKSUM_LEGACY, CHECKSUM_MERKLE
+
+DDO_SCHEMA = Dict({
+    'dt': Field(Str(prefix=PREFIX)),
+    'creator': Field(Any(), nullable=True),
+    'metadata': Field(Dict()),
+    'child_dts': Field(List(Str()), nullable=True),
+    'services': Field(List(Dict())),
+    'proof': Field(Dict({
+        'checksum': Field(Str()),
+        'leaves': Field(List(Str()), required=False)
+    }))
+})
+
+# merkle leaves: header, metadata, then one per service
+SERVICE_LEAVES_OFFSET = 2
+
+_validate_ddo = compile_schema(DDO_SCHEMA)
+
+
+def _intern_dts(dts):
+    """Share one string per dt, the same dts are repeated across documents."""
+    if not dts:
+        return dts
+    return [sys.intern(dt) for dt in dts]
+
+
+def _is_ddo_dict(values):
+    """Hand-written check of DDO_SCHEMA, run on every load."""
+    if not isinstance(values, dict) or 'creator' not in values or 'child_dts' not in values:
+        return False
+
+    dt = values.get('dt')
+    if not isinstance(dt, str) or not dt.startswith(PREFIX):
+        return False
+    if not isinstance(values.get('metadata'), dict):
+        return False
+
+    child_dts = values['child_dts']
+    if child_dts is not None and (not isinstance(child_dts, list) or not all(
+            isinstance(child_dt, str) for child_dt in child_dts)):
+        return False
+
+    services = values.get('services')
+    if not isinstance(services, list) or not all(isinstance(service, dict) for service in services):
+        return False
+
+    proof = values.get('proof')
+    if not isinstance(proof, dict) or not isinstance(proof.get('checksum'), str):
+        return False
+
+    leaves = proof.get('leaves', [])
+    return isinstance(leaves, list) and all(isinstance(leaf, str) for leaf in leaves)
+
+
+def _check_ddo(value_dict):
+    if not _is_ddo_dict(value_dict):
+        raise AssertionError(f'ddo seems invalid: {format_errors(_validate_ddo(value_dict))}')
+
+
+def _check_proof(proof, checksum, leaves):
+    if not isinstance(proof, dict):
+        raise AssertionError(f'wrong template checksum')
+
+    if proof.get('checksum') == None or proof['checksum'] != checksum:
+        raise AssertionError(f'wrong template checksum')
+
+    if proof.get('leaves') != leaves:
+        raise AssertionError(f'wrong merkle leaves')
+
+
+def verify_service_proof(service_dict, service_proof, root):
+    """
+    Check a single service against the merkle root of its DDO, without the
+    rest of the document.
+
+    :param service_dict: service dict, as in the DDO
+    :param service_proof: dict, from DDO.get_service_proof
+    :param root: proof checksum of the DDO, i.e., its on-chain evidence
+    :return: bool
+    """
+    if not isinstance(service_proof, dict):
+        return False
+
+    leaf = hash_leaf(Service.normalize_dict(service_dict))
+    return leaf == service_proof.get('leaf') and verify_path(
+        leaf, service_proof.get('path') or [], root)
 
 
 class DDO:
     """DDO class to create, import and export DDO objects."""
+    __slots__ = ('_dt', '_creator', '_metadata', '_services', '_proof',
+                 '_asset_type', '_child_dts', '_service_index', '_workflow_map',
+                 '_constraints', '_read_only')
 
     def __init__(self, json_text=None, json_filename=None, dictionary=None):
         self._dt = None
@@ -24,6 +116,15 @@ class DDO:
         self._asset_type = None
         self._child_dts = None
 
+        # service index -> Service, kept along with the service list
+        self._service_index = {}
+        # child dt -> {service index: (sid, constraint)}, built on first use
+        self._workflow_map = None
+        # service index -> constraint required by the service, built on first use
+        self._constraints = None
+        # set once the DDO is shared through the document cache
+        self._read_only = False
+
         if not json_text and json_filename:
             with open(json_filename, 'r') as file_handle:
                 json_text = file_handle.read()
@@ -80,19 +181,128 @@ class DDO:
         :param index: Service id, str
         :return: Service
         """
-        for service in self._services:
+        return self._service_index.get(index)
+
+    def get_workflow(self, child_dt):
+        """
+        Get how each service of this cdt fulfills a given child dt.
+
+        :param child_dt: child asset identifier, str
+        :return: dict, service index -> (child service index, constraint)
+        """
+        if self._workflow_map is None:
+            self._build_workflow_map()
+
+        return self._workflow_map.get(child_dt, {})
+
+    def get_fulfills(self, child_dt):
+        """
+        Get how every service of this cdt fulfills a given child dt.
+
+        :param child_dt: child asset identifier, str
+        :return: list of (child service index, constraint), None if a service
+        does not fulfill the child dt
+        """
+        fulfills = self.get_workflow(child_dt)
+        if len(fulfills) != len(self.services):
+            return None
+
+        return list(fulfills.values())
+
+    def get_service_constraint(self, index):
+        """
+        Get the constraint a service requires from its users, i.e., the leaf
+        constraint, or the constraint for each child dt of a cdt service.
+
+        :param index: Service id, str
+        :return: dict or None
+        """
+        if self._constraints is None:
+            self._build_workflow_map()
+
+        return self._constraints.get(index)
+
+    def get_service_proof(self, index):
+        """
+        Get the merkle inclusion proof of a service, so it can be verified
+        alone against the DDO root, see verify_service_proof.
+
+        :param index: Service id, str
+        :return: dict with leaf and path, or None if the proof is not merkle
+        """
+        leaves = self._proof.get('leaves') if self._proof else None
+        if not leaves:
+            return None
+
+        for position, service in enumerate(self._services):
             if service.index == index:
-                return service
+                position += SERVICE_LEAVES_OFFSET
+                return {'leaf': leaves[position], 'path': merkle_path(leaves, position)}
 
         return None
 
+    def _build_workflow_map(self):
+        workflow_map = {}
+        constraints = {}
+
+        for service in self._services:
+            descriptor = service.descriptor
+            workflow = descriptor.get('workflow')
+            if workflow is None:
+                constraints[service.index] = descriptor.get('constraint')
+                continue
+
+            sub_constraint = {}
+            for child_dt, fulfilled in workflow.items():
+                if not fulfilled:
+                    continue
+                sub_constraint[child_dt] = fulfilled.get('constraint')
+                workflow_map.setdefault(child_dt, {})[service.index] = (
+                    fulfilled.get('service'), fulfilled.get('constraint'))
+            constraints[service.index] = sub_constraint
+
+        self._workflow_map = workflow_map
+        self._constraints = constraints
+
+    def _set_services(self, services):
+        self._services = services
+        self._service_index = {}
+        for service in services:
+            self._service_index.setdefault(service.index, service)
+        self._workflow_map = None
+        self._constraints = None
+
+    @property
+    def read_only(self):
+        """Check whether the DDO is shared, and so must not be modified."""
+        return self._read_only
+
+    def freeze(self):
+        """Make the DDO read-only, e.g., once it is shared through the document cache."""
+        self._read_only = True
+
+    def _check_writable(self):
+        if self._read_only:
+            raise AssertionError(f'the DDO is read-only, please modify a copy instead.')
+
+    def copy(self):
+        """
+        Return a writable deep copy of the DDO.
+
+        :return: DDO
+        """
+        ddo = DDO()
+        ddo._from_trusted_dict(copy.deepcopy(self.to_dict()))
+        return ddo
+
     def assign_dt(self, dt: str):
         """
         Assign dt to the DDO.
         """
+        self._check_writable()
         assert dt.startswith(PREFIX), \
             f'"dt" seems invalid, must start with {PREFIX} prefix.'
-        self._dt = dt
+        self._dt = sys.intern(dt)
         return dt
 
     def add_creator(self, creator_address: str):
@@ -101,7 +311,9 @@ class DDO:
 
         :param creator_address: str
         """
-        self._creator = creator_address
+        self._check_writable()
+        self._creator = sys.intern(creator_address) if isinstance(
+            creator_address, str) else creator_address
 
     def add_metadata(self, value_dict, child_dts=None):
         """
@@ -109,17 +321,18 @@ class DDO:
 
         :param values: dict
         """
+        self._check_writable()
         values = copy.deepcopy(value_dict) if value_dict else {}
         assert Metadata.validate(values), \
-            f'values {values} seems invalid.'
+            f'values {values} seems invalid: {format_errors(Metadata.errors(values))}'
 
         asset_type = values['main']['type']
         if asset_type == 'Algorithm' and not child_dts:
             raise AssertionError('Algorithm must be composable DT.')
 
         self._metadata = values
-        self._asset_type = asset_type
-        self._child_dts = child_dts
+        self._asset_type = sys.intern(asset_type)
+        self._child_dts = _intern_dts(child_dts)
 
     def add_service(self, value_dict):
         """
@@ -127,6 +340,7 @@ class DDO:
 
         :param value_dict: Python dict with setvice index, endpoint, descriptor, attributes.
         """
+        self._check_writable()
         assert self._asset_type, \
             f'asset type seems unknown, please add metadata first.'
         if self._asset_type == 'Algorithm':
@@ -143,36 +357,70 @@ class DDO:
 
         service = Service(_index, _endpoint, _descriptor, _attributes)
         if not service.validate(self._asset_type, self._child_dts):
-            raise AssertionError(f'values {values} seems invalid.')
+            errors = service.errors(self._asset_type, self._child_dts)
+            raise AssertionError(f'values {values} seems invalid: {format_errors(errors)}')
 
         self._services.append(service)
+        self._service_index[service.index] = service
+        self._workflow_map = None
+        self._constraints = None
 
         return
 
-    def create_proof(self):
-        """create the proof for this template."""
-        data = {
-            'dt': self._dt,
-            'creator': self._creator,
-            'metadata': self._metadata,
-            'child_dts': self._child_dts
-        }
-
-        if self._services:
-            values = []
-            for service in self._services:
-                values.append(service.to_dict())
-            data['services'] = values
+    def create_proof(self, scheme=CHECKSUM_LEGACY):
+        """
+        create the proof for this template.
 
-        checksum = calc_checksum(data)
+        :param scheme: checksum scheme, legacy, canonical or merkle
+        """
+        self._check_writable()
+        checksum, leaves = self._calc_proof(
+            [service.to_dict() for service in self._services], scheme)
 
         self._proof = {
             'created': get_timestamp(),
             'checksum': checksum
         }
+        if scheme != CHECKSUM_LEGACY:
+            self._proof['scheme'] = scheme
+        if leaves:
+            self._proof['leaves'] = leaves
 
         return checksum
 
+    def _calc_proof(self, services, scheme):
+        """
+        Calculate the proof checksum given the service dicts.
+
+        :return: checksum, and the merkle leaves or None
+        """
+        if scheme != CHECKSUM_MERKLE:
+            return calc_checksum(self._proof_values(services), scheme), None
+
+        leaves = self._header_leaves() + [hash_leaf(service) for service in services]
+        return merkle_root(leaves), leaves
+
+    def _header_leaves(self):
+        header = {
+            'dt': self._dt,
+            'creator': self._creator,
+            'child_dts': self._child_dts
+        }
+        return [hash_leaf(header), hash_leaf(self._metadata)]
+
+    def _proof_values(self, services):
+        """The DDO values covered by the proof, given the service dicts."""
+        data = {
+            'dt': self._dt,
+            'creator': self._creator,
+            'metadata': self._metadata,
+            'child_dts': self._child_dts
+        }
+        if services:
+            data['services'] = services
+
+        return data
+
     def to_dict(self):
         """
         Return the DDO as a JSON dict.
@@ -194,8 +442,19 @@ class DDO:
 
         return data
 
-    def from_dict(self, value_dict):
-        """Import a JSON dict into this DDO."""
+    def from_dict(self, value_dict, trusted=False):
+        """
+        Import a JSON dict into this DDO.
+
+        :param value_dict: DDO dict
+        :param trusted: the dict has been verified before, so it is neither
+        copied nor validated again and must not be modified afterwards
+        """
+        self._check_writable()
+        if trusted:
+            return self._from_trusted_dict(value_dict)
+
+        _check_ddo(value_dict)
         values = copy.deepcopy(value_dict)
 
         dt = values.pop('dt')
@@ -208,14 +467,184 @@ class DDO:
         self.add_creator(creator)
         self.add_metadata(metadata, child_dts)
 
-        self._services = []
+        self._set_services([])
         for value in values.pop('services'):
             self.add_service(value)
 
-        checksum = self.create_proof()
-
-        if not isinstance(proof, dict) or proof.get(
-                'checksum') == None or proof['checksum'] != checksum:
+        if not isinstance(proof, dict):
             raise AssertionError(f'wrong template checksum')
 
+        checksum = self.create_proof(proof.get('scheme', CHECKSUM_LEGACY))
+        _check_proof(proof, checksum, self._proof.get('leaves'))
+
         self._proof = proof
+
+    def _from_trusted_dict(self, value_dict):
+        """Share the values of a verified dict, skipping copies and checks."""
+        metadata = value_dict['metadata']
+
+        self._dt = sys.intern(value_dict['dt'])
+        creator = value_dict['creator']
+        self._creator = sys.intern(creator) if isinstance(creator, str) else creator
+        self._metadata = metadata
+        self._asset_type = sys.intern(metadata['main']['type'])
+        self._child_dts = _intern_dts(value_dict['child_dts'])
+        self._set_services([Service.from_trusted_dict(
+            value) for value in value_dict.get('services') or []])
+        self._proof = value_dict['proof']
+
+
+class LazyDDO(DDO):
+    """
+    DDO that only parses its header, i.e., dt, creator, metadata, child dts
+    and proof. The proof is still checked over the raw services, which are
+    built and validated on first access. With a merkle proof, only the header
+    leaves are checked upfront, each service is checked against its own leaf
+    when the services are built.
+    """
+    __slots__ = ('_raw_services',)
+
+    def __init__(self, json_text=None, json_filename=None, dictionary=None):
+        self._raw_services = None
+        super().__init__(json_text, json_filename, dictionary)
+
+    @property
+    def services(self):
+        """Get the list of services."""
+        self.load_services()
+        return self._services
+
+    @property
+    def services_loaded(self):
+        """Check whether the services have been built."""
+        return self._raw_services is None
+
+    def _merkle_leaves(self):
+        proof = self._proof
+        if proof and proof.get('scheme') == CHECKSUM_MERKLE:
+            return proof.get('leaves')
+        return None
+
+    def load_services(self):
+        """
+        Build and validate the raw services, once.
+
+        :return: self
+        """
+        raw_services = self._raw_services
+        if raw_services is None:
+            return self
+
+        leaves = self._merkle_leaves()
+        if leaves:
+            for position, value in enumerate(raw_services, SERVICE_LEAVES_OFFSET):
+                if hash_leaf(Service.normalize_dict(value)) != leaves[position]:
+                    raise AssertionError(f'wrong service proof')
+
+        # build aside, so concurrent readers never see half the services
+        scratch = DDO()
+        scratch._asset_type = self._asset_type
+        scratch._child_dts = self._child_dts
+        for value in raw_services:
+            scratch.add_service(value)
+
+        self._set_services(scratch._services)
+        self._raw_services = None
+
+        return self
+
+    def get_service_by_index(self, index):
+        self.load_services()
+        return super().get_service_by_index(index)
+
+    def get_workflow(self, child_dt):
+        self.load_services()
+        return super().get_workflow(child_dt)
+
+    def get_service_constraint(self, index):
+        self.load_services()
+        return super().get_service_constraint(index)
+
+    def get_fulfills(self, child_dt):
+        """
+        With a merkle proof and the services not built yet, only the workflow
+        entry of the child dt is read from each raw service, and the service
+        is checked alone against the root through its inclusion path.
+        """
+        raw_services = self._raw_services
+        leaves = self._merkle_leaves()
+        if raw_services is None or not leaves:
+            return super().get_fulfills(child_dt)
+
+        root = self._proof['checksum']
+        fulfills = []
+        for position, value in enumerate(raw_services, SERVICE_LEAVES_OFFSET):
+            service_proof = {'leaf': leaves[position], 'path': merkle_path(leaves, position)}
+            if not isinstance(value, dict) or not verify_service_proof(value, service_proof, root):
+                raise AssertionError(f'wrong service proof')
+
+            descriptor = value.get(Service.DESCRIPTOR)
+            workflow = descriptor.get('workflow') if isinstance(descriptor, dict) else None
+            fulfilled = workflow.get(child_dt) if isinstance(workflow, dict) else None
+            if not fulfilled or not isinstance(fulfilled, dict):
+                return None
+            fulfills.append((fulfilled.get('service'), fulfilled.get('constraint')))
+
+        return fulfills
+
+    def get_service_proof(self, index):
+        self.load_services()
+        return super().get_service_proof(index)
+
+    def add_service(self, value_dict):
+        self.load_services()
+        return super().add_service(value_dict)
+
+    def create_proof(self, scheme=CHECKSUM_LEGACY):
+        self.load_services()
+        return super().create_proof(scheme)
+
+    def to_dict(self):
+        self.load_services()
+        return super().to_dict()
+
+    def from_dict(self, value_dict, trusted=False):
+        """
+        Import the header of a JSON dict into this DDO, the services are kept
+        as they are, so the dict must not be modified afterwards.
+
+        :param value_dict: DDO dict
+        :param trusted: the dict has been verified before
+        """
+        self._check_writable()
+        self._raw_services = None
+        if trusted:
+            return self._from_trusted_dict(value_dict)
+
+        _check_ddo(value_dict)
+        proof = value_dict['proof']
+        raw_services = value_dict['services']
+
+        self.assign_dt(value_dict['dt'])
+        self.add_creator(value_dict['creator'])
+        self.add_metadata(value_dict['metadata'], value_dict['child_dts'])
+        self._set_services([])
+
+        if not isinstance(proof, dict):
+            raise AssertionError(f'wrong template checksum')
+
+        scheme = proof.get('scheme', CHECKSUM_LEGACY)
+        if scheme == CHECKSUM_MERKLE:
+            # the service leaves are taken as they are until the services are built
+            leaves = proof.get('leaves') or []
+            if len(leaves) != SERVICE_LEAVES_OFFSET + len(raw_services):
+                raise AssertionError(f'wrong merkle leaves')
+            leaves = self._header_leaves() + leaves[SERVICE_LEAVES_OFFSET:]
+            _check_proof(proof, merkle_root(leaves), leaves)
+        else:
+            checksum, leaves = self._calc_proof(
+                [Service.normalize_dict(value) for value in raw_services], scheme)
+            _check_proof(proof, checksum, leaves)
+
+        self._raw_services = raw_services
+        self._proof = copy.deepcopy(proof)
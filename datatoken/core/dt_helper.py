@@ -4,12 +4,45 @@
 
 import re
 import uuid
+import functools
 from web3 import Web3
 from eth_utils import remove_0x_prefix
 from datatoken.core.utils import convert_to_string
 
 PREFIX = 'dt:ownership:'
 
+DT_PATTERN = re.compile('^dt:([a-z0-9]+):([a-zA-Z0-9-.]+)(.*)')
+HEX_PATTERN = re.compile('^[0x]?[0-9A-Za-z]+$')
+
+DT_CACHE_SIZE = 16384
+
+
+@functools.lru_cache(maxsize=DT_CACHE_SIZE)
+def _dt_to_id(dt):
+    result = DTHelper.dt_parse(dt)
+    if result and result['id'] is not None:
+        return result['id']
+    return None
+
+
+@functools.lru_cache(maxsize=DT_CACHE_SIZE)
+def _dt_str_to_id_bytes(dt):
+    if HEX_PATTERN.match(dt):
+        raise ValueError(f'{dt} must be a dt not a hex string')
+
+    dt_result = DTHelper.dt_parse(dt)
+    if not dt_result:
+        raise ValueError(f'{dt} is not a valid dt')
+    if not dt_result['id']:
+        raise ValueError(f'{dt} is not a valid Ownership dt')
+
+    dt_id = dt_result['id']
+    try:
+        return bytes.fromhex(dt_id)
+    except ValueError:
+        # 0x prefixed or odd length ids
+        return Web3.toBytes(hexstr=dt_id)
+
 
 class DTHelper:
     """Class representing an asset dt."""
@@ -31,7 +64,7 @@ class DTHelper:
     def id_to_dt(dt_id):
         """Return an Ownership dt from given a hex id."""
         if isinstance(dt_id, bytes):
-            dt_id = Web3.toHex(dt_id)
+            return f'{PREFIX}{bytes.hex(dt_id) or "0"}'
 
         # remove leading '0x' of a hex string
         if isinstance(dt_id, str):
@@ -47,10 +80,9 @@ class DTHelper:
     @staticmethod
     def dt_to_id(dt):
         """Return an id extracted from a dt string."""
-        result = DTHelper.dt_parse(dt)
-        if result and result['id'] is not None:
-            return result['id']
-        return None
+        if not isinstance(dt, str):
+            DTHelper.dt_parse(dt)
+        return _dt_to_id(dt)
 
     @staticmethod
     def dt_to_id_bytes(dt):
@@ -60,15 +92,7 @@ class DTHelper:
         So dt:ownership:<hex>, will return <hex> in byte format
         """
         if isinstance(dt, str):
-            if re.match('^[0x]?[0-9A-Za-z]+$', dt):
-                raise ValueError(f'{dt} must be a dt not a hex string')
-            else:
-                dt_result = DTHelper.dt_parse(dt)
-                if not dt_result:
-                    raise ValueError(f'{dt} is not a valid dt')
-                if not dt_result['id']:
-                    raise ValueError(f'{dt} is not a valid Ownership dt')
-                id_bytes = Web3.toBytes(hexstr=dt_result['id'])
+            id_bytes = _dt_str_to_id_bytes(dt)
         elif isinstance(dt, bytes):
             id_bytes = dt
         else:
@@ -80,9 +104,44 @@ class DTHelper:
 
     @staticmethod
     def id_bytes_to_dt(id_bytes):
+        if isinstance(id_bytes, bytes):
+            return f'{PREFIX}{bytes.hex(id_bytes) or "0"}'
+
         id = convert_to_string(id_bytes)
         return DTHelper.id_to_dt(id)
 
+    @staticmethod
+    def ids_to_dts(id_list):
+        """
+        Convert many on-chain ids, e.g., the getDTMap output or event args,
+        to dts in one pass.
+
+        :param id_list: list of 32 byte ids
+        :return: list of dts
+        """
+        return [f'{PREFIX}{bytes.hex(dt_id) or "0"}' if isinstance(dt_id, bytes)
+                else DTHelper.id_bytes_to_dt(dt_id) for dt_id in id_list]
+
+    @staticmethod
+    def dts_to_ids(dts):
+        """
+        Convert many dts to their hex ids in one pass.
+
+        :param dts: list of dts
+        :return: list of hex ids
+        """
+        return [DTHelper.dt_to_id(dt) for dt in dts]
+
+    @staticmethod
+    def dts_to_id_bytes(dts):
+        """
+        Convert many dts to their 32 byte ids in one pass.
+
+        :param dts: list of dts or id bytes
+        :return: list of bytes
+        """
+        return [dt if isinstance(dt, bytes) else DTHelper.dt_to_id_bytes(dt) for dt in dts]
+
     @staticmethod
     def dt_parse(dt):
         """
@@ -95,7 +154,7 @@ class DTHelper:
             raise TypeError(
                 f'Expecting dt of string type, got {dt} of {type(dt)} type')
 
-        match = re.match('^dt:([a-z0-9]+):([a-zA-Z0-9-.]+)(.*)', dt)
+        match = DT_PATTERN.match(dt)
         if not match:
             raise ValueError(f'dt {dt} does not seem to be valid.')
 
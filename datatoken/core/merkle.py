@@ -0,0 +1,99 @@
+"""Merkle Lib."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import hashlib
+
+from datatoken.core.utils import calc_checksum, CHECKSUM_CANONICAL
+
+# domain separation, so a leaf can never be taken for an inner node
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+LEFT = 'L'
+RIGHT = 'R'
+
+
+def hash_leaf(value):
+    """
+    Calculate the leaf hash of a json value, over its canonical checksum.
+
+    :param value: json value
+    :return: hex str
+    """
+    digest = bytes.fromhex(calc_checksum(value, CHECKSUM_CANONICAL))
+    return hashlib.sha3_256(LEAF_PREFIX + digest).hexdigest()
+
+
+def _hash_node(left, right):
+    return hashlib.sha3_256(NODE_PREFIX + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def _next_level(level):
+    # an odd node is carried up as it is, never paired with itself
+    nodes = [_hash_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+    if len(level) % 2:
+        nodes.append(level[-1])
+    return nodes
+
+
+def merkle_root(leaves):
+    """
+    Calculate the root of a list of leaf hashes.
+
+    :param leaves: list of hex str, not empty
+    :return: hex str
+    """
+    assert leaves, 'merkle tree needs at least one leaf.'
+
+    level = list(leaves)
+    while len(level) > 1:
+        level = _next_level(level)
+
+    return level[0]
+
+
+def merkle_path(leaves, position):
+    """
+    Get the inclusion path of a leaf, from the leaf up to the root.
+
+    :param leaves: list of hex str
+    :param position: position of the leaf, int
+    :return: list of [side, sibling hash], side being L or R
+    """
+    assert 0 <= position < len(leaves), f'leaf position {position} out of range.'
+
+    path = []
+    level = list(leaves)
+    while len(level) > 1:
+        sibling = position ^ 1
+        if sibling < len(level):
+            path.append([LEFT if sibling < position else RIGHT, level[sibling]])
+        level = _next_level(level)
+        position //= 2
+
+    return path
+
+
+def verify_path(leaf, path, root):
+    """
+    Check a leaf hash against a root, given its inclusion path.
+
+    :param leaf: leaf hash, hex str
+    :param path: list of [side, sibling hash]
+    :param root: hex str
+    :return: bool
+    """
+    try:
+        node = leaf
+        for side, sibling in path:
+            if side == LEFT:
+                node = _hash_node(sibling, node)
+            elif side == RIGHT:
+                node = _hash_node(node, sibling)
+            else:
+                return False
+    except (TypeError, ValueError):
+        return False
+
+    return node == root
@@ -4,6 +4,8 @@
 
 import logging
 
+from datatoken.core.schema import Field, Any, Dict, compile_schema
+
 logger = logging.getLogger(__name__)
 
 
@@ -48,3 +50,23 @@ class Metadata(object):
                     return False
 
         return True
+
+    @staticmethod
+    def errors(metadata):
+        """
+        Get the schema errors of the metadata composition, the same checks as
+        validate reported with their paths.
+
+        :param metadata: dict
+        :return: list of SchemaError
+        """
+        return _validate_metadata(metadata)
+
+
+METADATA_SCHEMA = Dict({
+    section_key: Field(Dict({
+        subkey: Field(Any()) for subkey in Metadata.MAIN_SECTIONS[section_key].REQUIRED_VALUES_KEYS
+    }), truthy=True) for section_key in Metadata.REQUIRED_SECTIONS
+})
+
+_validate_metadata = compile_schema(METADATA_SCHEMA)
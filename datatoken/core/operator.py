@@ -2,22 +2,70 @@
 # Copyright 2021 The DataToken Authors
 # SPDX-License-Identifier: LGPL-2.1-only
 
+import sys
 import copy
 from datatoken.core.metadata import Metadata
 from datatoken.core.dt_helper import PREFIX
-from datatoken.core.utils import get_timestamp, calc_checksum
+from datatoken.core.schema import Field, Any, Str, Dict, compile_schema, format_errors
+from datatoken.core.utils import get_timestamp, calc_checksum, calc_code_checksum, CHECKSUM_LEGACY
+
+OP_TEMPLATE_SCHEMA = Dict({
+    'tid': Field(Str(prefix=PREFIX)),
+    'creator': Field(Any(), nullable=True),
+    'metadata': Field(Dict()),
+    'operation': Field(Str(), required=False, nullable=True),
+    'code': Field(Dict({
+        'path': Field(Str(), truthy=True),
+        'checksum': Field(Str(), truthy=True)
+    }), required=False, nullable=True),
+    'params': Field(Any(), nullable=True),
+    'proof': Field(Dict({'checksum': Field(Str())}))
+}, any_of=('operation', 'code'))
+
+_validate_op_template = compile_schema(OP_TEMPLATE_SCHEMA)
+
+
+def _is_op_template_dict(values):
+    """Hand-written check of OP_TEMPLATE_SCHEMA, run on every load."""
+    if not isinstance(values, dict) or 'creator' not in values or 'params' not in values:
+        return False
+
+    tid = values.get('tid')
+    if not isinstance(tid, str) or not tid.startswith(PREFIX):
+        return False
+    if not isinstance(values.get('metadata'), dict):
+        return False
+
+    if 'operation' not in values and 'code' not in values:
+        return False
+    operation = values.get('operation')
+    if operation is not None and not isinstance(operation, str):
+        return False
+    code = values.get('code')
+    if code is not None and (not isinstance(code, dict) or not all(
+            isinstance(code.get(key), str) and code[key] for key in ('path', 'checksum'))):
+        return False
+
+    proof = values.get('proof')
+    return isinstance(proof, dict) and isinstance(proof.get('checksum'), str)
 
 
 class OpTemplate:
     """OpTemplate class for describing trusted operations."""
+    __slots__ = ('_tid', '_creator', '_metadata', '_operation', '_code',
+                 '_code_loader', '_params', '_proof', '_read_only')
 
-    def __init__(self, dictionary=None):
+    def __init__(self, dictionary=None, code_loader=None):
         self._tid = None
         self._creator = None
         self._metadata = None
         self._operation = None
+        self._code = None
+        self._code_loader = code_loader
         self._params = None
         self._proof = None
+        # set once the template is shared through the document cache
+        self._read_only = False
 
         if dictionary:
             self.from_dict(dictionary)
@@ -39,9 +87,16 @@ class OpTemplate:
 
     @property
     def operation(self):
-        """Get the op code."""
+        """Get the op code, loaded on first access when it is stored separately."""
+        if self._operation is None and self._code:
+            self._operation = self._load_code()
         return self._operation
 
+    @property
+    def code(self):
+        """Get the link to the separately stored op code, or None."""
+        return self._code
+
     @property
     def params(self):
         """Get the op params."""
@@ -52,15 +107,40 @@ class OpTemplate:
         """Get the static proof, or None."""
         return self._proof
 
+    @property
+    def read_only(self):
+        """Check whether the template is shared, and so must not be modified."""
+        return self._read_only
+
+    def freeze(self):
+        """Make the template read-only, e.g., once it is shared through the document cache."""
+        self._read_only = True
+
+    def _check_writable(self):
+        if self._read_only:
+            raise AssertionError(f'the template is read-only, please modify a copy instead.')
+
+    def copy(self):
+        """
+        Return a writable deep copy of the template.
+
+        :return: OpTemplate
+        """
+        op = OpTemplate(code_loader=self._code_loader)
+        op._from_trusted_dict(copy.deepcopy(self.to_dict()))
+        op._operation = self._operation
+        return op
+
     def assign_tid(self, tid: str):
         """
         Add tid to this template.
 
         :param values: dict
         """
+        self._check_writable()
         assert tid.startswith(PREFIX), \
             f'"tid" seems invalid, must start with {PREFIX} prefix.'
-        self._tid = tid
+        self._tid = sys.intern(tid)
 
     def add_creator(self, creator_address: str):
         """
@@ -68,7 +148,9 @@ class OpTemplate:
 
         :param creator_address: str
         """
-        self._creator = creator_address
+        self._check_writable()
+        self._creator = sys.intern(creator_address) if isinstance(
+            creator_address, str) else creator_address
 
     def add_metadata(self, values: dict):
         """
@@ -76,9 +158,10 @@ class OpTemplate:
 
         :param values: dict
         """
+        self._check_writable()
         values = copy.deepcopy(values) if values else {}
         assert Metadata.validate(values), \
-            f'values {values} seems invalid.'
+            f'values {values} seems invalid: {format_errors(Metadata.errors(values))}'
 
         asset_type = values['main']['type']
         if asset_type != 'Operation':
@@ -93,52 +176,117 @@ class OpTemplate:
         :param operation: trusted code, str
         :param params: required parameters for the code, dict
         """
+        self._check_writable()
         if not self._metadata:
             raise AssertionError(f'please add metadata first')
 
         self._operation = operation
         self._params = params
 
-    def create_proof(self):
-        """create the proof for this template."""
+    def link_code(self, code_path):
+        """
+        Store the op code separately, the template then only keeps its path
+        and checksum, and the proof covers the code through that checksum.
+
+        :param code_path: storage path of the op code, e.g., ipfs cid
+        """
+        self._check_writable()
+        if self._operation is None:
+            raise AssertionError(f'please add template first')
+
+        self._code = {
+            'path': code_path,
+            'checksum': calc_code_checksum(self._operation)
+        }
+
+    def _load_code(self):
+        """Load the separately stored op code and check it against the link."""
+        code_path = self._code['path']
+        if not self._code_loader:
+            raise AssertionError(
+                f'op code of {self._tid} is stored separately at {code_path}, '
+                f'please give a code loader to the template.')
+
+        try:
+            operation = self._code_loader(code_path)
+        except Exception as e:
+            raise AssertionError(
+                f'failed to load the op code of {self._tid} from {code_path}: {e}') from e
+
+        if calc_code_checksum(operation) != self._code['checksum']:
+            raise AssertionError(f'wrong op code checksum')
+
+        return operation
+
+    def _descriptor(self):
+        """The template values covered by the proof."""
         data = {
             'tid': self._tid,
             'creator': self._creator,
             'metadata': self._metadata,
-            'operation': self._operation,
             'params': self._params
         }
+        if self._code:
+            data['code'] = self._code
+        else:
+            data['operation'] = self._operation
 
-        checksum = calc_checksum(data)
+        return data
+
+    def create_proof(self, scheme=CHECKSUM_LEGACY):
+        """
+        create the proof for this template.
+
+        :param scheme: checksum scheme, legacy or canonical
+        """
+        self._check_writable()
+        data = self._descriptor()
+
+        checksum = calc_checksum(data, scheme)
 
         self._proof = {
             'created': get_timestamp(),
             'checksum': checksum
         }
+        if scheme != CHECKSUM_LEGACY:
+            self._proof['scheme'] = scheme
 
         return checksum
 
     def to_dict(self):
         """Return the template as a JSON dict."""
-        data = {
-            'tid': self._tid,
-            'creator': self._creator,
-            'metadata': self._metadata,
-            'operation': self._operation,
-            'params': self._params,
-            'proof': self._proof
-        }
+        data = self._descriptor()
+        data['proof'] = self._proof
 
         return data
 
-    def from_dict(self, value_dict):
-        """Import a JSON dict into this template."""
+    def from_dict(self, value_dict, code_loader=None, trusted=False):
+        """
+        Import a JSON dict into this template.
+
+        :param value_dict: template dict, with inline operation or a code link
+        :param code_loader: function loading the op code from its path
+        :param trusted: the dict has been verified before, so it is neither
+        copied nor validated again and must not be modified afterwards
+        """
+        self._check_writable()
+        if code_loader:
+            self._code_loader = code_loader
+
+        if trusted:
+            return self._from_trusted_dict(value_dict)
+
+        if not _is_op_template_dict(value_dict):
+            errors = _validate_op_template(value_dict)
+            raise AssertionError(f'template seems invalid: {format_errors(errors)}')
+
         values = copy.deepcopy(value_dict)
 
         tid = values.pop('tid')
         creator = values.pop('creator')
         metadata = values.pop('metadata')
-        operation = values.pop('operation')
+        operation = values.pop('operation', None)
+        code = values.pop('code', None)
         params = values.pop('params')
         proof = values.pop('proof')
 
@@ -147,10 +295,26 @@ class OpTemplate:
         self.add_metadata(metadata)
         self.add_template(operation, params)
 
-        checksum = self.create_proof()
+        if code is not None:
+            self._code = code
 
-        if not isinstance(proof, dict) or proof.get(
-                'checksum') == None or proof['checksum'] != checksum:
+        if not isinstance(proof, dict):
+            raise AssertionError(f'wrong template checksum')
+
+        checksum = self.create_proof(proof.get('scheme', CHECKSUM_LEGACY))
+
+        if proof.get('checksum') == None or proof['checksum'] != checksum:
             raise AssertionError(f'wrong template checksum')
 
         self._proof = proof
+
+    def _from_trusted_dict(self, value_dict):
+        """Share the values of a verified dict, skipping copies and checks."""
+        self._tid = sys.intern(value_dict['tid'])
+        creator = value_dict['creator']
+        self._creator = sys.intern(creator) if isinstance(creator, str) else creator
+        self._metadata = value_dict['metadata']
+        self._operation = value_dict.get('operation')
+        self._code = value_dict.get('code')
+        self._params = value_dict['params']
+        self._proof = value_dict['proof']
@@ -0,0 +1,171 @@
+"""Schema Lib."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+from collections import namedtuple
+
+SchemaError = namedtuple('SchemaError', ('path', 'message'))
+
+
+class Field:
+    """A dict entry of a schema."""
+
+    def __init__(self, schema=None, required=True, nullable=False, truthy=False, when=None):
+        """
+        Declare a dict entry.
+
+        :param schema: schema of the value, any value if None
+        :param required: the key must be present
+        :param nullable: the value may be None
+        :param truthy: the value must not be empty
+        :param when: callable(ctx), the entry is only checked when it returns True
+        """
+        self.schema = schema
+        self.required = required
+        self.nullable = nullable
+        self.truthy = truthy
+        self.when = when
+
+
+class Schema:
+    """Base class of the schema nodes, compiled once into a check function."""
+
+    def compile(self):
+        """
+        Build the check function of this node, collecting every error.
+
+        :return: callable(value, ctx, path, errors), appending SchemaError items
+        """
+        raise NotImplementedError
+
+
+class Any(Schema):
+    """Any value."""
+
+    def compile(self):
+        return None
+
+
+class Str(Schema):
+    """A str value, optionally with a fixed prefix."""
+
+    def __init__(self, prefix=None):
+        self.prefix = prefix
+
+    def compile(self):
+        prefix = self.prefix
+
+        def check(value, ctx, path, errors):
+            if not isinstance(value, str):
+                errors.append(SchemaError(path, 'must be a str'))
+            elif prefix and not value.startswith(prefix):
+                errors.append(SchemaError(path, f'must start with {prefix}'))
+
+        return check
+
+
+class List(Schema):
+    """A list value, optionally with a schema for its items."""
+
+    def __init__(self, items=None):
+        self.items = items
+
+    def compile(self):
+        check_item = self.items.compile() if self.items else None
+
+        def check(value, ctx, path, errors):
+            if not isinstance(value, list):
+                errors.append(SchemaError(path, 'must be a list'))
+            elif check_item:
+                for index, item in enumerate(value):
+                    check_item(item, ctx, f'{path}[{index}]', errors)
+
+        return check
+
+
+class Dict(Schema):
+    """A dict value with declared entries."""
+
+    def __init__(self, fields=None, values=None, keys_from=None, any_of=None):
+        """
+        Declare a dict.
+
+        :param fields: dict, key -> Field
+        :param values: schema of every value, for dicts keyed by data, e.g., dts
+        :param keys_from: ctx key holding the exact key set the dict must have
+        :param any_of: at least one of these keys must be present
+        """
+        self.fields = fields or {}
+        self.values = values
+        self.keys_from = keys_from
+        self.any_of = any_of
+
+    def compile(self):
+        entries = [(key, field, field.schema.compile() if field.schema else None)
+                   for key, field in self.fields.items()]
+        check_value = self.values.compile() if self.values else None
+        keys_from = self.keys_from
+        any_of = self.any_of
+
+        def check(value, ctx, path, errors):
+            if not isinstance(value, dict):
+                errors.append(SchemaError(path, 'must be a dict'))
+                return
+
+            for key, field, check_entry in entries:
+                if field.when is not None and not field.when(ctx):
+                    continue
+
+                entry_path = f'{path}.{key}' if path else key
+                if key not in value:
+                    if field.required:
+                        errors.append(SchemaError(entry_path, 'is required'))
+                    continue
+
+                entry = value[key]
+                if entry is None:
+                    if not field.nullable:
+                        errors.append(SchemaError(entry_path, 'must not be null'))
+                    continue
+                if field.truthy and not entry:
+                    errors.append(SchemaError(entry_path, 'must not be empty'))
+                    continue
+                if check_entry:
+                    check_entry(entry, ctx, entry_path, errors)
+
+            if keys_from is not None and set(value) != set(ctx.get(keys_from) or ()):
+                errors.append(SchemaError(path, f'keys must match {keys_from}'))
+
+            if any_of and not any(key in value for key in any_of):
+                errors.append(SchemaError(path, f'one of {", ".join(any_of)} is required'))
+
+            if check_value:
+                for key, sub_value in value.items():
+                    check_value(sub_value, ctx, f'{path}.{key}' if path else key, errors)
+
+        return check
+
+
+def compile_schema(schema):
+    """
+    Compile a schema once into a validator collecting every error with its
+    path. The hot load paths keep their hand-written checks and only call it
+    to report why a value is invalid.
+
+    :param schema: Schema instance
+    :return: callable(value, ctx=None), returning a list of SchemaError, empty if valid
+    """
+    check = schema.compile()
+
+    def validate(value, ctx=None):
+        errors = []
+        if check:
+            check(value, ctx or {}, '', errors)
+        return errors
+
+    return validate
+
+
+def format_errors(errors):
+    """Render the schema errors as one line."""
+    return '; '.join(f'{error.path or "value"} {error.message}' for error in errors)
@@ -2,8 +2,15 @@
 # Copyright 2021 The DataToken Authors
 # SPDX-License-Identifier: LGPL-2.1-only
 
+import sys
 import copy
 
+from datatoken.core.schema import Field, Any, Dict, compile_schema
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
 
 class Service:
     """Service class for storing the asset descriptor."""
@@ -12,6 +19,8 @@ class Service:
     DESCRIPTOR = 'descriptor'
     ATTRIBUTES = 'attributes'
 
+    __slots__ = ('_index', '_endpoint', '_descriptor', '_attributes')
+
     def __init__(self, index, endpoint, descriptor, attributes):
         self._index = index
         self._endpoint = endpoint
@@ -71,7 +80,43 @@ class Service:
         _descriptor = values.pop(cls.DESCRIPTOR, None)
         _attributes = values.pop(cls.ATTRIBUTES, None)
 
-        return _index, _endpoint, _descriptor, _attributes
+        return _intern(_index), _intern(_endpoint), cls._intern_descriptor(_descriptor), _attributes
+
+    @staticmethod
+    def _intern_descriptor(descriptor):
+        """Share the dt and service id strings repeated across descriptors."""
+        if not isinstance(descriptor, dict):
+            return descriptor
+
+        if 'template' in descriptor:
+            descriptor['template'] = _intern(descriptor['template'])
+
+        workflow = descriptor.get('workflow')
+        if isinstance(workflow, dict):
+            for agreement in workflow.values():
+                if isinstance(agreement, dict) and 'service' in agreement:
+                    agreement['service'] = _intern(agreement['service'])
+            descriptor['workflow'] = {
+                _intern(dt): agreement for dt, agreement in workflow.items()}
+
+        return descriptor
+
+    @classmethod
+    def normalize_dict(cls, value_dict):
+        """Return the service dict as to_dict would after parsing it."""
+        values = value_dict or {}
+        return {
+            cls.INDEX: values.get(cls.INDEX),
+            cls.ENDPOINT: values.get(cls.ENDPOINT),
+            cls.DESCRIPTOR: values.get(cls.DESCRIPTOR),
+            cls.ATTRIBUTES: values.get(cls.ATTRIBUTES)
+        }
+
+    @classmethod
+    def from_trusted_dict(cls, value_dict):
+        """Build a service sharing the values of an already verified dict."""
+        return cls(value_dict.get(cls.INDEX), value_dict.get(cls.ENDPOINT),
+                   value_dict.get(cls.DESCRIPTOR), value_dict.get(cls.ATTRIBUTES))
 
     def validate(self, asset_type, child_dts):
         """Validator of the service composition
@@ -100,3 +145,47 @@ class Service:
                 return False
 
         return True
+
+    def errors(self, asset_type, child_dts):
+        """
+        Get the schema errors of the service composition, the same checks as
+        validate reported with their paths.
+
+        :param asset_type: str
+        :param child_dts: list
+        :return: list of SchemaError
+        """
+        validate = _validate_cdt_service if child_dts else _validate_leaf_service
+        values = {
+            self.INDEX: self._index,
+            self.ENDPOINT: self._endpoint,
+            self.DESCRIPTOR: self._descriptor,
+            self.ATTRIBUTES: self._attributes
+        }
+        return validate(values, {'asset_type': asset_type, 'child_dts': child_dts})
+
+
+def _service_schema(descriptor):
+    return Dict({
+        Service.INDEX: Field(Any()),
+        Service.ENDPOINT: Field(Any(), truthy=True,
+                                when=lambda ctx: ctx.get('asset_type') != 'Algorithm'),
+        Service.DESCRIPTOR: Field(descriptor, truthy=True),
+        Service.ATTRIBUTES: Field(Any(), nullable=True)
+    })
+
+
+LEAF_SERVICE_SCHEMA = _service_schema(Dict({
+    'template': Field(Any(), truthy=True),
+    'constraint': Field(Dict())
+}))
+
+CDT_SERVICE_SCHEMA = _service_schema(Dict({
+    'workflow': Field(Dict(keys_from='child_dts', values=Dict({
+        'service': Field(Any()),
+        'constraint': Field(Dict())
+    })))
+}))
+
+_validate_leaf_service = compile_schema(LEAF_SERVICE_SCHEMA)
+_validate_cdt_service = compile_schema(CDT_SERVICE_SCHEMA)
@@ -5,9 +5,25 @@
 import hashlib
 import json
 import uuid
+import functools
 from web3 import Web3
+from eth_utils import remove_0x_prefix
 from datetime import datetime
 
+CHECKSUM_LEGACY = 'legacy'
+CHECKSUM_CANONICAL = 'canonical'
+# DDO only, a merkle root over the header, metadata and each service
+CHECKSUM_MERKLE = 'merkle'
+
+# containers above this depth are walked, deeper ones are encoded at once
+CHUNK_DEPTH = 2
+CHUNK_SIZE = 1 << 16
+
+_LEGACY_ENCODER = json.JSONEncoder(separators=(',', ':'), sort_keys=True)
+_LEGACY_FLAT_ENCODER = json.JSONEncoder(separators=(',', ':'))
+_CANONICAL_ENCODER = json.JSONEncoder(
+    separators=(',', ':'), sort_keys=True, ensure_ascii=False, allow_nan=False)
+
 
 def convert_to_bytes(data):
     return Web3.toBytes(text=data)
@@ -17,28 +33,122 @@ def convert_to_string(data):
     return Web3.toHex(data)
 
 
+@functools.lru_cache(maxsize=4096)
+def checksum_to_hex(checksum_evidence):
+    """Convert an on-chain checksum to the hex string used in the proofs."""
+    return remove_0x_prefix(convert_to_string(checksum_evidence))
+
+
 def get_timestamp():
     """Return the current system timestamp."""
     return f'{datetime.utcnow().replace(microsecond=0).isoformat()}Z'
 
 
-def calc_checksum(seed):
-    """Calculate the hash3_256."""
+def calc_code_checksum(code):
+    """Calculate the hash3_256 of a code string."""
+    return hashlib.sha3_256(code.encode('utf-8')).hexdigest()
+
+
+def _json_key(key):
+    """Convert a dict key the way json does."""
+    if isinstance(key, str):
+        return key
+    if key is None or isinstance(key, (bool, int, float)):
+        return _LEGACY_ENCODER.encode(key)
+    raise TypeError(f'keys must be str, int, float, bool or None, not {type(key).__name__}')
+
+
+def _iter_legacy(value, depth, exact=False):
+    """
+    Yield the legacy checksum text of a value in a sorted zone, i.e., a dict,
+    or an item of a list held by a dict. The legacy sort never reaches into
+    a list held by a list, so those keep their key order.
+    """
+    if isinstance(value, dict) and (exact or depth > 0):
+        yield '{'
+        for index, (key, sub_value) in enumerate(sorted(value.items())):
+            yield f'{"," if index else ""}{_LEGACY_ENCODER.encode(_json_key(key))}:'
+            yield from _iter_legacy(sub_value, depth - 1, exact)
+        yield '}'
+    elif isinstance(value, list) and (exact or depth > 0):
+        yield '['
+        for index, sub_value in enumerate(value):
+            if index:
+                yield ','
+            if isinstance(sub_value, list):
+                yield _LEGACY_FLAT_ENCODER.encode(sub_value)
+            else:
+                yield from _iter_legacy(sub_value, depth - 1, exact)
+        yield ']'
+    else:
+        text = _LEGACY_ENCODER.encode(value)
+        # a list directly inside a list starts with '[[' or ',[' in compact
+        # json, only then the full sort may differ from the legacy one
+        if isinstance(value, (dict, list)) and ('[[' in text or ',[' in text):
+            yield from _iter_legacy(value, depth, exact=True)
+        else:
+            yield text
+
+
+def _iter_canonical(value, depth):
+    """Yield the canonical checksum text of a value."""
+    if isinstance(value, dict) and depth > 0:
+        yield '{'
+        for index, (key, sub_value) in enumerate(sorted(value.items())):
+            if not isinstance(key, str):
+                raise TypeError(f'keys must be str, not {type(key).__name__}')
+            yield f'{"," if index else ""}{_CANONICAL_ENCODER.encode(key)}:'
+            yield from _iter_canonical(sub_value, depth - 1)
+        yield '}'
+    elif isinstance(value, list) and depth > 0:
+        yield '['
+        for index, sub_value in enumerate(value):
+            if index:
+                yield ','
+            yield from _iter_canonical(sub_value, depth - 1)
+        yield ']'
+    else:
+        yield _CANONICAL_ENCODER.encode(value)
+
+
+def calc_checksum(seed, scheme=CHECKSUM_LEGACY):
+    """
+    Calculate the hash3_256 of a document, feeding the hash one bounded chunk
+    at a time instead of serializing the whole document first.
+
+    The legacy scheme reproduces the original checksums bit for bit: dicts
+    sorted except inside nested lists, ascii json without any space, even
+    inside values. The canonical scheme sorts every dict and keeps the values
+    intact, as compact utf-8 json.
+
+    :param seed: dict
+    :param scheme: legacy or canonical
+    :return: hex str
+    """
+    if scheme == CHECKSUM_LEGACY:
+        chunks = _iter_legacy(seed, CHUNK_DEPTH)
+    elif scheme == CHECKSUM_CANONICAL:
+        chunks = _iter_canonical(seed, CHUNK_DEPTH)
+    else:
+        raise ValueError(f'unknown checksum scheme {scheme}')
 
-    def _sort_dict(dict_value: dict):
-        dict_value = dict(sorted(dict_value.items(), reverse=False))
+    hasher = hashlib.sha3_256()
+    buffer = []
+    size = 0
 
-        for key, value in dict_value.items():
-            if isinstance(value, dict):
-                value = _sort_dict(value)
-                dict_value[key] = value
-            elif isinstance(value, list):
-                for index, sub_value in enumerate(value):
-                    if isinstance(sub_value, dict):
-                        sub_value = _sort_dict(sub_value)
-                        value[index] = sub_value
+    def _flush():
+        text = ''.join(buffer)
+        if scheme == CHECKSUM_LEGACY:
+            text = text.replace(' ', '')
+        hasher.update(text.encode('utf-8'))
+        buffer.clear()
 
-        return dict_value
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= CHUNK_SIZE:
+            _flush()
+            size = 0
+    _flush()
 
-    return hashlib.sha3_256((json.dumps(_sort_dict(seed)).replace(
-        " ", "")).encode('utf-8')).hexdigest()
+    return hasher.hexdigest()
@@ -5,6 +5,135 @@
 import json
 
 from datatoken.store.asset_resolve import resolve_op
+from datatoken.store.doc_cache import MemoryLRU
+
+CHECKER_CACHE_SIZE = 16384
+
+# a required value that is empty asks for nothing
+_ANY = object()
+
+
+class ConstraintChecker:
+    """
+    A service constraint compiled once, checking whether the constraints
+    fulfilled by a father service satisfy it.
+    """
+    __slots__ = ('_keys', '_entries', '_valid')
+
+    def __init__(self, required_constraint):
+        """
+        Compile the constraint required by a service.
+
+        :param required_constraint: low-level requirements, dict
+        """
+        self._valid = isinstance(required_constraint, dict)
+        if not self._valid:
+            self._keys = frozenset()
+            self._entries = ()
+            return
+
+        entries = []
+        for key, required in required_constraint.items():
+            required_is_dict = isinstance(required, dict)
+            sub_keys = frozenset(required) if required_is_dict and required else None
+            sub_checks = tuple((sub_key, sub_required) for sub_key, sub_required in (
+                required.items() if required_is_dict else ()) if sub_required)
+            # every sub value is required as it is, one dict comparison is enough
+            exact = sub_keys is not None and len(sub_checks) == len(sub_keys)
+            entries.append((key, required if required else _ANY,
+                            required_is_dict, exact, sub_keys, sub_checks))
+
+        self._keys = frozenset(required_constraint)
+        self._entries = tuple(entries)
+
+    def check(self, fulfill_constraint, terminal=False):
+        """
+        Check whether the high-level fulfills satisfy this constraint.
+
+        :param fulfill_constraint: high-level fulfills, dict
+        :param terminal: true when it is an Algorithm asset.
+        :return: bool
+        """
+        if not self._valid or not isinstance(fulfill_constraint, dict):
+            return False
+
+        if fulfill_constraint.keys() != self._keys:
+            return False
+
+        for key, required, required_is_dict, exact, sub_keys, sub_checks in self._entries:
+            value = fulfill_constraint[key]
+            if isinstance(value, dict):
+                if not required_is_dict:
+                    return False
+
+                if exact:
+                    if value != required:
+                        return False
+                    continue
+
+                if sub_keys is not None and value.keys() != sub_keys:
+                    return False
+
+                if terminal and None in value.values():
+                    return False
+
+                for sub_key, sub_required in sub_checks:
+                    if value[sub_key] != sub_required:
+                        return False
+            else:
+                if (terminal and value == None) or (required is not _ANY and value != required):
+                    return False
+
+        return True
+
+
+class CheckerProvider:
+    """Provides the compiled constraints, per proof checksum and service id."""
+
+    _checkers = MemoryLRU(CHECKER_CACHE_SIZE)
+    _params = MemoryLRU(CHECKER_CACHE_SIZE)
+
+    @staticmethod
+    def get_checker(ddo, sid):
+        """
+        Get the compiled constraint of a service.
+
+        :param ddo: DDO object, its proof checksum identifies the constraint
+        :param sid: service index
+        :return: ConstraintChecker
+        """
+        checksum = ddo.proof.get('checksum') if ddo.proof else None
+        if checksum is None:
+            return ConstraintChecker(ddo.get_service_constraint(sid))
+
+        key = (checksum, sid)
+        checker = CheckerProvider._checkers.get(key)
+        if checker is None:
+            checker = ConstraintChecker(ddo.get_service_constraint(sid))
+            CheckerProvider._checkers.put(key, checker)
+        return checker
+
+    @staticmethod
+    def get_param_keys(op):
+        """
+        Get the parameter names of an op template.
+
+        :param op: OpTemplate object
+        :return: frozenset
+        """
+        checksum = op.proof.get('checksum') if op.proof else None
+        keys = CheckerProvider._params.get(checksum) if checksum else None
+        if keys is None:
+            keys = frozenset(json.loads(op.params))
+            if checksum:
+                CheckerProvider._params.put(checksum, keys)
+        return keys
+
+    @staticmethod
+    def clear():
+        """Remove all the compiled constraints."""
+        CheckerProvider._checkers.clear()
+        CheckerProvider._params.clear()
 
 
 def validate_leaf_template(leaf_ddo, keeper_op_template):
@@ -28,11 +157,11 @@ def validate_leaf_template(leaf_ddo, keeper_op_template):
         if not data or not op:
             return False
 
-        params = json.loads(op.params)
-        if not _check_params(params, constraint):
+        if not isinstance(constraint, dict) or (
+                constraint.keys() != CheckerProvider.get_param_keys(op)):
             return False
 
-        return True
+    return True
 
 
 def validate_service_agreement(cdt_ddo, required_ddo):
@@ -44,83 +173,22 @@ def validate_service_agreement(cdt_ddo, required_ddo):
     :param required_ddo: child DDO that needs to be satisfied.
     :return: bool
     """
-    is_cdt = required_ddo.is_cdt
     terminal = (cdt_ddo.asset_type == 'Algorithm')
 
     if required_ddo.asset_type == 'Algorithm':
         return False
 
-    for service in cdt_ddo.services:
-        fulfilled = service.descriptor['workflow'].get(required_ddo.dt)
-
-        if not fulfilled:
-            return False
-
-        sid = fulfilled.get('service')
-        constraint = fulfilled.get('constraint')
+    fulfills = cdt_ddo.get_fulfills(required_ddo.dt)
+    if fulfills is None:
+        return False
 
-        child_service = required_ddo.get_service_by_index(sid)
-        if not child_service:
+    for sid, constraint in fulfills:
+        if not required_ddo.get_service_by_index(sid):
             return False
 
-        if is_cdt:
-            sub_constraint = dict()
-            for key, value in child_service.descriptor['workflow'].items():
-                sub_constraint[key] = value['constraint']
-        else:
-            sub_constraint = child_service.descriptor['constraint']
-
-        if not _check_fulfills(sub_constraint, constraint, terminal):
+        checker = CheckerProvider.get_checker(required_ddo, sid)
+        if not checker.check(constraint, terminal):
             return False
 
     return True
 
-
-def _check_params(params: dict, constraint: dict):
-    """
-    Check whether a leaf asset provide the required parameters when it
-    uses a trusted op template.
-
-    :param params: required parameters for a op template
-    :param constraint: leaf contraints.
-    :return: bool
-    """
-    if set(params.keys()) != set(constraint.keys()):
-        return False
-
-    return True
-
-
-def _check_fulfills(required_constraint: dict, fulfill_constraint: dict, terminal=False):
-    """
-    Check whether the low-level constraints are satisfied.
-
-    :param required_constraint: low-level requirements
-    :param fulfill_constraint: high-level fulfills
-    :param terminal: true when it is an Algorithm asset.
-    :return: bool
-    """
-    if set(required_constraint.keys()) != set(fulfill_constraint.keys()):
-        return False
-
-    for key, value in fulfill_constraint.items():
-        required = required_constraint[key]
-        if isinstance(value, dict):
-            if not isinstance(required, dict):
-                return False
-
-            if required and set(value.keys()) != set(required.keys()):
-                return False
-
-            for sub_key, sub_value in value.items():
-                if terminal and sub_value == None:
-                    return False
-
-                sub_required = required.get(sub_key)
-                if sub_required and sub_value != sub_required:
-                    return False
-        else:
-            if (terminal and value == None) or (required and value != required):
-                return False
-
-    return True
@@ -7,6 +7,7 @@ import logging
 from datatoken.web3.contract_base import ContractBase
 from datatoken.web3.event_filter import EventFilter
 from datatoken.model.constants import ErrorCode
+from datatoken.model.registry_cache import RegistryCache, RegistryCacheProvider
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +18,8 @@ class DTFactory(ContractBase):
     DT_GRANT_EVENT = 'DataTokenGranted'
     CDT_MINT_EVENT = 'CDTMinted'
 
+    _register_cache = None
+
     def mint_dt(self, dt, owner, is_leaf, checksum, ipfs_path, from_wallet):
         """
         Create new data token on chain.
@@ -29,13 +32,39 @@ class DTFactory(ContractBase):
         :param from_wallet: issuer account
         :return
         """
-        tx_hash = self.send_transaction(
+        tx_hash = self.send_mint_dt(
+            dt, owner, is_leaf, checksum, ipfs_path, from_wallet)
+        self.confirm_mint_dt(dt, tx_hash)
+
+    def send_mint_dt(self, dt, owner, is_leaf, checksum, ipfs_path, from_wallet):
+        """
+        Send the mint transaction without waiting for it, so that many mints
+        can be pipelined. The wallet keeps the nonces in order.
+
+        :param dt: refers to data token identifier
+        :param owner: refers to data token owner
+        :param is_leaf: leaf dt or composable dt
+        :param checksum: checksum associated with dt/metadata
+        :param ipfs_path: refers to the metadata storage path
+        :param from_wallet: issuer account
+        :return: tx hash, hex str
+        """
+        return self.send_transaction(
             'mintDataToken',
             (dt, owner, is_leaf, checksum, ipfs_path),
             from_wallet
         )
 
-        receipt = self.get_tx_receipt(tx_hash)
+    def confirm_mint_dt(self, dt, tx_hash, timeout=20):
+        """
+        Wait for a mint transaction and check its result.
+
+        :param dt: refers to data token identifier
+        :param tx_hash: hash of the mint transaction
+        :param timeout: seconds to wait for the receipt
+        :return
+        """
+        receipt = self.get_tx_receipt(tx_hash, timeout)
 
         if not bool(receipt and receipt.status == 1):
             raise AssertionError(f'transaction failed with tx id {tx_hash}.')
@@ -163,6 +192,31 @@ class DTFactory(ContractBase):
         """
         return self.contract_concise.getDTRegister(dt)
 
+    @property
+    def register_cache(self):
+        """Get the block-aware cache of the dt records."""
+        if self._register_cache is None:
+            self._register_cache = RegistryCacheProvider.get_cache(
+                self.address, 'register', self._create_register_cache)
+        return self._register_cache
+
+    def _create_register_cache(self):
+        register_cache = RegistryCache(self.get_dt_register, self.blockNumberUpdated)
+        for event_name, id_arg in [(DTFactory.DT_MINT_EVENT, '_dt'),
+                                   (DTFactory.DT_GRANT_EVENT, '_dt'),
+                                   (DTFactory.CDT_MINT_EVENT, '_cdt')]:
+            register_cache.watch(event_name, getattr(self.events, event_name), id_arg)
+        return register_cache
+
+    def get_dt_register_cached(self, dt):
+        """
+        Get the dt records, served from the registry cache if still valid.
+
+        :param dt: refers to data token identifier
+        :return: DataToken struct
+        """
+        return self.register_cache.get(dt)
+
     def blockNumberUpdated(self, dt):
         """
         Get the blockUpdated for a dt
@@ -5,7 +5,9 @@
 import logging
 
 from datatoken.web3.contract_base import ContractBase
+from datatoken.web3.event_filter import EventFilter
 from datatoken.model.constants import ErrorCode
+from datatoken.model.registry_cache import RegistryCache, RegistryCacheProvider
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +16,8 @@ class OpTemplate(ContractBase):
     CONTRACT_NAME = 'OpTemplate'
     TEMPLATE_PUBLISH_EVENT = 'TemplatePublished'
 
+    _template_cache = None
+
     def publish_template(self, tid, name, checksum, ipfs_path, from_wallet):
         """
         Publish an off-chain code template on chain.
@@ -98,6 +102,30 @@ class OpTemplate(ContractBase):
         """
         return self.contract_concise.getTemplateById(tid)
 
+    @property
+    def template_cache(self):
+        """Get the block-aware cache of the template records."""
+        if self._template_cache is None:
+            self._template_cache = RegistryCacheProvider.get_cache(
+                self.address, 'template', self._create_template_cache)
+        return self._template_cache
+
+    def _create_template_cache(self):
+        template_cache = RegistryCache(self.get_template, self.blockNumberUpdated)
+        template_cache.watch(
+            OpTemplate.TEMPLATE_PUBLISH_EVENT,
+            getattr(self.events, OpTemplate.TEMPLATE_PUBLISH_EVENT), '_tid')
+        return template_cache
+
+    def get_template_cached(self, tid):
+        """
+        Get the template records, served from the registry cache if still valid.
+
+        :param tid: refers to the address identifier
+        :return: Template struct
+        """
+        return self.template_cache.get(tid)
+
     def blockNumberUpdated(self, tid):
         """
         Get the blockUpdated for a template.
@@ -114,3 +142,29 @@ class OpTemplate(ContractBase):
         :return: int
         """
         return self.contract_concise.getTemplateNum()
+
+    ######################
+    def get_published_templates(self):
+        """
+        Get all the published template identifiers.
+
+        :return: List tid
+        """
+        _filters = {'_code': ErrorCode.SUCCESS}
+
+        block_filter = EventFilter(
+            OpTemplate.TEMPLATE_PUBLISH_EVENT,
+            getattr(self.events, OpTemplate.TEMPLATE_PUBLISH_EVENT),
+            from_block=0,
+            to_block='latest',
+            argument_filters=_filters
+        )
+
+        log_items = block_filter.get_all_entries(max_tries=5)
+        tid_list = []
+        for log_i in log_items:
+            tid = log_i.args['_tid']
+            if tid not in tid_list:
+                tid_list.append(tid)
+
+        return tid_list
@@ -0,0 +1,207 @@
+"""Registry Read Cache"""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import os
+import time
+import logging
+import threading
+
+from datatoken.store.doc_cache import MemoryLRU
+from datatoken.web3.event_filter import EventFilter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_AGE = 15
+DEFAULT_POLL_INTERVAL = 2
+DEFAULT_REGISTRY_ITEMS = 16384
+
+
+class RegistryCache:
+    """
+    Block-aware cache for on-chain registry structs. Each entry keeps the
+    block it was last updated at, it is trusted for max_age seconds and then
+    revalidated with a cheap blockNumberUpdated call instead of reading the
+    whole struct. When the update events of the registry are watched, an
+    entry is also dropped as soon as such an event names its key.
+    """
+
+    def __init__(self, read_fn, block_fn, max_age=DEFAULT_MAX_AGE,
+                 poll_interval=DEFAULT_POLL_INTERVAL, max_items=DEFAULT_REGISTRY_ITEMS):
+        """
+        Initialize the registry cache.
+
+        :param read_fn: reads the struct for a given id
+        :param block_fn: reads the block the struct was last updated at
+        :param max_age: seconds an entry is trusted before its block is checked again
+        :param poll_interval: minimal seconds between two event polls
+        :param max_items: item budget of the entries
+        """
+        self._read_fn = read_fn
+        self._block_fn = block_fn
+        self._max_age = max_age
+        self._poll_interval = poll_interval
+
+        self._entries = MemoryLRU(max_items)
+        self._lock = threading.Lock()
+
+        self._watches = []
+        self._last_poll = 0
+
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+
+    @property
+    def watching(self):
+        """Check whether the entries are invalidated from events."""
+        return bool(self._watches)
+
+    def watch(self, event_name, event, id_arg):
+        """
+        Invalidate the entries from an update event, every event changing the
+        registry structs should be watched.
+
+        :param event_name: refers to the event name
+        :param event: contract event, e.g., contract.events.DataTokenMinted
+        :param id_arg: event argument holding the registry id
+        """
+        try:
+            event_filter = EventFilter(
+                event_name, event, argument_filters={},
+                from_block='latest', to_block='latest')
+            self._watches.append((event_filter, id_arg))
+            self._last_poll = time.monotonic()
+        except Exception as e:
+            logger.debug(
+                f'cannot watch {event_name}, revalidating by block only: {e}')
+
+    def _poll_events(self):
+        if not self._watches:
+            return
+
+        now = time.monotonic()
+        if now - self._last_poll < self._poll_interval:
+            return
+
+        with self._lock:
+            if now - self._last_poll < self._poll_interval:
+                return
+            self._last_poll = now
+
+            for event_filter, id_arg in list(self._watches):
+                try:
+                    log_items = event_filter.get_new_entries()
+                except Exception as e:
+                    logger.debug(f'stop watching {event_filter.event_name}: {e}')
+                    self._watches.remove((event_filter, id_arg))
+                    # events may have been missed, every entry is read again
+                    self._entries.clear()
+                    continue
+
+                for log_i in log_items:
+                    key = log_i.args.get(id_arg)
+                    if key is not None:
+                        self._entries.pop(key)
+
+    def get(self, key):
+        """
+        Get the struct for a given id.
+
+        :param key: registry id, bytes
+        :return: struct
+        """
+        self._poll_events()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            struct, block, checked = entry
+            now = time.monotonic()
+            if now - checked <= self._max_age:
+                self.hits += 1
+                return struct
+
+            if self._block_fn(key) == block:
+                self.revalidations += 1
+                self._entries.put(key, (struct, block, now))
+                return struct
+
+        self.misses += 1
+
+        # read the block first, a concurrent update then only makes it older
+        block = self._block_fn(key)
+        struct = self._read_fn(key)
+        if block:
+            self._entries.put(key, (struct, block, time.monotonic()))
+
+        return struct
+
+    def invalidate(self, key):
+        """Drop the entry for a given id."""
+        self._entries.pop(key)
+
+    def clear(self):
+        """Drop all the entries."""
+        self._entries.clear()
+
+    def close(self):
+        """Stop watching the events and drop all the entries."""
+        with self._lock:
+            watches, self._watches = self._watches, []
+        for event_filter, _ in watches:
+            try:
+                event_filter.uninstall()
+            except Exception as e:
+                logger.debug(f'failed to uninstall the registry filter: {e}')
+        self._entries.clear()
+
+    def stats(self):
+        """Get the hit/revalidation/miss counters."""
+        return {
+            'hits': self.hits,
+            'revalidations': self.revalidations,
+            'misses': self.misses,
+            'items': len(self._entries),
+            'watching': self.watching
+        }
+
+
+class RegistryCacheProvider:
+    """
+    Provides the process-wide registry caches, one per contract and registry,
+    so every keeper instance of a contract shares the same entries and the
+    same event filter.
+    """
+
+    _caches = dict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_cache(address, name, create_fn):
+        """
+        Return the cache of a registry, created with create_fn on first use.
+
+        :param address: contract address
+        :param name: registry name within the contract
+        :param create_fn: function creating the RegistryCache
+        :return: RegistryCache
+        """
+        # a forked process must not share the filters of its parent
+        key = (os.getpid(), address, name)
+        cache = RegistryCacheProvider._caches.get(key)
+        if cache is None:
+            with RegistryCacheProvider._lock:
+                cache = RegistryCacheProvider._caches.get(key)
+                if cache is None:
+                    cache = RegistryCacheProvider._caches[key] = create_fn()
+        return cache
+
+    @staticmethod
+    def close_caches():
+        """Close all the registry caches, new ones are created on next use."""
+        with RegistryCacheProvider._lock:
+            caches = list(RegistryCacheProvider._caches.values())
+            RegistryCacheProvider._caches.clear()
+
+        for cache in caches:
+            cache.close()
@@ -3,17 +3,24 @@
 # SPDX-License-Identifier: LGPL-2.1-only
 
 import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from datatoken.core.ddo import DDO
 from datatoken.core.dt_helper import DTHelper
+from datatoken.core.utils import CHECKSUM_LEGACY
 from datatoken.store.ipfs_provider import IPFSProvider
-from datatoken.store.asset_resolve import resolve_asset, resolve_asset_by_url
+from datatoken.store.codec import ENCODING_JSON
+from datatoken.store.asset_resolve import resolve_asset, resolve_assets_by_url
 from datatoken.model.keeper import Keeper
-from datatoken.service.verifier import VerifierService
+from datatoken.service.verifier import VerifierService, VerificationContext
+from datatoken.service.decision_cache import DecisionCache
 from datatoken.service.tracer import TracerService
 
 logger = logging.getLogger(__name__)
 
+AssetResult = namedtuple('AssetResult', ('ddo', 'ipfs_path', 'tx_hash', 'error'))
+
 
 class AssetService(object):
     """The entry point for accessing the asset service."""
@@ -28,7 +35,8 @@ class AssetService(object):
 
         self.config = config
 
-    def generate_ddo(self, metadata, services, owner_address, child_dts=None, verify=True):
+    def generate_ddo(self, metadata, services, owner_address, child_dts=None, verify=True,
+                     checksum_scheme=CHECKSUM_LEGACY, context=None):
         """
         Create an asset document and declare its services.
 
@@ -37,6 +45,8 @@ class AssetService(object):
         :param owner_address: refers to the asset owner
         :param child_dts: list of child asset identifiers
         :param verify: check the correctness of asset services 
+        :param checksum_scheme: proof checksum scheme, legacy, canonical or merkle
+        :param context: VerificationContext shared with other verifications
         :return ddo: DDO instance
         """
         ddo = DDO()
@@ -47,25 +57,26 @@ class AssetService(object):
             ddo.add_service(service)
 
         ddo.assign_dt(DTHelper.generate_new_dt())
-        ddo.create_proof()
+        ddo.create_proof(checksum_scheme)
 
         # make sure the generated ddo is under system constraits
-        if verify and not self.verifier.verify_services(ddo):
+        if verify and not self.verifier.verify_services(ddo, context=context):
             raise AssertionError(f'Service agreements are not satisfied')
 
         return ddo
 
-    def publish_dt(self, ddo, issuer_wallet):
+    def publish_dt(self, ddo, issuer_wallet, encoding=ENCODING_JSON):
         """
         Publish a ddo to the decentralized storage network and register its 
         data token on the smart-contract chain.
 
         :param ddo: refers to the asset DDO document 
         :param issuer_wallet: issuer account, enterprize now
+        :param encoding: storage encoding of the document, json or compact binary
         :return
         """
         ipfs_client = IPFSProvider(self.config)
-        ipfs_path = ipfs_client.add(ddo.to_dict())
+        ipfs_path = ipfs_client.add(ddo.to_dict(), encoding)
 
         dt = DTHelper.dt_to_id(ddo.dt)
         owner = ddo.creator
@@ -77,6 +88,106 @@ class AssetService(object):
 
         return
 
+    def generate_ddos(self, assets, owner_address, verify=True,
+                      checksum_scheme=CHECKSUM_LEGACY, max_workers=None):
+        """
+        Create many asset documents concurrently. The child dts of a cdt must
+        be published already when verify is on.
+
+        :param assets: list of dicts with metadata, services and optional child_dts
+        :param owner_address: refers to the asset owner
+        :param verify: check the correctness of asset services
+        :param checksum_scheme: proof checksum scheme, legacy, canonical or merkle
+        :param max_workers: maximum parallel generations, the backend concurrency if None
+        :return: list of AssetResult(ddo, None, None, error), in the input order
+        """
+        # the assets often share childs, each one is verified once for the batch
+        context = VerificationContext()
+
+        def _generate_one(asset):
+            try:
+                ddo = self.generate_ddo(asset['metadata'], asset['services'], owner_address,
+                                        asset.get('child_dts'), verify, checksum_scheme,
+                                        context)
+                return AssetResult(ddo, None, None, None)
+            except Exception as e:
+                logger.debug(f'failed to generate ddo: {e}')
+                return AssetResult(None, None, None, e)
+
+        if not assets:
+            return []
+
+        if not max_workers:
+            max_workers = IPFSProvider.get_backend(self.config).concurrency
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(assets))) as executor:
+            return list(executor.map(_generate_one, assets))
+
+    def publish_dts(self, ddos, issuer_wallet, encoding=ENCODING_JSON, max_workers=None,
+                    timeout=20):
+        """
+        Publish many ddos, pipelining the stages. The documents are added to the
+        storage concurrently, each mint transaction is sent as soon as its
+        document is stored, and the receipts are collected in the background.
+
+        :param ddos: list of DDO instances
+        :param issuer_wallet: issuer account, enterprize now
+        :param encoding: storage encoding of the documents, json or compact binary
+        :param max_workers: maximum parallel adds and receipt waits, the backend concurrency if None
+        :param timeout: seconds to wait for each receipt
+        :return: list of AssetResult(ddo, ipfs_path, tx_hash, error), in the input order
+        """
+        if not ddos:
+            return []
+
+        if not max_workers:
+            max_workers = IPFSProvider.get_backend(self.config).concurrency
+        max_workers = min(max_workers, len(ddos))
+
+        ipfs_client = IPFSProvider(self.config)
+        results = [None] * len(ddos)
+        pending = dict()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as add_executor, \
+                ThreadPoolExecutor(max_workers=max_workers) as receipt_executor:
+            add_futures = {add_executor.submit(
+                lambda ddo: ipfs_client.add(ddo.to_dict(), encoding), ddo): index
+                for index, ddo in enumerate(ddos)}
+
+            # the transactions are sent from this thread only, so the wallet
+            # hands out the nonces in order
+            for future in as_completed(add_futures):
+                index = add_futures[future]
+                ddo = ddos[index]
+
+                try:
+                    ipfs_path = future.result()
+                except Exception as e:
+                    results[index] = AssetResult(ddo, None, None, e)
+                    continue
+
+                try:
+                    tx_hash = self.dt_factory.send_mint_dt(
+                        DTHelper.dt_to_id(ddo.dt), ddo.creator, not bool(ddo.child_dts),
+                        ddo.proof['checksum'], ipfs_path, issuer_wallet)
+                except Exception as e:
+                    results[index] = AssetResult(ddo, ipfs_path, None, e)
+                    continue
+
+                receipt = receipt_executor.submit(
+                    self.dt_factory.confirm_mint_dt, ddo.dt, tx_hash, timeout)
+                pending[receipt] = (index, ipfs_path, tx_hash)
+
+            for receipt, (index, ipfs_path, tx_hash) in pending.items():
+                try:
+                    receipt.result()
+                    error = None
+                except Exception as e:
+                    error = e
+                results[index] = AssetResult(ddos[index], ipfs_path, tx_hash, error)
+
+        return results
+
     def grant_dt_perm(self, dt, grantee, owner_wallet):
         """
         Grant one dt to other dt.
@@ -103,7 +214,7 @@ class AssetService(object):
         :return
         """
         _cdt = DTHelper.dt_to_id(cdt)
-        _child_dts = [DTHelper.dt_to_id(dt) for dt in child_dts]
+        _child_dts = DTHelper.dts_to_ids(child_dts)
 
         self.dt_factory.start_compose_dt(_cdt, _child_dts, aggregator_wallet)
 
@@ -120,13 +231,20 @@ class AssetService(object):
         :param signature: signed by aggregator, [consume_address, cdt]
         :return: bool
         """
+        key = DecisionCache.make_key('service_terms', cdt, dt, owner_address, None, signature)
+        return self.verifier.decision_cache.decide(
+            key, lambda: self._check_service_terms(cdt, dt, owner_address, signature))
+
+    def _check_service_terms(self, cdt, dt, owner_address, signature):
         if self.verifier.check_dt_perm(dt, cdt):
             return True
 
         if not self.verifier.check_dt_owner(dt, owner_address):
             return False
 
-        data, cdt_ddo = resolve_asset(cdt, self.dt_factory)
+        # only the header is parsed, with a merkle proof the workflow entries
+        # of the dt are then checked alone against the on-chain root
+        data, cdt_ddo = resolve_asset(cdt, self.dt_factory, lazy=True)
         if not data or not cdt_ddo:
             return False
 
@@ -154,13 +272,19 @@ class AssetService(object):
 
         issuer_names = self.asset_provider.get_issuer_names(issuers)
 
+        results = resolve_assets_by_url(ipfs_paths, checksums, lazy=True)
+        dts = DTHelper.ids_to_dts(dt_idx)
+
         marketplace_list = []
-        for dt, issuer_name, ipfs_path, checksum in zip(dt_idx, issuer_names, ipfs_paths, checksums):
-            ddo = resolve_asset_by_url(ipfs_path)
+        for dt, issuer_name, result, checksum in zip(dts, issuer_names, results, checksums):
+            if result.error is not None:
+                logger.warning(f'skip {dt} in the marketplace, failed to resolve: {result.error}')
+                continue
+
+            ddo = result.ddo
 
             if ddo and ddo.metadata['main'].get('type') != "Algorithm":
                 if self.verifier.verify_ddo_integrity(ddo, checksum):
-                    dt = DTHelper.id_bytes_to_dt(dt)
                     asset_name = ddo.metadata["main"].get("name")
                     asset_fig = ddo.metadata['main'].get('fig')
                     union_or_not = ddo.is_cdt
@@ -0,0 +1,260 @@
+"""Decision cache module."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import time
+import hashlib
+import logging
+import threading
+from collections import namedtuple
+
+from datatoken.core.dt_helper import DTHelper
+from datatoken.store.doc_cache import MemoryLRU
+from datatoken.web3.event_filter import EventFilter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POSITIVE_TTL = 60
+DEFAULT_NEGATIVE_TTL = 5
+DEFAULT_DECISION_ITEMS = 16384
+DEFAULT_POLL_INTERVAL = 2
+
+DecisionKey = namedtuple('DecisionKey', ('kind', 'cdt', 'dt', 'owner', 'job_id', 'signature'))
+
+
+class DecisionCache:
+    """
+    Cache of the authorization decisions taken for the Compute-to-Data
+    requests. Granted and denied decisions are kept apart, the denied ones
+    for a shorter time since a grant or a new job may flip them. When the
+    chain events are watched, the decisions involving a dt are dropped as
+    soon as an event names it.
+    """
+
+    def __init__(self, positive_ttl=DEFAULT_POSITIVE_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 max_items=DEFAULT_DECISION_ITEMS, poll_interval=DEFAULT_POLL_INTERVAL):
+        """
+        Initialize the decision cache.
+
+        :param positive_ttl: seconds a granted decision is kept
+        :param negative_ttl: seconds a denied decision is kept
+        :param max_items: item budget of each of the granted and denied entries
+        :param poll_interval: minimal seconds between two event polls
+        """
+        self._ttls = {True: positive_ttl, False: negative_ttl}
+        self._entries = {
+            True: MemoryLRU(max_items, on_evict=self._unindex),
+            False: MemoryLRU(max_items, on_evict=self._unindex)
+        }
+        # dt id bytes -> keys of the decisions involving it. The index and the
+        # entries change together under the lock, reentrant since evicting an
+        # entry unindexes it from within put
+        self._index = dict()
+        self._lock = threading.RLock()
+
+        self._poll_interval = poll_interval
+        self._watches = []
+        self._last_poll = 0
+
+        # bumped on each invalidation, a decision taken meanwhile is not kept
+        self._generation = 0
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(kind, cdt, dt, owner, job_id=None, signature=None):
+        """
+        Build the key of a decision, holding a hash of the signature only.
+
+        :param kind: name of the decision, str
+        :return: DecisionKey
+        """
+        signature_hash = hashlib.sha3_256(
+            str(signature).encode('utf-8')).hexdigest() if signature is not None else None
+        return DecisionKey(kind, cdt, dt, owner, job_id, signature_hash)
+
+    @staticmethod
+    def _dt_ids(key):
+        ids = []
+        for dt in (key.cdt, key.dt):
+            try:
+                ids.append(bytes(DTHelper.dt_to_id_bytes(dt)))
+            except Exception:
+                continue
+        return ids
+
+    def _unindex(self, key):
+        with self._lock:
+            for dt_id in self._dt_ids(key):
+                keys = self._index.get(dt_id)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._index[dt_id]
+
+    @property
+    def watching(self):
+        """Check whether the decisions are invalidated from events."""
+        return bool(self._watches)
+
+    def watch(self, event_name, event, id_arg):
+        """
+        Drop the decisions involving the dt named by an event.
+
+        :param event_name: refers to the event name
+        :param event: contract event, e.g., contract.events.DataTokenGranted
+        :param id_arg: event argument holding the dt id
+        """
+        try:
+            event_filter = EventFilter(
+                event_name, event, argument_filters={},
+                from_block='latest', to_block='latest')
+            self._watches.append((event_filter, id_arg))
+            self._last_poll = time.monotonic()
+        except Exception as e:
+            logger.debug(f'cannot watch {event_name}, expiring by ttl only: {e}')
+
+    def _poll_events(self):
+        if not self._watches:
+            return
+
+        now = time.monotonic()
+        if now - self._last_poll < self._poll_interval:
+            return
+
+        dt_ids = []
+        lost = False
+        with self._lock:
+            if now - self._last_poll < self._poll_interval:
+                return
+            self._last_poll = now
+
+            for event_filter, id_arg in list(self._watches):
+                try:
+                    log_items = event_filter.get_new_entries()
+                except Exception as e:
+                    logger.debug(f'stop watching {event_filter.event_name}: {e}')
+                    self._watches.remove((event_filter, id_arg))
+                    lost = True
+                    continue
+
+                for log_i in log_items:
+                    dt_id = log_i.args.get(id_arg)
+                    if dt_id is not None:
+                        dt_ids.append(dt_id)
+
+        # events may have been missed, nothing cached can be trusted anymore
+        if lost:
+            self.clear()
+        for dt_id in dt_ids:
+            self.invalidate(dt_id)
+
+    def get(self, key):
+        """
+        Get a cached decision.
+
+        :param key: DecisionKey
+        :return: bool, or None when unknown or expired
+        """
+        self._poll_events()
+
+        now = time.monotonic()
+        for decision in (True, False):
+            entry = self._entries[decision].get(key)
+            if entry is None:
+                continue
+            if entry > now:
+                self.hits += 1
+                if not decision:
+                    self.negative_hits += 1
+                return decision
+            self._expire(key, decision, now)
+
+        self.misses += 1
+        return None
+
+    def _expire(self, key, decision, now):
+        with self._lock:
+            # the decision may have been taken again since it was read
+            entry = self._entries[decision].get(key)
+            if entry is not None and entry <= now:
+                self._entries[decision].pop(key)
+                self._unindex(key)
+
+    def put(self, key, decision):
+        """
+        Remember a decision until it expires or an event invalidates it.
+
+        :param key: DecisionKey
+        :param decision: bool
+        """
+        self._put(key, decision)
+
+    def _put(self, key, decision, generation=None):
+        """Store a decision, unless an invalidation happened since generation."""
+        decision = bool(decision)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+
+            if self._entries[not decision].pop(key) is not None:
+                self._unindex(key)
+            for dt_id in self._dt_ids(key):
+                self._index.setdefault(dt_id, set()).add(key)
+            self._entries[decision].put(key, time.monotonic() + self._ttls[decision])
+
+    def decide(self, key, decide_fn):
+        """
+        Get a decision, taking it with decide_fn on a miss. Errors are raised
+        and never cached.
+
+        :param key: DecisionKey
+        :param decide_fn: function taking the decision, returning bool
+        :return: bool
+        """
+        decision = self.get(key)
+        if decision is None:
+            generation = self._generation
+            decision = bool(decide_fn())
+            self._put(key, decision, generation)
+        return decision
+
+    def invalidate(self, dt):
+        """
+        Drop the decisions involving a given dt.
+
+        :param dt: dt identifier or its id bytes
+        """
+        dt_id = bytes(DTHelper.dt_to_id_bytes(dt))
+        with self._lock:
+            self._generation += 1
+            keys = self._index.pop(dt_id, ())
+
+            for key in keys:
+                self._entries[True].pop(key)
+                self._entries[False].pop(key)
+                self._unindex(key)
+                self.invalidations += 1
+
+    def clear(self):
+        """Drop all the decisions."""
+        with self._lock:
+            self._generation += 1
+            self._index.clear()
+            self._entries[True].clear()
+            self._entries[False].clear()
+
+    def stats(self):
+        """Get the hit/miss counters and the entries."""
+        return {
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'positive_items': len(self._entries[True]),
+            'negative_items': len(self._entries[False]),
+            'watching': self.watching
+        }
@@ -8,6 +8,7 @@ from datatoken.core.dt_helper import DTHelper
 from datatoken.store.asset_resolve import resolve_asset, resolve_op
 from datatoken.model.keeper import Keeper
 from datatoken.service.verifier import VerifierService
+from datatoken.service.decision_cache import DecisionCache
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +63,11 @@ class JobService():
         :param signature: signed by solver, [solver_address, job_id]
         :return: bool
         """
+        key = DecisionCache.make_key('remote_compute', cdt, dt, owner_address, job_id, signature)
+        return self.verifier.decision_cache.decide(
+            key, lambda: self._check_remote_compute(cdt, dt, job_id, owner_address, signature))
+
+    def _check_remote_compute(self, cdt, dt, job_id, owner_address, signature):
         if not self.verifier.verify_job_registered(job_id, cdt):
             return False
 
@@ -102,13 +108,12 @@ class JobService():
         _, cdt_ddo = resolve_asset(cdt, self.dt_factory)
         _, dt_ddo = resolve_asset(leaf_dt, self.dt_factory)
 
-        fulfilled = cdt_ddo.services[0].descriptor['workflow'].get(leaf_dt)
+        fulfilled = cdt_ddo.get_workflow(leaf_dt).get(cdt_ddo.services[0].index)
 
         if not fulfilled:
             return None, None
 
-        sid = fulfilled.get('service')
-        args = fulfilled.get('constraint')
+        sid, args = fulfilled
 
         tid = dt_ddo.get_service_by_index(sid).descriptor['template']
 
@@ -0,0 +1,126 @@
+"""Prefetch service module."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from datatoken.store.asset_resolve import resolve_asset, resolve_op
+from datatoken.store.doc_cache import CacheProvider
+from datatoken.store.ipfs_provider import IPFSProvider
+from datatoken.model.keeper import Keeper
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Token bucket shared by the prefetch workers."""
+
+    def __init__(self, rate):
+        """
+        Initialize the limiter.
+
+        :param rate: maximum requests per second, unlimited if falsy
+        """
+        self._rate = rate
+        # a bucket below one token would never allow a request
+        self._capacity = max(1, rate) if rate else 0
+        self._tokens = self._capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request is allowed."""
+        if not self._rate:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._capacity, self._tokens + (now - self._last) * self._rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self._rate
+            time.sleep(wait)
+
+
+class PrefetchService:
+    """
+    The entry point for warming up the resolver caches. The registry and
+    verified object caches live in memory, so only a prefetch run within the
+    node process warms them; a separate process only fills the disk tier of
+    the document cache.
+    """
+
+    def __init__(self, config):
+        keeper = Keeper(config.keeper_options)
+
+        self.dt_factory = keeper.dt_factory
+        self.op_template = keeper.op_template
+
+        CacheProvider.get_cache(config)
+        IPFSProvider.get_backend(config)
+
+        self.config = config
+
+    def _prefetch_all(self, kind, items, resolve_fn, max_workers, limiter, progress):
+        total = len(items)
+        done = 0
+        failed = 0
+
+        def _prefetch_one(item):
+            limiter.acquire()
+            return resolve_fn(item)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_prefetch_one, item) for item in items]
+
+            for future in as_completed(futures):
+                done += 1
+                try:
+                    data, value = future.result()
+                    if not data or not value:
+                        failed += 1
+                except Exception as e:
+                    logger.debug(f'failed to prefetch {kind}: {e}')
+                    failed += 1
+
+                if progress:
+                    progress(kind, done, total, failed)
+
+        return done - failed, failed
+
+    def prefetch(self, max_workers=None, rate=None, progress=None):
+        """
+        Resolve every available dt and published op template, filling the
+        registry, document and verified caches before the node takes traffic.
+
+        :param max_workers: maximum parallel resolves, the backend concurrency if None
+        :param rate: maximum resolves per second, unlimited if None
+        :param progress: callback(kind, done, total, failed) after each item
+        :return: dict, prefetched and failed counts per kind
+        """
+        if not max_workers:
+            max_workers = IPFSProvider.get_backend().concurrency
+        limiter = RateLimiter(rate)
+
+        dt_idx = self.dt_factory.get_available_dts()[0]
+        tids = self.op_template.get_published_templates()
+
+        dts_ok, dts_failed = self._prefetch_all(
+            'dt', list(dt_idx), lambda dt: resolve_asset(dt, self.dt_factory),
+            max_workers, limiter, progress)
+        ops_ok, ops_failed = self._prefetch_all(
+            'op', list(tids), lambda tid: resolve_op(tid, self.op_template),
+            max_workers, limiter, progress)
+
+        return {
+            'dt': {'prefetched': dts_ok, 'failed': dts_failed},
+            'op': {'prefetched': ops_ok, 'failed': ops_failed},
+            'cache': CacheProvider.get_cache().stats()
+        }
@@ -6,7 +6,9 @@ import logging
 
 from datatoken.core.operator import OpTemplate
 from datatoken.core.dt_helper import DTHelper
+from datatoken.core.utils import CHECKSUM_LEGACY
 from datatoken.store.ipfs_provider import IPFSProvider
+from datatoken.store.codec import ENCODING_JSON
 from datatoken.model.keeper import Keeper
 from datatoken.model.constants import Role
 from datatoken.service.verifier import VerifierService
@@ -60,7 +62,8 @@ class SystemService:
 
         return
 
-    def publish_template(self, metadata, operation, params, from_wallet):
+    def publish_template(self, metadata, operation, params, from_wallet, encoding=ENCODING_JSON,
+                         split_code=False, checksum_scheme=CHECKSUM_LEGACY):
         """
         Publish the op template on chain.
 
@@ -68,6 +71,10 @@ class SystemService:
         :param operation: refers to the code template
         :param params: refers to the code parameters
         :param from_wallet: the system account
+        :param encoding: storage encoding of the template, json or compact binary
+        :param split_code: store the code apart from the template descriptor, such
+        templates cannot be read by nodes older than the split format
+        :param checksum_scheme: proof checksum scheme, legacy or canonical
         :return
         """
         op = OpTemplate()
@@ -76,10 +83,14 @@ class SystemService:
         op.add_template(operation, params)
         op.add_creator(from_wallet.address)
         op.assign_tid(DTHelper.generate_new_dt())
-        op.create_proof()
 
         ipfs_client = IPFSProvider(self.config)
-        ipfs_path = ipfs_client.add(op.to_dict())
+        if split_code:
+            code_path = ipfs_client.add_bytes(operation.encode('utf-8'))
+            op.link_code(code_path)
+
+        op.create_proof(checksum_scheme)
+        ipfs_path = ipfs_client.add(op.to_dict(), encoding)
 
         tid = DTHelper.dt_to_id(op.tid)
         name = metadata['main']['name']
@@ -5,7 +5,7 @@
 import logging
 
 from datatoken.core.dt_helper import DTHelper
-from datatoken.store.asset_resolve import resolve_asset
+from datatoken.store.asset_resolve import resolve_asset, resolve_assets
 from datatoken.model.keeper import Keeper
 from datatoken.service.verifier import VerifierService
 
@@ -79,10 +79,14 @@ class TracerService(object):
         all_paths = []
 
         if ddo.is_cdt:
-            for child_dt in ddo.child_dts:
+            results = resolve_assets(ddo.child_dts, self.dt_factory, lazy=True)
+            for child_dt, result in zip(ddo.child_dts, results):
+                if result.error is not None:
+                    raise result.error
+
                 new_path = prefix.copy()
 
-                _, child_ddo = resolve_asset(child_dt, self.dt_factory)
+                child_ddo = result.ddo
 
                 asset_name = child_ddo.metadata["main"].get("name")
 
@@ -122,7 +126,7 @@ class TracerService(object):
             prefix.append({"dt": dt})
             dt = DTHelper.dt_to_id_bytes(dt)
 
-        _, ddo = resolve_asset(dt, self.dt_factory)
+        _, ddo = resolve_asset(dt, self.dt_factory, lazy=True)
 
         all_paths = []
 
@@ -249,6 +253,7 @@ class TracerService(object):
 ###################
 class Node:
     """The Node class used for linking child and father dts."""
+    __slots__ = ('_text', '_level', '_child_nodes')
 
     def __init__(self, text, level):
         self._text = text       # dt in this level
@@ -3,19 +3,80 @@
 # SPDX-License-Identifier: LGPL-2.1-only
 
 import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 
-from eth_utils import remove_0x_prefix
 from datatoken.core.dt_helper import DTHelper
-from datatoken.core.utils import convert_to_string
-from datatoken.store.asset_resolve import resolve_asset, resolve_op
+from datatoken.core.utils import checksum_to_hex
+from datatoken.store.asset_resolve import resolve_asset
+from datatoken.store.doc_cache import CacheProvider
+from datatoken.store.ipfs_provider import IPFSProvider
 from datatoken.csp.agreement import validate_leaf_template, validate_service_agreement
 from datatoken.model.keeper import Keeper
+from datatoken.model.dt_factory import DTFactory
+from datatoken.model.task_market import TaskMarket
 from datatoken.model.constants import Role
-from datatoken.web3.utils import personal_ec_recover
+from datatoken.web3.utils import recover_personal_signers
+from datatoken.service.decision_cache import DecisionCache
 
 logger = logging.getLogger(__name__)
 
 
+class VerificationContext:
+    """
+    Verdicts of one verification request, memoized per (check, dt, checksum)
+    over the whole DAG, so a descendant shared by several unions is checked
+    once. A check running in another thread is waited for, not started twice.
+    The on-chain state may change between requests, so a context is never
+    kept beyond its request.
+    """
+
+    def __init__(self):
+        """Initialize the context."""
+        self._verdicts = dict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def verdict(self, check, ddo, check_fn):
+        """
+        Get the verdict of a check on a ddo, running it on first use.
+
+        :param check: name of the check, str
+        :param ddo: DDO object checked
+        :param check_fn: function running the check, returning bool
+        :return: bool
+        """
+        checksum = ddo.proof.get('checksum') if ddo.proof else None
+        key = (check, ddo.dt, checksum)
+
+        with self._lock:
+            future = self._verdicts.get(key)
+            owner = future is None
+            if owner:
+                future = self._verdicts[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if owner:
+            try:
+                future.set_result(bool(check_fn()))
+            except Exception as e:
+                future.set_exception(e)
+
+        return future.result()
+
+    def stats(self):
+        """Get the hit/miss counters."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'items': len(self._verdicts)
+        }
+
+
 class VerifierService(object):
     """The entry point for accessing the verifier service."""
 
@@ -28,8 +89,33 @@ class VerifierService(object):
         self.dt_factory = keeper.dt_factory
         self.task_market = keeper.task_market
 
+        CacheProvider.get_cache(config)
+        IPFSProvider.get_backend(config)
+
+        self._decision_cache = None
+
         self.config = config
 
+    @property
+    def decision_cache(self):
+        """Get the cache of the Compute-to-Data authorization decisions."""
+        if self._decision_cache is None:
+            decision_cache = DecisionCache()
+            decision_cache.watch(
+                DTFactory.DT_MINT_EVENT,
+                getattr(self.dt_factory.events, DTFactory.DT_MINT_EVENT), '_dt')
+            decision_cache.watch(
+                DTFactory.DT_GRANT_EVENT,
+                getattr(self.dt_factory.events, DTFactory.DT_GRANT_EVENT), '_dt')
+            decision_cache.watch(
+                DTFactory.CDT_MINT_EVENT,
+                getattr(self.dt_factory.events, DTFactory.CDT_MINT_EVENT), '_cdt')
+            decision_cache.watch(
+                TaskMarket.JOB_ADD_EVENT,
+                getattr(self.task_market.events, TaskMarket.JOB_ADD_EVENT), '_cdt')
+            self._decision_cache = decision_cache
+        return self._decision_cache
+
     def check_admin(self, address):
         """Check Admin role for a given address."""
         return self.role_controller.check_role(address, Role.ROLE_ADMIN)
@@ -74,53 +160,109 @@ class VerifierService(object):
 
     def verify_signature(self, signer_address, signature, original_msg):
         """Check the given address has signed on the given data"""
-        address = personal_ec_recover(original_msg, signature)
-        return address.lower() == signer_address.lower()
+        return self.verify_signatures([(signer_address, signature, original_msg)])[0]
+
+    def verify_signatures(self, items):
+        """
+        Check many signatures at once, locally.
+
+        :param items: list of (signer_address, signature, original_msg)
+        :return: list of bool, False for the invalid signatures
+        """
+        signers = recover_personal_signers(
+            [(original_msg, signature) for _, signature, original_msg in items])
+
+        return [signer is not None and signer.lower() == signer_address.lower()
+                for (signer_address, _, _), signer in zip(items, signers)]
 
     def verify_ddo_integrity(self, ddo, checksum_evidence):
         """Check the equallty of the ddo checksum and its on-chain evidence."""
-        checksum_evidence = remove_0x_prefix(
-            convert_to_string(checksum_evidence))
-        return ddo.proof['checksum'] == checksum_evidence
+        return ddo.proof['checksum'] == checksum_to_hex(checksum_evidence)
 
-    def verify_services(self, ddo, wrt_dts=None, integrity_check=True):
+    def verify_services(self, ddo, wrt_dts=None, integrity_check=True, max_workers=None,
+                        context=None):
         """ 
         Ensure the service constraints are fulfilled. For a given leaf ddo, we check 
         the parameter consistency of its constraints and used templates. For a given 
         composable ddo, we first check the availability of its childs, and then check 
         the fulfilled constraints for each workflow service.
 
+        The childs are verified concurrently, the first failure cancels the rest.
+        A child raising an error, e.g., on a storage or rpc outage, is not a
+        verdict: the error is raised once the other checks are cancelled.
+
         :param ddo: a candidate DDO object, composable or leaf
         :param wrt_dts: a list of dts to be fulfilled, all child dts if None
         :param integrity_check: verify child ddo integrity if True
+        :param max_workers: maximum parallel child checks, the backend concurrency if None
+        :param context: VerificationContext shared by the request, a new one if None
         :return: bool
         """
+        if context is None:
+            context = VerificationContext()
+
         if not ddo.is_cdt:
-            return validate_leaf_template(ddo, self.op_template)
+            return self._verify_leaf(ddo, context)
 
-        if not wrt_dts:
-            wrt_dts = ddo.child_dts
+        wrt_dts = list(wrt_dts or ddo.child_dts)
 
-        for dt in wrt_dts:
-            data, child_ddo = resolve_asset(dt, self.dt_factory)
-            if not data or not child_ddo:
-                return False
+        if not max_workers:
+            max_workers = IPFSProvider.get_backend(self.config).concurrency
+        max_workers = max(1, min(max_workers, len(wrt_dts)))
 
-            if integrity_check and not self.verify_ddo_integrity(child_ddo, data[2]):
-                return False
+        failed = threading.Event()
 
-            if not child_ddo.is_cdt:
-                if not validate_leaf_template(child_ddo, self.op_template):
-                    return False
-            else:
-                if not self.check_cdt_composed(child_ddo.dt) or (
-                        not self.verify_perms_ready(child_ddo)):
+        def _verify_one(dt):
+            if failed.is_set():
+                return False
+            try:
+                verified = self._verify_child(ddo, dt, integrity_check, context)
+            except Exception as e:
+                logger.warning(f'failed to verify child {dt} of {ddo.dt}: {e}')
+                failed.set()
+                raise
+            if not verified:
+                failed.set()
+            return verified
+
+        if max_workers == 1:
+            return all(_verify_one(dt) for dt in wrt_dts)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_verify_one, dt) for dt in wrt_dts]
+            for future in as_completed(futures):
+                error = future.exception()
+                if error is not None or not future.result():
+                    for pending in futures:
+                        pending.cancel()
+                    if error is not None:
+                        raise error
                     return False
 
-            if not validate_service_agreement(ddo, child_ddo):
+        return True
+
+    def _verify_child(self, ddo, dt, integrity_check, context):
+        """Resolve and check one child of a composable ddo."""
+        data, child_ddo = resolve_asset(dt, self.dt_factory)
+        if not data or not child_ddo:
+            return False
+
+        if integrity_check and not self.verify_ddo_integrity(child_ddo, data[2]):
+            return False
+
+        if not child_ddo.is_cdt:
+            if not self._verify_leaf(child_ddo, context):
+                return False
+        else:
+            if not context.verdict('composed', child_ddo, lambda: self.check_cdt_composed(
+                    child_ddo.dt) and self.verify_perms_ready(child_ddo)):
                 return False
 
-        return True
+        return validate_service_agreement(ddo, child_ddo)
+
+    def _verify_leaf(self, leaf_ddo, context):
+        return context.verdict(
+            'template', leaf_ddo, lambda: validate_leaf_template(leaf_ddo, self.op_template))
 
     def verify_job_registered(self, job_id, cdt):
         """Ensure the cdt is submitted to the market with a given job id."""
@@ -138,17 +280,11 @@ class VerifierService(object):
         :param required_dt: dt identifier required to be the cdt child
         :return: bool
         """
-        child_dts = []
-        found = False
-
-        for dt in cdt_ddo.child_dts:
-            child_dts.append(DTHelper.dt_to_id(dt))
-            if dt == required_dt:
-                found = True
-
-        if required_dt and found == False:
+        if required_dt and required_dt not in cdt_ddo.child_dts:
             return False
 
+        child_dts = DTHelper.dts_to_ids(cdt_ddo.child_dts)
+
         _cdt = DTHelper.dt_to_id(cdt_ddo.dt)
 
         return self.dt_factory.check_clinks(_cdt, child_dts)
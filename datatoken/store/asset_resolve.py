@@ -2,52 +2,175 @@
 # Copyright 2021 The DataToken Authors
 # SPDX-License-Identifier: LGPL-2.1-only
 
-from datatoken.core.ddo import DDO
+import asyncio
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from datatoken.core.ddo import DDO, LazyDDO
 from datatoken.core.dt_helper import DTHelper
 from datatoken.core.operator import OpTemplate
+from datatoken.core.utils import checksum_to_hex
 from datatoken.store.ipfs_provider import IPFSProvider
+from datatoken.store.async_ipfs_provider import AsyncIPFSProvider
+from datatoken.store.doc_cache import CacheProvider
+
+logger = logging.getLogger(__name__)
+
+ResolveResult = namedtuple('ResolveResult', ('data', 'ddo', 'error'))
+
+
+def fetch_document(metadata_url):
+    """
+    Get the off-chain document for a given storage path, served from the
+    document cache when the same cid was fetched before.
+
+    :param metadata_url: storage path, e.g., ipfs cid
+    :return: dict or None
+    """
+    return _fetch_document(metadata_url)[0]
 
 
-def resolve_asset(dt, keeper_dt_factory):
+def _fetch_document(metadata_url):
+    """Get the document at a storage path, and whether it came from the cache."""
+    cache = CacheProvider.get_cache()
+    doc = cache.get(metadata_url)
+    if doc is not None:
+        return doc, True
+
+    ipfs_client = IPFSProvider()
+    doc = ipfs_client.get(metadata_url)
+    cache.put(metadata_url, doc)
+
+    return doc, False
+
+
+def _fetch_and_load(metadata_url, load_fn):
+    """
+    Fetch the document at a storage path and load it with load_fn. A cached
+    copy failing to load is dropped and fetched again from the storage once.
+    """
+    doc, cached = _fetch_document(metadata_url)
+    if not doc:
+        return None
+
+    try:
+        return load_fn(doc)
+    except Exception as e:
+        if not cached:
+            raise
+        logger.warning(f'cached {metadata_url} failed to load, fetching it again: {e}')
+
+    CacheProvider.get_cache().discard(metadata_url)
+    doc, _ = _fetch_document(metadata_url)
+
+    return load_fn(doc) if doc else None
+
+
+def _is_proven(cache, metadata_url, doc_json):
+    """Check whether the document at this cid was fully verified before."""
+    proof = doc_json.get('proof')
+    proven = cache.get_proven(metadata_url)
+    return proven is not None and isinstance(proof, dict) and proof.get('checksum') == proven
+
+
+def _ready(metadata_url, ddo, lazy):
+    """Build the services of a lazily parsed DDO unless the caller is lazy too."""
+    if not lazy and isinstance(ddo, LazyDDO) and not ddo.services_loaded:
+        ddo.load_services()
+        # every service is validated now, so is the whole document
+        CacheProvider.get_cache().put_verified(metadata_url, ddo.proof['checksum'], ddo)
+    return ddo
+
+
+def _load_ddo(metadata_url, ddo_json, checksum=None, lazy=False):
+    """Parse a DDO document and remember it once its proof matches the checksum."""
+    cache = CacheProvider.get_cache()
+
+    ddo = LazyDDO() if lazy else DDO()
+    ddo.from_dict(ddo_json, trusted=_is_proven(cache, metadata_url, ddo_json))
+
+    if checksum is None or ddo.proof['checksum'] == checksum:
+        # a lazy load only checked the header, the raw services are unvalidated
+        proven = not isinstance(ddo, LazyDDO) or ddo.services_loaded
+        cache.put_verified(metadata_url, ddo.proof['checksum'], ddo, proven)
+
+    return ddo
+
+
+def fetch_code(code_path):
+    """
+    Get the op code stored separately from its template.
+
+    :param code_path: storage path of the code, e.g., ipfs cid
+    :return: str
+    """
+    ipfs_client = IPFSProvider()
+    return ipfs_client.get_bytes(code_path).decode('utf-8')
+
+
+def _load_op(metadata_url, op_json):
+    """Parse an OpTemplate document and remember it."""
+    cache = CacheProvider.get_cache()
+
+    op = OpTemplate()
+    op.from_dict(op_json, code_loader=fetch_code,
+                 trusted=_is_proven(cache, metadata_url, op_json))
+
+    cache.put_verified(metadata_url, op.proof['checksum'], op)
+
+    return op
+
+
+def resolve_asset(dt, keeper_dt_factory, lazy=False):
     """
     Resolve an asset dt to its corresponding DDO.
 
     :param dt: the asset dt to resolve, e.g., dt:ownership:<32 byte value>
     :param keeper_dt_factory: keeper instance of the dt-factory smart contract
+    :param lazy: only parse the DDO header, services are built on first access
 
     :return data: dt info on the chain
-    :return ddo: DDO of the resolved asset dt
+    :return ddo: DDO of the resolved asset dt, shared through the document
+    cache so read-only, see DDO.copy
     """
     dt_bytes = DTHelper.dt_to_id_bytes(dt)
-    data = keeper_dt_factory.get_dt_register(dt_bytes)
+    data = keeper_dt_factory.get_dt_register_cached(dt_bytes)
     if not (data and data[4]):
         return None, None
 
     metadata_url = data[4]
-    ipfs_client = IPFSProvider()
-    ddo_json = ipfs_client.get(metadata_url)
-    if not ddo_json:
-        return data, None
+    checksum = checksum_to_hex(data[2])
+    ddo = CacheProvider.get_cache().get_verified(metadata_url, checksum)
+    if ddo:
+        return data, _ready(metadata_url, ddo, lazy)
 
-    ddo = DDO()
-    ddo.from_dict(ddo_json)
+    return data, _fetch_and_load(
+        metadata_url, lambda ddo_json: _load_ddo(metadata_url, ddo_json, checksum, lazy))
 
-    return data, ddo
 
+def resolve_asset_by_url(metadata_url, checksum=None, lazy=False):
+    """
+    Resolve a DDO storage path to its DDO.
 
-def resolve_asset_by_url(metadata_url):
-    if not metadata_url.startswith('Qm'):
-        return None
+    :param metadata_url: ipfs cid of the DDO
+    :param checksum: on-chain checksum expected for the DDO, if known
+    :param lazy: only parse the DDO header, services are built on first access
 
-    ipfs_client = IPFSProvider()
-    ddo_json = ipfs_client.get(metadata_url)
-    if not ddo_json:
+    :return ddo: DDO of the storage path, shared through the document
+    cache so read-only, see DDO.copy
+    """
+    if not metadata_url.startswith('Qm'):
         return None
 
-    ddo = DDO()
-    ddo.from_dict(ddo_json)
+    if checksum is not None:
+        checksum = checksum_to_hex(checksum)
+    ddo = CacheProvider.get_cache().get_verified(metadata_url, checksum)
+    if ddo:
+        return _ready(metadata_url, ddo, lazy)
 
-    return ddo
+    return _fetch_and_load(
+        metadata_url, lambda ddo_json: _load_ddo(metadata_url, ddo_json, checksum, lazy))
 
 
 def resolve_op(tid, keeper_op_template):
@@ -58,21 +181,185 @@ def resolve_op(tid, keeper_op_template):
     :param keeper_op_template: keeper instance of the op-template smart contract
 
     :return data: tid info on the chain
-    :return op: OpTemplate of the resolved tid
+    :return op: OpTemplate of the resolved tid, shared through the document
+    cache so read-only, see OpTemplate.copy
     """
     tid_bytes = DTHelper.dt_to_id_bytes(tid)
 
-    data = keeper_op_template.get_template(tid_bytes)
+    data = keeper_op_template.get_template_cached(tid_bytes)
     if not (data and data[3]):
         return None, None
 
     metadata_url = data[3]
-    ipfs_client = IPFSProvider()
-    op_json = ipfs_client.get(metadata_url)
-    if not op_json:
-        return data, None
+    op = CacheProvider.get_cache().get_verified(metadata_url, code_loader=fetch_code)
+    if op:
+        return data, op
 
-    op = OpTemplate()
-    op.from_dict(op_json)
+    return data, _fetch_and_load(
+        metadata_url, lambda op_json: _load_op(metadata_url, op_json))
+
+
+def _resolve_batch(resolve_fn, items, max_workers):
+    """Run resolve_fn over items on a bounded thread pool, keeping input order."""
+    if not items:
+        return []
+
+    if not max_workers:
+        max_workers = IPFSProvider.get_backend().concurrency
+
+    def _resolve_one(item):
+        try:
+            data, ddo = resolve_fn(item)
+            return ResolveResult(data, ddo, None)
+        except Exception as e:
+            logger.debug(f'failed to resolve {item}: {e}')
+            return ResolveResult(None, None, e)
+
+    max_workers = max(1, min(max_workers, len(items)))
+    if max_workers == 1:
+        return [_resolve_one(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_resolve_one, items))
+
+
+def resolve_assets(dts, keeper_dt_factory, max_workers=None, lazy=False):
+    """
+    Resolve many asset dts concurrently.
+
+    :param dts: list of asset dts or their id bytes
+    :param keeper_dt_factory: keeper instance of the dt-factory smart contract
+    :param max_workers: maximum parallel resolves, the backend concurrency if None
+    :param lazy: only parse the DDO headers, services are built on first access
+
+    :return: list of ResolveResult(data, ddo, error), in the input order
+    """
+    return _resolve_batch(
+        lambda dt: resolve_asset(dt, keeper_dt_factory, lazy), list(dts), max_workers)
+
+
+def resolve_assets_by_url(metadata_urls, checksums=None, max_workers=None, lazy=False):
+    """
+    Resolve many DDO storage paths concurrently.
+
+    :param metadata_urls: list of ipfs cids
+    :param checksums: list of the on-chain checksums of the DDOs, if known
+    :param max_workers: maximum parallel resolves, the backend concurrency if None
+    :param lazy: only parse the DDO headers, services are built on first access
+
+    :return: list of ResolveResult(None, ddo, error), in the input order
+    """
+    if checksums is None:
+        checksums = [None] * len(metadata_urls)
+
+    return _resolve_batch(
+        lambda item: (None, resolve_asset_by_url(*item, lazy=lazy)),
+        list(zip(metadata_urls, checksums)), max_workers)
+
+
+async def async_fetch_document(metadata_url, ipfs_client=None):
+    """
+    Async version of fetch_document, sharing the same document cache. The
+    disk tier of the cache is read and written on the default executor.
+
+    :param metadata_url: storage path, e.g., ipfs cid
+    :param ipfs_client: AsyncIPFSProvider instance, the shared one if None
+    :return: dict or None
+    """
+    return (await _async_fetch_document(metadata_url, ipfs_client))[0]
+
+
+async def _async_fetch_document(metadata_url, ipfs_client):
+    loop = asyncio.get_running_loop()
+    cache = CacheProvider.get_cache()
+    doc = await loop.run_in_executor(None, cache.get, metadata_url)
+    if doc is not None:
+        return doc, True
+
+    if not ipfs_client:
+        ipfs_client = AsyncIPFSProvider.get_provider()
+    doc = await ipfs_client.get(metadata_url)
+    await loop.run_in_executor(None, cache.put, metadata_url, doc)
+
+    return doc, False
+
+
+async def _async_fetch_and_load(metadata_url, load_fn, ipfs_client):
+    """Async version of _fetch_and_load, load_fn runs on the default executor."""
+    loop = asyncio.get_running_loop()
+    doc, cached = await _async_fetch_document(metadata_url, ipfs_client)
+    if not doc:
+        return None
+
+    try:
+        return await loop.run_in_executor(None, load_fn, doc)
+    except Exception as e:
+        if not cached:
+            raise
+        logger.warning(f'cached {metadata_url} failed to load, fetching it again: {e}')
+
+    await loop.run_in_executor(None, CacheProvider.get_cache().discard, metadata_url)
+    doc, _ = await _async_fetch_document(metadata_url, ipfs_client)
+
+    return await loop.run_in_executor(None, load_fn, doc) if doc else None
+
+
+async def async_resolve_asset(dt, keeper_dt_factory, ipfs_client=None, lazy=False):
+    """
+    Async version of resolve_asset. The on-chain read is a blocking web3 call
+    and the parsing and verification are cpu bound, so they run on the default
+    executor while the document is fetched on the loop.
+
+    :param dt: the asset dt to resolve, e.g., dt:ownership:<32 byte value>
+    :param keeper_dt_factory: keeper instance of the dt-factory smart contract
+    :param ipfs_client: AsyncIPFSProvider instance, the shared one if None
+    :param lazy: only parse the DDO header, services are built on first access
+
+    :return data: dt info on the chain
+    :return ddo: DDO of the resolved asset dt
+    """
+    dt_bytes = DTHelper.dt_to_id_bytes(dt)
+    loop = asyncio.get_running_loop()
+    data = await loop.run_in_executor(
+        None, keeper_dt_factory.get_dt_register_cached, dt_bytes)
+    if not (data and data[4]):
+        return None, None
+
+    metadata_url = data[4]
+    checksum = checksum_to_hex(data[2])
+    ddo = await loop.run_in_executor(
+        None, CacheProvider.get_cache().get_verified, metadata_url, checksum)
+    if ddo:
+        return data, await loop.run_in_executor(None, _ready, metadata_url, ddo, lazy)
+
+    return data, await _async_fetch_and_load(
+        metadata_url, lambda ddo_json: _load_ddo(metadata_url, ddo_json, checksum, lazy),
+        ipfs_client)
+
+
+async def async_resolve_op(tid, keeper_op_template, ipfs_client=None):
+    """
+    Async version of resolve_op.
+
+    :param tid: the op tid to resolve, e.g., dt:ownership:<32 byte value>
+    :param keeper_op_template: keeper instance of the op-template smart contract
+    :param ipfs_client: AsyncIPFSProvider instance, the shared one if None
+
+    :return data: tid info on the chain
+    :return op: OpTemplate of the resolved tid
+    """
+    tid_bytes = DTHelper.dt_to_id_bytes(tid)
+    loop = asyncio.get_running_loop()
+    data = await loop.run_in_executor(
+        None, keeper_op_template.get_template_cached, tid_bytes)
+    if not (data and data[3]):
+        return None, None
+
+    metadata_url = data[3]
+    op = await loop.run_in_executor(
+        None, CacheProvider.get_cache().get_verified, metadata_url, None, fetch_code)
+    if op:
+        return data, op
 
-    return data, op
+    return data, await _async_fetch_and_load(
+        metadata_url, lambda op_json: _load_op(metadata_url, op_json), ipfs_client)
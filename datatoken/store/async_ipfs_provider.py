@@ -0,0 +1,159 @@
+"""Async IPFS provider Lib."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import asyncio
+import logging
+import threading
+import weakref
+
+from ipfshttpclient.client import DEFAULT_ADDR, DEFAULT_BASE
+from ipfshttpclient.http_common import multiaddr_to_url_data
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from datatoken.store.ipfs_provider import IPFSProvider, IPFSBackend
+from datatoken.store.codec import ENCODING_JSON, encode_document, decode_document
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncIPFSProvider:
+    """
+    Asset storage provider for asyncio applications, on the same storage
+    backend as IPFSProvider. With an ipfs daemon, it talks to the http api
+    over a pooled aiohttp session per event loop, so many in-flight requests
+    share the same keep-alive connections. Other backends, and the document
+    encoding, run on the default executor so they never block the loop.
+    """
+
+    _provider = None
+
+    def __init__(self, config=None, pool_size=None):
+        """
+        Initialize the async provider, the sessions are opened lazily.
+
+        :param config: Config instance, initializes the shared storage backend
+        if it is not yet
+        :param pool_size: maximum number of open connections per loop, the
+        client pool size if None
+        """
+        IPFSProvider.get_backend(config)
+
+        self._pool_size = pool_size
+        self._base_urls = dict()
+        # event loop -> aiohttp session, a session is bound to its loop
+        self._sessions = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_provider(config=None):
+        """Return the shared async provider, initialized from config on first use."""
+        if AsyncIPFSProvider._provider is None:
+            AsyncIPFSProvider._provider = AsyncIPFSProvider(config)
+        return AsyncIPFSProvider._provider
+
+    @staticmethod
+    def set_provider(provider):
+        """Set the shared async provider."""
+        AsyncIPFSProvider._provider = provider
+
+    def _base_url(self, pool):
+        endpoint = pool.endpoint or str(DEFAULT_ADDR)
+        base_url = self._base_urls.get(endpoint)
+        if base_url is None:
+            base_url = self._base_urls[endpoint] = multiaddr_to_url_data(
+                endpoint, DEFAULT_BASE)[0]
+        return base_url
+
+    def _get_session(self, pool):
+        if aiohttp is None:
+            raise ImportError(
+                'AsyncIPFSProvider requires aiohttp for the ipfs backend, please install it first')
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._sessions.get(loop)
+            if session is None or session.closed:
+                connector = aiohttp.TCPConnector(limit=self._pool_size or pool.pool_size)
+                session = self._sessions[loop] = aiohttp.ClientSession(connector=connector)
+        return session
+
+    async def add_bytes(self, data):
+        """
+        Add raw bytes to the storage.
+
+        :param data: bytes
+        :return hash: ipfs cid
+        """
+        backend = IPFSProvider.get_backend()
+        if not isinstance(backend, IPFSBackend):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, backend.add_bytes, data)
+
+        session = self._get_session(backend.pool)
+        form = aiohttp.FormData()
+        form.add_field('file', data, content_type='application/octet-stream')
+
+        async with session.post(f'{self._base_url(backend.pool)}add', data=form) as resp:
+            resp.raise_for_status()
+            result = await resp.json(content_type=None)
+
+        return result['Hash']
+
+    async def get_bytes(self, hash):
+        """
+        Get the raw bytes for a given cid.
+
+        :param hash: ipfs cid
+        :return: bytes
+        """
+        backend = IPFSProvider.get_backend()
+        if not isinstance(backend, IPFSBackend):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, backend.cat, hash)
+
+        session = self._get_session(backend.pool)
+        async with session.post(
+                f'{self._base_url(backend.pool)}cat', params={'arg': hash}) as resp:
+            resp.raise_for_status()
+            return await resp.read()
+
+    async def add(self, json_value, encoding=ENCODING_JSON):
+        """
+        Add asset values to the storage.
+
+        :param json_value: dict value
+        :param encoding: json (same bytes as add_json) or a compact binary encoding
+        :return hash: ipfs cid
+        """
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(None, encode_document, json_value, encoding)
+        return await self.add_bytes(data)
+
+    async def get(self, hash):
+        """
+        Get asset values for a given cid, json or binary encoded.
+
+        :param hash: ipfs cid
+        :return: dict
+        """
+        data = await self.get_bytes(hash)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, decode_document, data)
+
+    async def close(self):
+        """Close the pooled session of the running loop."""
+        with self._lock:
+            session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
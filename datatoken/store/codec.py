@@ -0,0 +1,123 @@
+"""Document codec Lib."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ENCODING_JSON = 'json'
+ENCODING_MSGPACK = 'msgpack'
+ENCODING_MSGPACK_ZSTD = 'msgpack+zstd'
+ENCODING_CBOR = 'cbor'
+ENCODING_CBOR_ZSTD = 'cbor+zstd'
+
+# binary documents start with the magic, the format and the compression byte.
+# json documents always start with '{', so both can live under the same api.
+MAGIC = b'\xd7DT'
+FORMAT_MSGPACK = 1
+FORMAT_CBOR = 2
+COMPRESSION_NONE = 0
+COMPRESSION_ZSTD = 1
+
+ENCODINGS = {
+    ENCODING_MSGPACK: (FORMAT_MSGPACK, COMPRESSION_NONE),
+    ENCODING_MSGPACK_ZSTD: (FORMAT_MSGPACK, COMPRESSION_ZSTD),
+    ENCODING_CBOR: (FORMAT_CBOR, COMPRESSION_NONE),
+    ENCODING_CBOR_ZSTD: (FORMAT_CBOR, COMPRESSION_ZSTD),
+}
+
+ZSTD_LEVEL = 10
+
+
+def _require(module, name):
+    if module is None:
+        raise ImportError(f'{name} is required for this document encoding')
+
+
+def _sort_keys(value):
+    """Rebuild nested dicts in key order, msgpack keeps the insertion order."""
+    if isinstance(value, dict):
+        return {key: _sort_keys(value[key]) for key in sorted(value)}
+    if isinstance(value, list):
+        return [_sort_keys(sub_value) for sub_value in value]
+    return value
+
+
+def encode_json(doc):
+    """Encode a document as the compact, key-sorted json used by add_json."""
+    return json.dumps(doc, sort_keys=True, indent=None,
+                      separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def encode_document(doc, encoding=ENCODING_JSON):
+    """
+    Encode a document for the storage, in a canonical form so that the same
+    document always gets the same cid.
+
+    :param doc: dict
+    :param encoding: json, msgpack, msgpack+zstd, cbor or cbor+zstd
+    :return: bytes
+    """
+    if encoding == ENCODING_JSON:
+        return encode_json(doc)
+
+    if encoding not in ENCODINGS:
+        raise ValueError(f'unknown document encoding {encoding}')
+
+    format_id, compression = ENCODINGS[encoding]
+    if format_id == FORMAT_MSGPACK:
+        _require(msgpack, 'msgpack')
+        payload = msgpack.packb(_sort_keys(doc), use_bin_type=True)
+    else:
+        _require(cbor2, 'cbor2')
+        payload = cbor2.dumps(doc, canonical=True)
+
+    if compression == COMPRESSION_ZSTD:
+        _require(zstandard, 'zstandard')
+        payload = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(payload)
+
+    return MAGIC + bytes((format_id, compression)) + payload
+
+
+def decode_document(data):
+    """
+    Decode a stored document, json or binary.
+
+    :param data: bytes
+    :return: dict
+    """
+    if not data.startswith(MAGIC):
+        return json.loads(data)
+
+    header_size = len(MAGIC) + 2
+    format_id, compression = data[len(MAGIC)], data[len(MAGIC) + 1]
+    payload = data[header_size:]
+
+    if compression == COMPRESSION_ZSTD:
+        _require(zstandard, 'zstandard')
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    elif compression != COMPRESSION_NONE:
+        raise ValueError(f'unknown document compression {compression}')
+
+    if format_id == FORMAT_MSGPACK:
+        _require(msgpack, 'msgpack')
+        return msgpack.unpackb(payload, raw=False)
+    if format_id == FORMAT_CBOR:
+        _require(cbor2, 'cbor2')
+        return cbor2.loads(payload)
+
+    raise ValueError(f'unknown document format {format_id}')
@@ -0,0 +1,503 @@
+"""Document cache Lib."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import os
+import re
+import json
+import logging
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+from datatoken.store.snapshot import (
+    snapshots_supported, dump_snapshot, is_snapshot, decode_snapshot, load_snapshot)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = '~/.dt/cache'
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+DEFAULT_CACHE_ITEMS = 4096
+PROVEN_ITEMS_RATIO = 16
+
+CID_PATTERN = re.compile(r'^(Qm[1-9A-HJ-NP-Za-km-z]{44}|b[a-z2-7]{58,})$')
+
+
+def is_cid(value):
+    """Check whether the given storage path is a content identifier."""
+    return isinstance(value, str) and bool(CID_PATTERN.match(value))
+
+
+class MemoryLRU:
+    """In-memory LRU tier for hot documents, bounded by the number of items."""
+
+    def __init__(self, max_items=DEFAULT_CACHE_ITEMS, on_evict=None):
+        self._max_items = max_items
+        self._on_evict = on_evict
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key):
+        """
+        Get a value and mark it as recently used.
+
+        :param key: cache key
+        :return: cached value or None
+        """
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """
+        Put a value, evicting the least recently used ones if needed.
+
+        :param key: cache key
+        :param value: cached value
+        """
+        if self._max_items <= 0:
+            return
+
+        evicted = []
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self._max_items:
+                evicted.append(self._items.popitem(last=False)[0])
+
+        if self._on_evict:
+            for evicted_key in evicted:
+                self._on_evict(evicted_key)
+
+    def pop(self, key):
+        """Remove a key, returning its value or None."""
+        with self._lock:
+            return self._items.pop(key, None)
+
+    def clear(self):
+        """Remove all the values."""
+        with self._lock:
+            self._items.clear()
+
+
+class DiskLRU:
+    """Disk-backed LRU tier keyed by cid, bounded by the total bytes on disk."""
+
+    def __init__(self, path, max_bytes=DEFAULT_CACHE_SIZE):
+        self._path = Path(path).expanduser().resolve()
+        self._max_bytes = max_bytes
+        self._index = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(self._path, exist_ok=True)
+        self._load_index()
+
+    @property
+    def total_bytes(self):
+        """Get the bytes currently used on disk."""
+        return self._total_bytes
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, cid):
+        return cid in self._index
+
+    def _file_path(self, cid):
+        """Shard the files by the cid suffix to keep directories small."""
+        return self._path / cid[-2:] / cid
+
+    def _load_index(self):
+        """Rebuild the lru order of a previous process from file mtimes."""
+        entries = []
+        for shard in self._path.iterdir():
+            if not shard.is_dir():
+                continue
+            for file_path in shard.iterdir():
+                if not is_cid(file_path.name):
+                    continue
+                stat = file_path.stat()
+                entries.append((stat.st_mtime, file_path.name, stat.st_size))
+
+        for _, cid, size in sorted(entries):
+            self._index[cid] = size
+            self._total_bytes += size
+
+        self._evict()
+
+    def _evict(self):
+        while self._index and self._total_bytes > self._max_bytes:
+            cid, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(self._file_path(cid))
+            except OSError:
+                pass
+            logger.debug(f'evicted {cid} from the disk cache')
+
+    def get(self, cid):
+        """
+        Get the raw bytes for a cid and mark it as recently used.
+
+        :param cid: content identifier, str
+        :return: bytes or None
+        """
+        with self._lock:
+            if cid not in self._index:
+                return None
+
+            file_path = self._file_path(cid)
+            try:
+                with open(file_path, 'rb') as file_handle:
+                    data = file_handle.read()
+                os.utime(file_path)
+            except OSError:
+                self._total_bytes -= self._index.pop(cid)
+                return None
+
+            self._index.move_to_end(cid)
+            return data
+
+    def put(self, cid, data, replace=False):
+        """
+        Store the raw bytes for a cid, evicting old entries beyond the budget.
+
+        :param cid: content identifier, str
+        :param data: bytes
+        :param replace: overwrite the bytes already stored for the cid
+        """
+        if len(data) > self._max_bytes:
+            return
+
+        with self._lock:
+            if cid in self._index:
+                if not replace:
+                    self._index.move_to_end(cid)
+                    return
+                self._total_bytes -= self._index.pop(cid)
+
+            file_path = self._file_path(cid)
+            os.makedirs(file_path.parent, exist_ok=True)
+            tmp_path = file_path.with_name(
+                f'.{cid}.{threading.get_ident()}.tmp')
+            with open(tmp_path, 'wb') as file_handle:
+                file_handle.write(data)
+            os.replace(tmp_path, file_path)
+
+            self._index[cid] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def discard(self, cid):
+        """Remove the file of a cid, if any."""
+        with self._lock:
+            size = self._index.pop(cid, None)
+            if size is None:
+                return
+            self._total_bytes -= size
+            try:
+                os.remove(self._file_path(cid))
+            except OSError:
+                pass
+
+    def clear(self):
+        """Remove all the files."""
+        with self._lock:
+            for cid in self._index:
+                try:
+                    os.remove(self._file_path(cid))
+                except OSError:
+                    pass
+            self._index.clear()
+            self._total_bytes = 0
+
+
+class DocCache:
+    """
+    Content-addressed cache for the off-chain documents. A cid never changes
+    its content, so the entries never go stale and only need to be evicted.
+    Once a document is verified, the disk tier keeps a binary snapshot of its
+    object instead, reloaded by only recomputing the proof checksum when the
+    cid is still known as proven. The cache is shared by the resolver threads,
+    a lock keeps the verified objects in step with the memory tier.
+    """
+
+    def __init__(self, cache_path=None, max_bytes=DEFAULT_CACHE_SIZE,
+                 max_items=DEFAULT_CACHE_ITEMS, snapshots=True):
+        """
+        Initialize the document cache.
+
+        :param cache_path: directory of the disk tier, memory only if None
+        :param max_bytes: byte budget of the disk tier
+        :param max_items: item budget of the memory tier
+        :param snapshots: store the verified objects as snapshots on disk,
+        requires msgpack
+        """
+        # reentrant, the memory tier evicts through _drop_verified while held
+        self._lock = threading.RLock()
+        self._memory = MemoryLRU(max_items, on_evict=self._drop_verified)
+        self._disk = None
+        if cache_path and max_bytes > 0:
+            self._disk = DiskLRU(cache_path, max_bytes)
+
+        # cid -> (proof checksum, parsed and verified object)
+        self._verified = dict()
+        # cid -> proof checksum of the documents verified once, kept longer
+        # than the objects so that a reload can take the trusted path
+        self._proven = MemoryLRU(max_items * PROVEN_ITEMS_RATIO)
+        self._snapshots = snapshots and self._disk is not None and snapshots_supported()
+        if snapshots and self._disk is not None and not self._snapshots:
+            logger.warning('msgpack is not installed, the disk cache keeps json documents only')
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.verified_hits = 0
+        self.snapshot_hits = 0
+
+    def _drop_verified(self, cid):
+        with self._lock:
+            self._verified.pop(cid, None)
+
+    def get(self, cid):
+        """
+        Get a document for a given cid.
+
+        :param cid: content identifier, str
+        :return: dict or None
+        """
+        doc = self._memory.get(cid)
+        if doc is not None:
+            with self._lock:
+                self.hits += 1
+            return doc
+
+        if self._disk is not None:
+            data = self._disk.get(cid)
+            doc = self._decode(cid, data) if data is not None else None
+            if doc is not None:
+                self._promote(cid, doc)
+                return doc
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _promote(self, cid, doc):
+        """Move a json document read from the disk tier to the memory tier."""
+        with self._lock:
+            self.disk_hits += 1
+            # the file may have been changed since the cid was proven, the
+            # next load recomputes the checksum through the full validation
+            self._proven.pop(cid)
+            self._memory.put(cid, doc)
+
+    def _decode(self, cid, data):
+        """Decode the bytes of the disk tier, a corrupt file is dropped as a miss."""
+        try:
+            if is_snapshot(data):
+                doc = decode_snapshot(data)[1]
+            else:
+                doc = json.loads(data)
+        except (ValueError, TypeError) as e:
+            doc = None
+            logger.debug(f'failed to decode {cid} from the disk cache: {e}')
+
+        if not isinstance(doc, dict):
+            self._disk.discard(cid)
+            return None
+
+        return doc
+
+    def put(self, cid, doc):
+        """
+        Put a document for a given cid.
+
+        :param cid: content identifier, str
+        :param doc: dict
+        """
+        if not is_cid(cid) or doc is None:
+            return
+
+        self._memory.put(cid, doc)
+        if self._disk is not None:
+            self._disk.put(cid, json.dumps(doc).encode('utf-8'))
+
+    def get_verified(self, cid, checksum=None, code_loader=None):
+        """
+        Get the already parsed and verified object for a given cid. It is
+        shared by all the callers, so it is read-only and its values must not
+        be modified either, see DDO.copy/OpTemplate.copy.
+
+        :param cid: content identifier, str
+        :param checksum: expected proof checksum, any if None
+        :param code_loader: function loading the op code of a template
+        reloaded from its snapshot
+        :return: DDO/OpTemplate or None
+        """
+        with self._lock:
+            entry = self._verified.get(cid)
+            if entry is not None and (checksum is None or entry[0] == checksum):
+                # keep the document hot, the verified object lives as long as it does
+                self._memory.get(cid)
+
+        if entry is None:
+            entry = self._load_snapshot(cid, code_loader)
+
+        if entry is None or (checksum is not None and entry[0] != checksum):
+            return None
+
+        with self._lock:
+            self.verified_hits += 1
+        return entry[1]
+
+    def _load_snapshot(self, cid, code_loader):
+        """
+        Reload the verified object of a cid from its snapshot on disk. A json
+        document found instead is promoted to the memory tier as by get.
+        """
+        if not self._snapshots or cid in self._memory:
+            return None
+
+        data = self._disk.get(cid)
+        if data is None:
+            return None
+
+        if not is_snapshot(data):
+            doc = self._decode(cid, data)
+            if doc is not None:
+                self._promote(cid, doc)
+            return None
+
+        try:
+            obj = load_snapshot(data, self._proven.get(cid), code_loader)
+        except Exception as e:
+            logger.debug(f'failed to load the snapshot of {cid}: {e}')
+            self._disk.discard(cid)
+            return None
+
+        checksum = obj.proof['checksum']
+        obj.freeze()
+        doc = obj.to_dict()
+        with self._lock:
+            # another thread may have loaded the same snapshot meanwhile
+            entry = self._verified.get(cid)
+            if entry is None or entry[0] != checksum:
+                self._proven.put(cid, checksum)
+                self._memory.put(cid, doc)
+                self._verified[cid] = entry = (checksum, obj)
+            self.snapshot_hits += 1
+
+        return entry
+
+    def put_verified(self, cid, checksum, obj, proven=True):
+        """
+        Remember an object parsed from the cached document of a given cid,
+        after its proof checksum has been verified.
+
+        :param cid: content identifier, str
+        :param checksum: verified proof checksum, str
+        :param obj: DDO/OpTemplate
+        :param proven: the whole document has been checked against the proof,
+        only then it may be loaded again without revalidation
+        """
+        # every caller now gets the same object, none may modify it
+        obj.freeze()
+        if proven:
+            self._proven.put(cid, checksum)
+            if self._snapshots and is_cid(cid):
+                self._disk.put(cid, dump_snapshot(obj), replace=True)
+        with self._lock:
+            # an object whose document was evicted meanwhile would never be dropped
+            if cid in self._memory:
+                self._verified[cid] = (checksum, obj)
+
+    def get_proven(self, cid):
+        """
+        Get the proof checksum of the document at a given cid if it has been
+        verified before, the document can then be loaded without revalidation.
+
+        :param cid: content identifier, str
+        :return: str or None
+        """
+        return self._proven.get(cid)
+
+    def discard(self, cid):
+        """
+        Remove the document of a given cid from both tiers, e.g., when its
+        cached copy fails to load.
+
+        :param cid: content identifier, str
+        """
+        with self._lock:
+            self._memory.pop(cid)
+            self._verified.pop(cid, None)
+            self._proven.pop(cid)
+        if self._disk is not None:
+            self._disk.discard(cid)
+
+    def clear(self):
+        """Remove all the documents from both tiers."""
+        with self._lock:
+            self._verified.clear()
+            self._proven.clear()
+            self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def stats(self):
+        """Get the hit/miss counters and the tier usage."""
+        with self._lock:
+            counters = {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'verified_hits': self.verified_hits,
+                'snapshot_hits': self.snapshot_hits,
+                'verified_items': len(self._verified),
+                'proven_items': len(self._proven),
+                'memory_items': len(self._memory)
+            }
+
+        return {
+            **counters,
+            'disk_items': len(self._disk) if self._disk is not None else 0,
+            'disk_bytes': self._disk.total_bytes if self._disk is not None else 0
+        }
+
+
+class CacheProvider:
+    """Provides the process-wide document cache."""
+
+    _cache = None
+
+    @staticmethod
+    def init_cache(cache_path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_CACHE_SIZE,
+                   max_items=DEFAULT_CACHE_ITEMS):
+        """Create the document cache with the given budgets."""
+        CacheProvider._cache = DocCache(cache_path, max_bytes, max_items)
+
+    @staticmethod
+    def get_cache(config=None):
+        """Return the document cache, initialized from config on first use."""
+        if CacheProvider._cache is None:
+            if config:
+                CacheProvider.init_cache(
+                    config.cache_path, config.cache_size, config.cache_items)
+            else:
+                CacheProvider.init_cache()
+        return CacheProvider._cache
+
+    @staticmethod
+    def set_cache(cache):
+        """Set the document cache instance."""
+        CacheProvider._cache = cache
@@ -2,37 +2,210 @@
 # Copyright 2021 The DataToken Authors
 # SPDX-License-Identifier: LGPL-2.1-only
 
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+
 import ipfshttpclient
 
+from datatoken.store.storage_backend import StorageBackend, BACKEND_LOCAL
+from datatoken.store.local_blockstore import LocalBlockstore
+from datatoken.store.codec import ENCODING_JSON, encode_document, decode_document
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 8
+
+
+class IPFSClientPool:
+    """Thread-safe pool of long-lived ipfs clients with keep-alive sessions."""
+
+    def __init__(self, endpoint=None, pool_size=DEFAULT_POOL_SIZE):
+        """
+        Initialize the pool, clients are connected lazily.
+
+        :param endpoint: ipfs api multiaddr, the client default if None
+        :param pool_size: maximum number of open clients
+        """
+        self._endpoint = endpoint
+        self._pool_size = pool_size
+        self._idle = queue.LifoQueue()
+        self._clients = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def endpoint(self):
+        """Get the ipfs api endpoint."""
+        return self._endpoint
+
+    @property
+    def pool_size(self):
+        """Get the maximum number of open clients."""
+        return self._pool_size
+
+    def _connect(self):
+        if self._endpoint:
+            return ipfshttpclient.connect(self._endpoint, session=True)
+        return ipfshttpclient.connect(session=True)
+
+    @contextmanager
+    def client(self):
+        """Borrow a client, blocking while all of them are in use."""
+        if self._closed:
+            raise AssertionError('the ipfs client pool is closed.')
+
+        try:
+            ipfs_client = self._idle.get_nowait()
+        except queue.Empty:
+            ipfs_client = None
+            with self._lock:
+                if len(self._clients) < self._pool_size:
+                    ipfs_client = self._connect()
+                    self._clients.append(ipfs_client)
+            if ipfs_client is None:
+                ipfs_client = self._idle.get()
+
+        try:
+            yield ipfs_client
+        finally:
+            self._idle.put(ipfs_client)
+
+    def close(self):
+        """Close all the clients and their sessions."""
+        with self._lock:
+            self._closed = True
+            for ipfs_client in self._clients:
+                try:
+                    ipfs_client.close()
+                except Exception as e:
+                    logger.debug(f'failed to close ipfs client: {e}')
+            self._clients = []
+            self._idle = queue.LifoQueue()
+
+
+class IPFSBackend(StorageBackend):
+    """Storage backend on a running ipfs daemon, through the client pool."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    @property
+    def concurrency(self):
+        return self.pool.pool_size
+
+    def add_bytes(self, data):
+        with self.pool.client() as ipfs_client:
+            return ipfs_client.add_bytes(data)
+
+    def cat(self, cid):
+        with self.pool.client() as ipfs_client:
+            return ipfs_client.cat(cid)
+
+    def close(self):
+        self.pool.close()
+
+
 class IPFSProvider:
     """Asset storage provider."""
 
+    _pool = None
+    _backend = None
+    _pool_lock = threading.Lock()
+
     def __init__(self, config=None):
-        """Initialize the ipfs provider."""
-        if config:
-            self.ipfs_client = ipfshttpclient.connect(config.ipfs_endpoint)
-        else:
-            self.ipfs_client = ipfshttpclient.connect()
+        """Initialize the provider on the shared storage backend."""
+        self.backend = IPFSProvider.get_backend(config)
+
+    @staticmethod
+    def init_pool(endpoint=None, pool_size=DEFAULT_POOL_SIZE):
+        """Replace the shared client pool, closing the previous one."""
+        with IPFSProvider._pool_lock:
+            if IPFSProvider._pool:
+                IPFSProvider._pool.close()
+            IPFSProvider._pool = IPFSClientPool(endpoint, pool_size)
+            if isinstance(IPFSProvider._backend, IPFSBackend):
+                IPFSProvider._backend = None
+
+    @staticmethod
+    def get_pool(config=None):
+        """Return the shared client pool, initialized from config on first use."""
+        if IPFSProvider._pool is None:
+            with IPFSProvider._pool_lock:
+                if IPFSProvider._pool is None:
+                    if config:
+                        IPFSProvider._pool = IPFSClientPool(
+                            config.ipfs_endpoint, config.ipfs_pool_size)
+                    else:
+                        IPFSProvider._pool = IPFSClientPool()
+        return IPFSProvider._pool
+
+    @staticmethod
+    def close_pool():
+        """Close the shared client pool, a new one is created on next use."""
+        with IPFSProvider._pool_lock:
+            if IPFSProvider._pool:
+                IPFSProvider._pool.close()
+            IPFSProvider._pool = None
+            if isinstance(IPFSProvider._backend, IPFSBackend):
+                IPFSProvider._backend = None
+
+    @staticmethod
+    def get_backend(config=None):
+        """Return the shared storage backend selected by config, ipfs by default."""
+        if IPFSProvider._backend is None:
+            if config and config.storage_backend == BACKEND_LOCAL:
+                IPFSProvider._backend = LocalBlockstore(config.storage_path)
+            else:
+                IPFSProvider._backend = IPFSBackend(
+                    IPFSProvider.get_pool(config))
+        return IPFSProvider._backend
+
+    @staticmethod
+    def set_backend(backend):
+        """Set the shared storage backend."""
+        IPFSProvider._backend = backend
 
-    def add(self, json):
+    def add(self, json_value, encoding=ENCODING_JSON):
         """
         Add asset values to the storage.
 
-        :param json: dict value
+        :param json_value: dict value
+        :param encoding: json (same bytes as add_json) or a compact binary encoding
         :return hash: ipfs cid
         """
-        hash = self.ipfs_client.add_json(json)
+        data = encode_document(json_value, encoding)
+        hash = self.backend.add_bytes(data)
         return hash
 
     def get(self, hash):
         """
-        Get asset values for a given cid.
+        Get asset values for a given cid, json or binary encoded.
 
         :param hash: ipfs cid
         :return: dict
         """
-        return self.ipfs_client.get_json(hash)
+        return decode_document(self.backend.cat(hash))
+
+    def add_bytes(self, data):
+        """
+        Add raw bytes, e.g., op code, to the storage.
+
+        :param data: bytes
+        :return hash: ipfs cid
+        """
+        return self.backend.add_bytes(data)
+
+    def get_bytes(self, hash):
+        """
+        Get the raw bytes for a given cid.
+
+        :param hash: ipfs cid
+        :return: bytes
+        """
+        return self.backend.cat(hash)
 
     def close(self):
-        """Disable the provider"""
-        self.ipfs_client.close()
+        """Disable the provider, the shared backend stays open for reuse."""
+        self.backend = None
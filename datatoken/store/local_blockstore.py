@@ -0,0 +1,122 @@
+"""Local blockstore Lib."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import os
+import mmap
+import hashlib
+import logging
+import threading
+from pathlib import Path
+
+from datatoken.store.storage_backend import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORAGE_PATH = '~/.dt/blocks'
+
+B58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+# multihash prefix of a sha2-256 digest of 32 bytes
+SHA256_MULTIHASH = b'\x12\x20'
+
+
+def _b58encode(data):
+    value = int.from_bytes(data, 'big')
+    encoded = ''
+    while value:
+        value, mod = divmod(value, 58)
+        encoded = B58_ALPHABET[mod] + encoded
+
+    pad = len(data) - len(data.lstrip(b'\0'))
+    return B58_ALPHABET[0] * pad + encoded
+
+
+def compute_cid(data):
+    """
+    Compute a CIDv0-style identifier, base58(sha2-256 multihash), of raw bytes.
+    It addresses the bytes themselves, not an ipfs unixfs dag, so the value is
+    only meaningful within local blockstores.
+
+    :param data: bytes
+    :return: str
+    """
+    return _b58encode(SHA256_MULTIHASH + hashlib.sha256(data).digest())
+
+
+class LocalBlockstore(StorageBackend):
+    """
+    Content-addressed blockstore on the local filesystem. Blocks are sharded
+    into directories by the next-to-last two characters of their cid, the
+    same layout as the ipfs flatfs datastore, and read with memory mapping.
+    """
+
+    concurrency = os.cpu_count() or 1
+
+    def __init__(self, path=DEFAULT_STORAGE_PATH, verify=False):
+        """
+        Initialize the blockstore.
+
+        :param path: root directory of the blocks
+        :param verify: recompute the cid of every block that is read
+        """
+        self._path = Path(path).expanduser().resolve()
+        self._verify = verify
+        os.makedirs(self._path, exist_ok=True)
+
+    @property
+    def path(self):
+        """Get the root directory of the blocks."""
+        return self._path
+
+    def _block_path(self, cid):
+        if not cid or os.sep in cid or cid.startswith('.'):
+            raise ValueError(f'{cid} is not a valid block id')
+        return self._path / cid[-3:-1] / cid
+
+    def add_bytes(self, data):
+        """
+        Store the given bytes, a no-op when the block already exists.
+
+        :param data: bytes
+        :return: content identifier, str
+        """
+        cid = compute_cid(data)
+        block_path = self._block_path(cid)
+        if block_path.exists():
+            return cid
+
+        os.makedirs(block_path.parent, exist_ok=True)
+        tmp_path = block_path.with_name(f'.{cid}.{threading.get_ident()}.tmp')
+        with open(tmp_path, 'wb') as file_handle:
+            file_handle.write(data)
+        os.replace(tmp_path, block_path)
+
+        logger.debug(f'stored block {cid} of {len(data)} bytes')
+        return cid
+
+    def cat(self, cid):
+        """
+        Get the bytes stored for a given cid.
+
+        :param cid: content identifier, str
+        :return: bytes
+        """
+        block_path = self._block_path(cid)
+        if not block_path.exists():
+            raise FileNotFoundError(f'block {cid} is not found')
+
+        with open(block_path, 'rb') as file_handle:
+            if os.fstat(file_handle.fileno()).st_size == 0:
+                data = b''
+            else:
+                with mmap.mmap(file_handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    data = mapped[:]
+
+        if self._verify and compute_cid(data) != cid:
+            raise AssertionError(f'block {cid} is corrupted')
+
+        return data
+
+    def has(self, cid):
+        """Check whether a block exists."""
+        return self._block_path(cid).exists()
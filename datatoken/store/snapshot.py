@@ -0,0 +1,257 @@
+"""Snapshot Lib."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import sys
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from datatoken.core.ddo import DDO
+from datatoken.core.operator import OpTemplate
+from datatoken.core.utils import calc_checksum, CHECKSUM_LEGACY
+
+# snapshots start with their own magic, never taken for a stored document.
+# the header carries the version and the object kind.
+SNAPSHOT_MAGIC = b'\xd7DS'
+SNAPSHOT_VERSION = 2
+HEADER_SIZE = len(SNAPSHOT_MAGIC) + 2
+
+KIND_DDO = 1
+KIND_OP_TEMPLATE = 2
+
+# descriptor entries, a dt reference is stored once in the string table
+ENTRY_VALUE = 0
+ENTRY_TEMPLATE = 1
+ENTRY_WORKFLOW = 2
+
+
+def snapshots_supported():
+    """Check whether the snapshots can be used, i.e., msgpack is installed."""
+    return msgpack is not None
+
+
+def _require_msgpack():
+    if msgpack is None:
+        raise ImportError('msgpack is required for the snapshots')
+
+
+class _StringTable:
+    """Stores each identifier once, referenced by its position."""
+
+    def __init__(self):
+        self.strings = []
+        self._refs = {}
+
+    def ref(self, value):
+        if value is None:
+            return None
+
+        ref = self._refs.get(value)
+        if ref is None:
+            ref = self._refs[value] = len(self.strings)
+            self.strings.append(value)
+        return ref
+
+
+def _encode_descriptor(descriptor, table):
+    """
+    Store the template and the workflow, which are keyed by dts, through the
+    string table. The entries keep their order, the legacy checksum depends on it.
+    """
+    if not isinstance(descriptor, dict):
+        return [False, descriptor]
+
+    entries = []
+    for key, value in descriptor.items():
+        if key == 'template' and isinstance(value, str):
+            entries.append([key, ENTRY_TEMPLATE, table.ref(value)])
+        elif key == 'workflow' and isinstance(value, dict):
+            entries.append([key, ENTRY_WORKFLOW,
+                            [[table.ref(dt), agreement] for dt, agreement in value.items()]])
+        else:
+            entries.append([key, ENTRY_VALUE, value])
+
+    return [True, entries]
+
+
+def _decode_descriptor(value, strings):
+    is_dict, entries = value
+    if not is_dict:
+        return entries
+
+    descriptor = {}
+    for key, entry, entry_value in entries:
+        if entry == ENTRY_TEMPLATE:
+            entry_value = strings[entry_value]
+        elif entry == ENTRY_WORKFLOW:
+            entry_value = {strings[dt]: agreement for dt, agreement in entry_value}
+        descriptor[key] = entry_value
+
+    return descriptor
+
+
+def _encode_ddo(ddo, table):
+    values = ddo.to_dict()
+    child_dts = values['child_dts']
+
+    return [
+        table.ref(values['dt']),
+        values['creator'],
+        values['metadata'],
+        [table.ref(dt) for dt in child_dts] if child_dts is not None else None,
+        [[service['index'], service['endpoint'],
+          _encode_descriptor(service['descriptor'], table),
+          service['attributes']] for service in values.get('services') or []],
+        values['proof']
+    ]
+
+
+def _decode_ddo(body, strings):
+    dt, creator, metadata, child_dts, services, proof = body
+
+    values = {
+        'dt': strings[dt],
+        'creator': creator,
+        'metadata': metadata,
+        'child_dts': [strings[ref] for ref in child_dts] if child_dts is not None else None,
+        'proof': proof
+    }
+    if services:
+        values['services'] = [{
+            'index': index,
+            'endpoint': endpoint,
+            'descriptor': _decode_descriptor(descriptor, strings),
+            'attributes': attributes
+        } for index, endpoint, descriptor, attributes in services]
+    else:
+        values['services'] = []
+
+    return values
+
+
+def _encode_op_template(op, table):
+    values = op.to_dict()
+    return [table.ref(values['tid']), values['creator'], values['metadata'],
+            values.get('operation'), values.get('code'), values['params'], values['proof']]
+
+
+def _decode_op_template(body, strings):
+    tid, creator, metadata, operation, code, params, proof = body
+
+    values = {
+        'tid': strings[tid],
+        'creator': creator,
+        'metadata': metadata,
+        'params': params,
+        'proof': proof
+    }
+    if code is not None:
+        values['code'] = code
+    else:
+        values['operation'] = operation
+
+    return values
+
+
+def dump_snapshot(obj):
+    """
+    Serialize a DDO or OpTemplate into a compact binary snapshot.
+
+    :param obj: DDO/OpTemplate, with its services built if it is a lazy DDO
+    :return: bytes
+    """
+    _require_msgpack()
+
+    table = _StringTable()
+    if isinstance(obj, DDO):
+        kind = KIND_DDO
+        body = _encode_ddo(obj, table)
+    elif isinstance(obj, OpTemplate):
+        kind = KIND_OP_TEMPLATE
+        body = _encode_op_template(obj, table)
+    else:
+        raise TypeError(f'cannot snapshot {type(obj).__name__}')
+
+    payload = msgpack.packb([table.strings, body], use_bin_type=True)
+
+    return SNAPSHOT_MAGIC + bytes((SNAPSHOT_VERSION, kind)) + payload
+
+
+def is_snapshot(data):
+    """Check whether the given bytes are a snapshot."""
+    return isinstance(data, (bytes, bytearray, memoryview)) and bytes(
+        data[:len(SNAPSHOT_MAGIC)]) == SNAPSHOT_MAGIC
+
+
+def decode_snapshot(data):
+    """
+    Decode a snapshot into the document dict of its object, unverified.
+
+    :param data: bytes, from dump_snapshot
+    :return: kind, dict
+    """
+    _require_msgpack()
+
+    if not is_snapshot(data) or len(data) < HEADER_SIZE:
+        raise ValueError('not a snapshot')
+
+    version, kind = data[len(SNAPSHOT_MAGIC):HEADER_SIZE]
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f'unknown snapshot version {version}')
+
+    strings, body = msgpack.unpackb(memoryview(data)[HEADER_SIZE:], raw=False)
+    strings = [sys.intern(value) for value in strings]
+
+    if kind == KIND_DDO:
+        return kind, _decode_ddo(body, strings)
+    if kind == KIND_OP_TEMPLATE:
+        return kind, _decode_op_template(body, strings)
+
+    raise ValueError(f'unknown snapshot kind {kind}')
+
+
+def _proof_checksum(obj):
+    """Recompute the proof checksum of an object built from trusted values."""
+    proof = obj.proof
+    scheme = proof.get('scheme', CHECKSUM_LEGACY)
+    if isinstance(obj, DDO):
+        checksum, leaves = obj._calc_proof(
+            [service.to_dict() for service in obj.services], scheme)
+        if proof.get('leaves') != leaves:
+            return None
+        return checksum
+
+    return calc_checksum(obj._descriptor(), scheme)
+
+
+def load_snapshot(data, proven=None, code_loader=None):
+    """
+    Rebuild the object of a snapshot. The bytes themselves are never trusted:
+    given the checksum the cid was proven with, the object is rebuilt without
+    validation and only its proof checksum is recomputed against it, otherwise
+    the object is fully validated.
+
+    :param data: bytes, from dump_snapshot
+    :param proven: proof checksum of the fully verified document at the same cid, str
+    :param code_loader: function loading the op code of a template from its path
+    :return: DDO/OpTemplate
+    """
+    kind, values = decode_snapshot(data)
+
+    obj = DDO() if kind == KIND_DDO else OpTemplate(code_loader=code_loader)
+    if proven is None:
+        obj.from_dict(values)
+        return obj
+
+    proof = values.get('proof')
+    if not isinstance(proof, dict) or proof.get('checksum') != proven:
+        raise AssertionError(f'snapshot does not match the proven checksum')
+
+    obj.from_dict(values, trusted=True)
+    if _proof_checksum(obj) != proven:
+        raise AssertionError(f'snapshot does not match the proven checksum')
+
+    return obj
@@ -0,0 +1,38 @@
+"""Storage backend Lib."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+BACKEND_IPFS = 'ipfs'
+BACKEND_LOCAL = 'local'
+
+
+class StorageBackend:
+    """
+    Content-addressed storage interface behind IPFSProvider. Backends only deal
+    with raw bytes, the provider takes care of the document encoding.
+    """
+
+    # suggested number of concurrent requests for batch operations
+    concurrency = 1
+
+    def add_bytes(self, data):
+        """
+        Store the given bytes.
+
+        :param data: bytes
+        :return: content identifier, str
+        """
+        raise NotImplementedError
+
+    def cat(self, cid):
+        """
+        Get the bytes stored for a given cid.
+
+        :param cid: content identifier, str
+        :return: bytes
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Release the resources held by the backend."""
+        pass
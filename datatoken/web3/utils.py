@@ -3,18 +3,26 @@
 #  SPDX-License-Identifier: Apache-2.0
 
 import logging
+import functools
 from collections import namedtuple
 from decimal import Decimal
 
 from enforce_typing import enforce_types
 from eth_keys import keys
-from eth_utils import big_endian_to_int, decode_hex
+from eth_utils import big_endian_to_int, decode_hex, keccak, to_checksum_address
 from datatoken.web3.constants import DEFAULT_NETWORK_NAME, NETWORK_NAME_MAP
 from datatoken.web3.web3_provider import Web3Provider
 from datatoken.web3.web3_overrides.signature import SignatureFix
 
+try:
+    import coincurve
+except ImportError:
+    coincurve = None
+
 Signature = namedtuple("Signature", ("v", "r", "s"))
 
+SIGNATURE_CACHE_SIZE = 16384
+
 logger = logging.getLogger(__name__)
 
 
@@ -136,6 +144,70 @@ def personal_ec_recover(message, signed_message):
     return ec_recover(prefixed_hash, signed_message)
 
 
+def hash_personal_message(text):
+    """
+    Hash a text with the ethereum prefix, as add_ethereum_prefix_and_hash_msg
+    does, without any web3 instance.
+    :param text: str
+    :return: bytes
+    """
+    return keccak(text=f"\x19Ethereum Signed Message:\n{len(text)}{text}")
+
+
+@functools.lru_cache(maxsize=SIGNATURE_CACHE_SIZE)
+def _recover_personal_signer(message, signed_message):
+    signature = decode_hex(signed_message) if isinstance(
+        signed_message, str) else bytes(signed_message)
+    assert len(signature) == 65, (
+        f"invalid signature, " f"expecting bytes of length 65, got {len(signature)}"
+    )
+
+    v = signature[-1]
+    if v != 27 and v != 28:
+        v = 27 + v % 2
+    msg_hash = hash_personal_message(message)
+
+    if coincurve is not None:
+        public_key = coincurve.PublicKey.from_signature_and_message(
+            signature[:64] + bytes((v - 27,)), msg_hash, hasher=None)
+        return to_checksum_address(keccak(public_key.format(compressed=False)[1:])[-20:])
+
+    signature_object = keys.Signature(vrs=(
+        v - 27, big_endian_to_int(signature[:32]), big_endian_to_int(signature[32:64])))
+    public_key = signature_object.recover_public_key_from_msg_hash(msg_hash)
+
+    return public_key.to_checksum_address()
+
+
+def recover_personal_signer(message, signed_message):
+    """
+    Local version of personal_ec_recover, needing no web3 instance. The
+    recovery goes through libsecp256k1 when coincurve is installed, eth_keys
+    otherwise. The signers of the recent (message, signature) pairs are cached.
+    :param message: signed text, str
+    :param signed_message: signature, hex str or bytes
+    :return: checksum address, str
+    """
+    return _recover_personal_signer(message, signed_message)
+
+
+def recover_personal_signers(items):
+    """
+    Recover the signers of many (message, signature) pairs.
+    :param items: list of (message, signed_message)
+    :return: list of checksum addresses, None for the invalid signatures
+    """
+    signers = []
+    for message, signed_message in items:
+        try:
+            signers.append(_recover_personal_signer(message, signed_message))
+        except Exception as e:
+            logger.debug(f"failed to recover signer: {e}")
+            signers.append(None)
+
+    return signers
+
+
 @enforce_types
 def get_ether_balance(address: str) -> int:
     """
@@ -0,0 +1,65 @@
+"""Benchmark: constraint checks per agreement, re-walked against compiled once."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import copy
+import timeit
+
+from datatoken.csp.agreement import ConstraintChecker
+
+
+def walk_fulfills(required_constraint, fulfill_constraint, terminal=False):
+    if set(required_constraint.keys()) != set(fulfill_constraint.keys()):
+        return False
+
+    for key, value in fulfill_constraint.items():
+        required = required_constraint[key]
+        if isinstance(value, dict):
+            if not isinstance(required, dict):
+                return False
+
+            if required and set(value.keys()) != set(required.keys()):
+                return False
+
+            for sub_key, sub_value in value.items():
+                if terminal and sub_value == None:
+                    return False
+
+                sub_required = required.get(sub_key)
+                if sub_required and sub_value != sub_required:
+                    return False
+        else:
+            if (terminal and value == None) or (required and value != required):
+                return False
+
+    return True
+
+
+def make_constraint(width, depth):
+    """A constraint of width args, each holding width sub args, the values depth deep."""
+    def _value(level):
+        if level == 0:
+            return 1
+        return {f'k{i}': _value(level - 1) for i in range(2)}
+
+    return {f'arg{i}': {f'sub{j}': _value(depth) for j in range(width)} for i in range(width)}
+
+
+def bench(name, constraint, number):
+    required = constraint
+    fulfill = copy.deepcopy(constraint)
+    checker = ConstraintChecker(required)
+    assert walk_fulfills(required, fulfill, True) and checker.check(fulfill, True)
+
+    print(f'{name}')
+    for label, fn in [('walked', lambda: walk_fulfills(required, fulfill, True)),
+                      ('compiled', lambda: checker.check(fulfill, True)),
+                      ('compile', lambda: ConstraintChecker(required))]:
+        seconds = timeit.timeit(fn, number=number)
+        print(f'    {label:<10} {seconds / number * 1e6:>10.2f} us/check')
+
+
+if __name__ == '__main__':
+    for width, depth in [(2, 0), (8, 0), (32, 0), (8, 3), (32, 3)]:
+        bench(f'width {width}, depth {depth}', make_constraint(width, depth),
+              number=max(100, 200000 // (width * width)))
@@ -0,0 +1,66 @@
+"""Benchmark: streaming checksum schemes against the original sort/dump/replace pipeline."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import copy
+import json
+import hashlib
+import timeit
+
+from datatoken.core.utils import calc_checksum, CHECKSUM_LEGACY, CHECKSUM_CANONICAL
+
+
+def make_ddo(num_children, num_services=2):
+    child_dts = [f'dt:ownership:{i:064x}' for i in range(num_children)]
+    workflow = {}
+    for dt in child_dts:
+        workflow[dt] = {'service': 'sid0', 'constraint': {
+            'arg1': 1, 'arg2': {'lr': 0.01, 'epochs': 10}}}
+
+    return {
+        'dt': f'dt:ownership:{"ab" * 32}',
+        'creator': '0x' + 'cd' * 20,
+        'metadata': {'main': {'type': 'Dataset', 'name': 'data union',
+                              'desc': 'benchmark union ' * 4}},
+        'child_dts': child_dts,
+        'services': [{'index': f'sid{i}', 'endpoint': 'ip:port',
+                      'descriptor': {'workflow': copy.deepcopy(workflow)},
+                      'attributes': {'price': 10 * i, 'op_name': 'federated'}} for i in range(num_services)]
+    }
+
+
+def original_checksum(seed):
+    def _sort_dict(dict_value: dict):
+        dict_value = dict(sorted(dict_value.items(), reverse=False))
+
+        for key, value in dict_value.items():
+            if isinstance(value, dict):
+                value = _sort_dict(value)
+                dict_value[key] = value
+            elif isinstance(value, list):
+                for index, sub_value in enumerate(value):
+                    if isinstance(sub_value, dict):
+                        sub_value = _sort_dict(sub_value)
+                        value[index] = sub_value
+
+        return dict_value
+
+    return hashlib.sha3_256((json.dumps(_sort_dict(seed)).replace(
+        " ", "")).encode('utf-8')).hexdigest()
+
+
+def bench(name, doc, number):
+    assert calc_checksum(doc, CHECKSUM_LEGACY) == original_checksum(copy.deepcopy(doc))
+
+    print(f'{name}')
+    for label, fn in [('original', original_checksum),
+                      (CHECKSUM_LEGACY, lambda d: calc_checksum(d, CHECKSUM_LEGACY)),
+                      (CHECKSUM_CANONICAL, lambda d: calc_checksum(d, CHECKSUM_CANONICAL))]:
+        seconds = timeit.timeit(lambda: fn(doc), number=number)
+        print(f'    {label:<10} {seconds / number * 1e6:>10.1f} us/checksum')
+
+
+if __name__ == '__main__':
+    for num_children in [1, 10, 100, 1000]:
+        bench(f'ddo with {num_children} children',
+              make_ddo(num_children), number=max(5, 2000 // num_children))
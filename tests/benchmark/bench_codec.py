@@ -0,0 +1,67 @@
+"""Benchmark: stored bytes and decode time of the document encodings."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import timeit
+
+from datatoken.store.codec import (ENCODING_JSON, ENCODING_MSGPACK, ENCODING_MSGPACK_ZSTD,
+                                   ENCODING_CBOR, ENCODING_CBOR_ZSTD, encode_document, decode_document)
+
+ENCODINGS = [ENCODING_JSON, ENCODING_MSGPACK, ENCODING_MSGPACK_ZSTD,
+             ENCODING_CBOR, ENCODING_CBOR_ZSTD]
+
+
+def make_ddo(num_children):
+    child_dts = [f'dt:ownership:{i:064x}' for i in range(num_children)]
+    workflow = {}
+    for dt in child_dts:
+        workflow[dt] = {'service': 'sid0', 'constraint': {
+            'arg1': 1, 'arg2': {'lr': 0.01, 'epochs': 10}}}
+
+    return {
+        'dt': f'dt:ownership:{"ab" * 32}',
+        'creator': '0x' + 'cd' * 20,
+        'metadata': {'main': {'type': 'Dataset', 'name': 'data union',
+                              'desc': 'benchmark union ' * 4}},
+        'child_dts': child_dts,
+        'services': [{'index': f'sid{i}', 'endpoint': 'ip:port',
+                      'descriptor': {'workflow': workflow},
+                      'attributes': {'price': 10 * i, 'op_name': 'federated'}} for i in range(2)],
+        'proof': {'created': '2021-01-01T00:00:00Z', 'checksum': 'ef' * 32}
+    }
+
+
+def make_op(code_lines):
+    with open('./tests/template/add_op.py', 'r') as f:
+        operation = f.read()
+
+    return {
+        'tid': f'dt:ownership:{"12" * 32}',
+        'creator': '0x' + 'cd' * 20,
+        'metadata': {'main': {'type': 'Operation', 'name': 'add_op'}},
+        'operation': operation * code_lines,
+        'params': '{"arg1": 1, "arg2": 2}',
+        'proof': {'created': '2021-01-01T00:00:00Z', 'checksum': 'ef' * 32}
+    }
+
+
+def bench(name, doc, number=200):
+    print(f'{name}')
+    for encoding in ENCODINGS:
+        try:
+            data = encode_document(doc, encoding)
+        except ImportError as e:
+            print(f'    {encoding:<14} skipped, {e}')
+            continue
+
+        assert decode_document(data) == doc
+        seconds = timeit.timeit(lambda: decode_document(data), number=number)
+        print(f'    {encoding:<14} {len(data):>9} bytes  {seconds / number * 1e6:>9.1f} us/decode')
+
+
+if __name__ == '__main__':
+    for num_children in [1, 10, 100]:
+        bench(f'ddo with {num_children} children', make_ddo(num_children))
+
+    for code_lines in [1, 100]:
+        bench(f'op template with {code_lines}x code', make_op(code_lines))
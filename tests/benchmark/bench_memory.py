@@ -0,0 +1,86 @@
+"""Benchmark: resident bytes per resolved asset, template and tracer node."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import gc
+import json
+import tracemalloc
+
+from datatoken.core.ddo import DDO
+from datatoken.core.dt_helper import DTHelper
+from datatoken.core.operator import OpTemplate
+from datatoken.service.tracer import Node
+
+
+def make_leaf(index, tid):
+    ddo = DDO()
+    ddo.add_metadata({'main': {'type': 'Dataset', 'name': f'leaf {index}'}})
+    ddo.add_creator('0x' + 'cd' * 20)
+    ddo.add_service({'index': 'sid0', 'endpoint': 'ip:port',
+                     'descriptor': {'template': tid, 'constraint': {'arg1': 1, 'arg2': {}}},
+                     'attributes': {'price': 10}})
+    ddo.assign_dt(DTHelper.generate_new_dt())
+    ddo.create_proof()
+    return json.dumps(ddo.to_dict())
+
+
+def make_cdt(index, child_dts):
+    ddo = DDO()
+    ddo.add_metadata({'main': {'type': 'Dataset', 'name': f'union {index}'}}, child_dts)
+    ddo.add_creator('0x' + 'cd' * 20)
+    ddo.add_service({'index': 'sid0', 'endpoint': 'ip:port',
+                     'descriptor': {'workflow': {dt: {'service': 'sid0', 'constraint': {'arg1': 1}}
+                                                 for dt in child_dts}},
+                     'attributes': {'price': 10}})
+    ddo.assign_dt(DTHelper.generate_new_dt())
+    ddo.create_proof()
+    return json.dumps(ddo.to_dict())
+
+
+def make_op(index):
+    op = OpTemplate()
+    op.add_metadata({'main': {'type': 'Operation', 'name': f'op {index}'}})
+    op.add_template('print("hello")', {'arg1': 1, 'arg2': {}})
+    op.add_creator('0x' + 'cd' * 20)
+    op.assign_tid(DTHelper.generate_new_dt())
+    op.create_proof()
+    return json.dumps(op.to_dict())
+
+
+def measure(name, build, count):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    objects = build()
+
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f'    {name:<24} {(after - before) / count:>9.1f} bytes/object')
+    return objects
+
+
+if __name__ == '__main__':
+    num_leaves, num_unions, union_size = 5000, 500, 10
+    tid = DTHelper.generate_new_dt()
+
+    leaf_texts = [make_leaf(i, tid) for i in range(num_leaves)]
+    leaf_dts = [json.loads(text)['dt'] for text in leaf_texts]
+    union_texts = [make_cdt(i, leaf_dts[i * union_size:(i + 1) * union_size])
+                   for i in range(num_unions)]
+    op_texts = [make_op(i) for i in range(num_unions)]
+
+    print(f'{num_leaves} leaves, {num_unions} unions of {union_size}, {num_unions} templates')
+    leaves = measure('leaf DDO', lambda: [DDO(json_text=text) for text in leaf_texts], num_leaves)
+    unions = measure('union DDO', lambda: [DDO(json_text=text) for text in union_texts], num_unions)
+    ops = measure('OpTemplate', lambda: [OpTemplate(json.loads(text)) for text in op_texts], num_unions)
+
+    def _build_tree():
+        root = Node(text=leaf_dts[0], level=0)
+        for dt in leaf_dts:
+            root.add_child(Node(text=dt, level=1))
+        return root
+
+    tree = measure('tracer Node', _build_tree, num_leaves)
@@ -0,0 +1,76 @@
+"""Benchmark: assets per second, one by one against the pipelined batch publishing."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import sys
+import time
+
+from datatoken.config import Config
+from datatoken.web3.wallet import Wallet
+from datatoken.service.system import SystemService
+from datatoken.service.asset import AssetService
+
+
+config = Config(filename='./config.ini')
+
+system_account = Wallet(
+    config.web3, private_key='0xd5b87119980bc80944760f1027d7643dc9bdfff8307cae1e831ff7f74f11ebd3')
+org1_account = Wallet(
+    config.web3, private_key='0xaca737275831497429a47bcd5766950a69a0fa8a1511a8cf656005de1c11546e')
+
+system_service = SystemService(config)
+asset_service = AssetService(config)
+
+
+def make_assets(tid, num_assets, tag):
+    return [{
+        'metadata': {'main': {'name': f'{tag} leaf {i}', 'desc': 'bench leaf', 'type': 'Dataset'}},
+        'services': [{
+            'index': 'sid0',
+            'endpoint': 'ip:port',
+            'descriptor': {'template': tid, 'constraint': {'arg1': 1, 'arg2': {}}},
+            'attributes': {'price': 10}
+        }]
+    } for i in range(num_assets)]
+
+
+def bench_serial(tid, num_assets):
+    start = time.time()
+    for asset in make_assets(tid, num_assets, 'serial'):
+        ddo = asset_service.generate_ddo(
+            asset['metadata'], asset['services'], org1_account.address, verify=True)
+        asset_service.publish_dt(ddo, org1_account)
+    return num_assets / (time.time() - start)
+
+
+def bench_batch(tid, num_assets):
+    start = time.time()
+    generated = asset_service.generate_ddos(
+        make_assets(tid, num_assets, 'batch'), org1_account.address, verify=True)
+    ddos = [result.ddo for result in generated if result.ddo]
+    published = asset_service.publish_dts(ddos, org1_account)
+    seconds = time.time() - start
+
+    failed = len(generated) - len(ddos) + sum(1 for result in published if result.error)
+    if failed:
+        print(f'    {failed} assets failed')
+    return num_assets / seconds
+
+
+if __name__ == '__main__':
+    num_assets = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    system_service.register_enterprise(
+        org1_account.address, 'org1', 'test_org1', system_account)
+    system_service.add_provider(org1_account.address, system_account)
+
+    metadata = {'main': {'name': 'add_op', 'desc': 'test add op', 'type': 'Operation'}}
+    with open('./tests/template/add_op.py', 'r') as f:
+        operation = f.read()
+    with open('./tests/template/args.json', 'r') as f:
+        params = f.read()
+    op = system_service.publish_template(metadata, operation, params, system_account)
+
+    print(f'publishing {num_assets} leaf assets')
+    print(f'    one by one   {bench_serial(op.tid, num_assets):>8.1f} assets/s')
+    print(f'    pipelined    {bench_batch(op.tid, num_assets):>8.1f} assets/s')
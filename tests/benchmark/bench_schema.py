@@ -0,0 +1,58 @@
+"""Benchmark: hand-written checks of the DDO load path vs the schema error reports."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import json
+import timeit
+
+from datatoken.core.ddo import DDO, _is_ddo_dict, _validate_ddo
+from datatoken.core.dt_helper import DTHelper
+from datatoken.core.metadata import Metadata
+
+
+def make_ddo(num_children):
+    tid = DTHelper.generate_new_dt()
+    child_dts = [DTHelper.generate_new_dt() for _ in range(num_children)]
+
+    ddo = DDO()
+    ddo.add_metadata({'main': {'type': 'Dataset', 'name': 'bench'}}, child_dts or None)
+    ddo.add_creator('0x' + 'cd' * 20)
+    if child_dts:
+        descriptor = {'workflow': {dt: {'service': 'sid0', 'constraint': {'arg1': 1}}
+                                   for dt in child_dts}}
+    else:
+        descriptor = {'template': tid, 'constraint': {'arg1': 1, 'arg2': {}}}
+    for i in range(2):
+        ddo.add_service({'index': f'sid{i}', 'endpoint': 'ip:port',
+                         'descriptor': descriptor, 'attributes': {'price': 10}})
+    ddo.assign_dt(DTHelper.generate_new_dt())
+    ddo.create_proof()
+    return ddo
+
+
+def bench(name, ddo, number):
+    value = json.loads(json.dumps(ddo.to_dict()))
+
+    def _handwritten():
+        _is_ddo_dict(value)
+        Metadata.validate(ddo.metadata)
+        for service in ddo.services:
+            service.validate(ddo.asset_type, ddo.child_dts)
+
+    def _schema():
+        _validate_ddo(value)
+        Metadata.errors(ddo.metadata)
+        for service in ddo.services:
+            service.errors(ddo.asset_type, ddo.child_dts)
+
+    print(f'{name}')
+    for label, fn in [('handwritten', _handwritten), ('schema', _schema),
+                      ('full load', lambda: DDO(dictionary=value))]:
+        seconds = timeit.timeit(fn, number=number)
+        print(f'    {label:<12} {seconds / number * 1e6:>10.1f} us/document')
+
+
+if __name__ == '__main__':
+    for num_children in [0, 10, 100, 1000]:
+        bench(f'ddo with {num_children} children', make_ddo(num_children),
+              number=max(10, 20000 // max(1, num_children)))
@@ -0,0 +1,67 @@
+"""Benchmark: reload time and size of the binary snapshots against the json documents."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import json
+import timeit
+
+from datatoken.core.ddo import DDO
+from datatoken.core.dt_helper import DTHelper
+from datatoken.core.operator import OpTemplate
+from datatoken.store.snapshot import dump_snapshot, load_snapshot
+
+
+def make_ddo(num_children):
+    tid = DTHelper.generate_new_dt()
+    child_dts = [DTHelper.generate_new_dt() for _ in range(num_children)]
+
+    ddo = DDO()
+    ddo.add_metadata({'main': {'type': 'Dataset', 'name': 'bench',
+                               'desc': 'benchmark asset ' * 4}}, child_dts or None)
+    ddo.add_creator('0x' + 'cd' * 20)
+    if child_dts:
+        descriptor = {'workflow': {dt: {'service': 'sid0', 'constraint': {
+            'arg1': 1, 'arg2': {'lr': 0.01, 'epochs': 10}}} for dt in child_dts}}
+    else:
+        descriptor = {'template': tid, 'constraint': {'arg1': 1, 'arg2': {}}}
+    for i in range(2):
+        ddo.add_service({'index': f'sid{i}', 'endpoint': 'ip:port',
+                         'descriptor': descriptor, 'attributes': {'price': 10 * i}})
+    ddo.assign_dt(DTHelper.generate_new_dt())
+    ddo.create_proof()
+    return ddo
+
+
+def make_op():
+    op = OpTemplate()
+    op.add_metadata({'main': {'type': 'Operation', 'name': 'bench op'}})
+    op.add_template('def run(x):\n    return x + 1\n' * 20, {'arg1': 1, 'arg2': {}})
+    op.add_creator('0x' + 'cd' * 20)
+    op.assign_tid(DTHelper.generate_new_dt())
+    op.create_proof()
+    return op
+
+
+def bench(name, obj, number):
+    json_text = json.dumps(obj.to_dict())
+    snapshot = dump_snapshot(obj)
+    checksum = obj.proof['checksum']
+
+    if isinstance(obj, DDO):
+        from_json = lambda: DDO(json_text=json_text)
+    else:
+        from_json = lambda: OpTemplate(json.loads(json_text))
+
+    print(f'{name}: json {len(json_text.encode("utf-8"))} bytes, snapshot {len(snapshot)} bytes')
+    for label, fn in [('json text', from_json),
+                      ('proven', lambda: load_snapshot(snapshot, checksum)),
+                      ('unproven', lambda: load_snapshot(snapshot))]:
+        seconds = timeit.timeit(fn, number=number)
+        print(f'    {label:<12} {seconds / number * 1e6:>10.1f} us/object')
+
+
+if __name__ == '__main__':
+    for num_children in [0, 10, 100, 1000]:
+        bench(f'ddo with {num_children} children', make_ddo(num_children),
+              number=max(10, 20000 // max(1, num_children)))
+    bench('template', make_op(), number=20000)
@@ -0,0 +1,123 @@
+"""Service agreement tests, the compiled constraints against the original walk."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import copy
+import json
+import random
+from types import SimpleNamespace
+
+from datatoken.csp import agreement
+from datatoken.csp.agreement import ConstraintChecker, validate_leaf_template
+
+
+def _check_fulfills(required_constraint, fulfill_constraint, terminal=False):
+    """The original constraint walk, which ConstraintChecker must agree with."""
+    if set(required_constraint.keys()) != set(fulfill_constraint.keys()):
+        return False
+
+    for key, value in fulfill_constraint.items():
+        required = required_constraint[key]
+        if isinstance(value, dict):
+            if not isinstance(required, dict):
+                return False
+
+            if required and set(value.keys()) != set(required.keys()):
+                return False
+
+            for sub_key, sub_value in value.items():
+                if terminal and sub_value == None:
+                    return False
+
+                sub_required = required.get(sub_key)
+                if sub_required and sub_value != sub_required:
+                    return False
+        else:
+            if (terminal and value == None) or (required and value != required):
+                return False
+
+    return True
+
+
+_SCALARS = [None, 0, 1, 2, '', 'a', 'b', [], [1], True, False]
+
+
+def _random_required(rnd):
+    required = {}
+    for i in range(rnd.randrange(4)):
+        if rnd.random() < 0.5:
+            required[f'arg{i}'] = {f'sub{j}': rnd.choice(_SCALARS + [{'k': 1}])
+                                   for j in range(rnd.randrange(3))}
+        else:
+            required[f'arg{i}'] = rnd.choice(_SCALARS)
+    return required
+
+
+def _random_fulfill(rnd, required):
+    fulfill = copy.deepcopy(required)
+    for _ in range(rnd.randrange(3)):
+        keys = list(fulfill)
+        mutation = rnd.randrange(5)
+        if mutation == 0 or not keys:
+            fulfill[f'arg{rnd.randrange(5)}'] = rnd.choice(_SCALARS)
+        elif mutation == 1:
+            del fulfill[rnd.choice(keys)]
+        elif mutation == 2:
+            fulfill[rnd.choice(keys)] = rnd.choice(_SCALARS)
+        elif mutation == 3:
+            fulfill[rnd.choice(keys)] = {f'sub{j}': rnd.choice(_SCALARS) for j in range(rnd.randrange(3))}
+        else:
+            value = fulfill[rnd.choice(keys)]
+            if isinstance(value, dict) and value:
+                value[rnd.choice(list(value))] = rnd.choice(_SCALARS)
+    return fulfill
+
+
+def test_checker_agrees_with_the_original_walk():
+    rnd = random.Random(11)
+    agreed = 0
+    for _ in range(20000):
+        required = _random_required(rnd)
+        fulfill = _random_fulfill(rnd, required)
+        checker = ConstraintChecker(required)
+        for terminal in (False, True):
+            expected = _check_fulfills(required, fulfill, terminal)
+            assert checker.check(fulfill, terminal) == expected, (required, fulfill, terminal)
+            agreed += expected
+
+    # both verdicts are well represented
+    assert 1000 < agreed < 30000
+
+
+def test_checker_is_reused_across_checks():
+    checker = ConstraintChecker({'lr': {'value': 0.1, 'free': None}, 'epochs': None})
+
+    assert checker.check({'lr': {'value': 0.1, 'free': 3}, 'epochs': 10})
+    assert not checker.check({'lr': {'value': 0.2, 'free': 3}, 'epochs': 10})
+    assert not checker.check({'lr': {'value': 0.1, 'free': None}, 'epochs': 10}, terminal=True)
+    assert not checker.check({'lr': {'value': 0.1, 'free': 3}})
+    assert checker.check({'lr': {'value': 0.1, 'free': 3}, 'epochs': 10})
+
+
+def test_checker_rejects_what_is_not_a_constraint():
+    assert not ConstraintChecker(None).check({})
+    assert not ConstraintChecker('none').check({})
+    assert not ConstraintChecker({'a': 1}).check(None)
+    assert not ConstraintChecker({'a': 1}).check([('a', 1)])
+
+
+def test_leaf_template_checks_every_service(monkeypatch):
+    ops = {
+        'tid_a': SimpleNamespace(params=json.dumps({'x': None}), proof=None),
+        'tid_b': SimpleNamespace(params=json.dumps({'y': None}), proof=None)
+    }
+    monkeypatch.setattr(agreement, 'resolve_op', lambda tid, _: (tid, ops.get(tid)))
+
+    def leaf(*descriptors):
+        return SimpleNamespace(services=[SimpleNamespace(descriptor=d) for d in descriptors])
+
+    good = {'template': 'tid_a', 'constraint': {'x': 1}}
+    assert validate_leaf_template(leaf(good, {'template': 'tid_b', 'constraint': {'y': 2}}), None)
+    assert not validate_leaf_template(leaf(good, {'template': 'tid_b', 'constraint': {'x': 2}}), None)
+    assert not validate_leaf_template(leaf(good, {'template': 'tid_c', 'constraint': {'x': 1}}), None)
+    assert not validate_leaf_template(leaf(good, {'constraint': {'x': 1}}), None)
@@ -0,0 +1,102 @@
+"""Checksum tests, against the sort/dump/replace implementation the proofs were made with."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import copy
+import hashlib
+import json
+import random
+
+import pytest
+
+from datatoken.core.utils import calc_checksum, CHECKSUM_LEGACY, CHECKSUM_CANONICAL, CHUNK_SIZE
+
+
+def _legacy_checksum(seed):
+    """The original calc_checksum, which the legacy scheme must reproduce bit for bit."""
+
+    def _sort_dict(dict_value):
+        dict_value = dict(sorted(dict_value.items(), reverse=False))
+
+        for key, value in dict_value.items():
+            if isinstance(value, dict):
+                dict_value[key] = _sort_dict(value)
+            elif isinstance(value, list):
+                for index, sub_value in enumerate(value):
+                    if isinstance(sub_value, dict):
+                        value[index] = _sort_dict(sub_value)
+
+        return dict_value
+
+    return hashlib.sha3_256((json.dumps(_sort_dict(copy.deepcopy(seed))).replace(
+        " ", "")).encode('utf-8')).hexdigest()
+
+
+def _canonical_checksum(seed):
+    return hashlib.sha3_256(json.dumps(
+        seed, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def _random_value(rnd, depth):
+    kind = rnd.randrange(9 if depth > 0 else 6)
+    if kind == 0:
+        return None
+    if kind == 1:
+        return rnd.choice([True, False])
+    if kind == 2:
+        return rnd.randint(-10 ** 6, 10 ** 6)
+    if kind == 3:
+        return rnd.random() * 100
+    if kind in (4, 5):
+        return rnd.choice(['', 'a b', 'x', 'héllo wörld', '日本', 'quote " and \\ ', 'tab\t'])
+    if kind in (6, 7):
+        return {rnd.choice('zyxabc') + str(i): _random_value(rnd, depth - 1)
+                for i in range(rnd.randrange(4))}
+    return [_random_value(rnd, depth - 1) for _ in range(rnd.randrange(4))]
+
+
+def _random_docs(count, seed=7):
+    rnd = random.Random(seed)
+    return [{f'k{i}': _random_value(rnd, 5) for i in range(rnd.randrange(1, 5))}
+            for _ in range(count)]
+
+
+def test_legacy_checksum_reproduces_the_original_one():
+    for doc in _random_docs(500):
+        assert calc_checksum(doc, CHECKSUM_LEGACY) == _legacy_checksum(doc)
+
+
+def test_legacy_checksum_keeps_the_key_order_of_lists_in_lists():
+    doc = {'b': [[{'z': 1, 'a': 2}], {'z': 1, 'a': [{'y': 1, 'b': 2}]}], 'a': 'a b'}
+    assert calc_checksum(doc) == _legacy_checksum(doc)
+    assert calc_checksum(doc) != calc_checksum(
+        {'b': [[{'a': 2, 'z': 1}], {'z': 1, 'a': [{'y': 1, 'b': 2}]}], 'a': 'a b'})
+
+
+def test_canonical_checksum_is_the_sorted_compact_json():
+    for doc in _random_docs(500, seed=8):
+        assert calc_checksum(doc, CHECKSUM_CANONICAL) == _canonical_checksum(doc)
+
+
+def test_streamed_checksum_of_a_large_document():
+    doc = {'services': [{'index': f'sid{i}', 'descriptor': {'constraint': {'arg': 'v a l' * 50}}}
+                        for i in range(2 * CHUNK_SIZE // 100)]}
+    assert calc_checksum(doc, CHECKSUM_LEGACY) == _legacy_checksum(doc)
+    assert calc_checksum(doc, CHECKSUM_CANONICAL) == _canonical_checksum(doc)
+
+
+def test_checksum_leaves_the_document_intact():
+    doc = {'b': {'z': 1, 'a': 2}, 'a': [{'y': 1, 'b': 2}]}
+    text = json.dumps(doc)
+    calc_checksum(doc, CHECKSUM_LEGACY)
+    calc_checksum(doc, CHECKSUM_CANONICAL)
+    assert json.dumps(doc) == text
+
+
+def test_canonical_checksum_rejects_what_json_cannot_round_trip():
+    with pytest.raises(TypeError):
+        calc_checksum({1: 'a'}, CHECKSUM_CANONICAL)
+    with pytest.raises(ValueError):
+        calc_checksum({'a': float('nan')}, CHECKSUM_CANONICAL)
+    with pytest.raises(ValueError):
+        calc_checksum({'a': 1}, 'unknown')
@@ -0,0 +1,76 @@
+"""DDO tests, on the service index and the workflow lookups."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+from datatoken.core.ddo import DDO, LazyDDO
+from datatoken.core.dt_helper import DTHelper
+
+
+def _cdt(child_dts, services):
+    ddo = DDO()
+    ddo.add_metadata({'main': {'type': 'Dataset', 'name': 'cdt'}}, child_dts)
+    ddo.add_creator('0x0000000000000000000000000000000000000001')
+    for index, workflow in services:
+        ddo.add_service({
+            'index': index,
+            'endpoint': 'ip',
+            'descriptor': {'workflow': workflow},
+            'attributes': {'price': 1}
+        })
+    ddo.assign_dt(DTHelper.generate_new_dt())
+    ddo.create_proof()
+    return ddo
+
+
+def _workflow_by_scan(ddo, child_dt):
+    """How each service fulfills a child dt, read from the raw dict."""
+    fulfills = {}
+    for service in ddo.to_dict()['services']:
+        fulfilled = service['descriptor']['workflow'].get(child_dt)
+        if fulfilled:
+            fulfills.setdefault(service['index'], (fulfilled['service'], fulfilled['constraint']))
+    return fulfills
+
+
+def test_workflow_lookup_matches_a_scan_of_the_services():
+    dt_a, dt_b = DTHelper.generate_new_dt(), DTHelper.generate_new_dt()
+    ddo = _cdt([dt_a, dt_b], [
+        ('sid_0', {dt_a: {'service': 'a0', 'constraint': {'x': 1}},
+                   dt_b: {'service': 'b0', 'constraint': {'y': 1}}}),
+        ('sid_1', {dt_a: {'service': 'a1', 'constraint': {'x': 2}},
+                   dt_b: {'service': 'b1', 'constraint': {'y': 2}}})
+    ])
+
+    for child_dt in (dt_a, dt_b):
+        assert ddo.get_workflow(child_dt) == _workflow_by_scan(ddo, child_dt)
+    assert ddo.get_workflow(dt_a) == {'sid_0': ('a0', {'x': 1}), 'sid_1': ('a1', {'x': 2})}
+    assert ddo.get_workflow(DTHelper.generate_new_dt()) == {}
+    assert ddo.get_service_constraint('sid_1') == {dt_a: {'x': 2}, dt_b: {'y': 2}}
+    assert ddo.get_fulfills(dt_b) == [('b0', {'y': 1}), ('b1', {'y': 2})]
+
+
+def test_service_index_follows_the_services():
+    dt_a = DTHelper.generate_new_dt()
+    workflow = {dt_a: {'service': 'a0', 'constraint': {'x': 1}}}
+    ddo = _cdt([dt_a], [('sid_0', workflow)])
+
+    assert ddo.get_service_by_index('sid_0').index == 'sid_0'
+    assert ddo.get_service_by_index('sid_1') is None
+
+    ddo_copy = ddo.copy()
+    ddo_copy.add_service({'index': 'sid_1', 'endpoint': 'ip', 'attributes': {'price': 1},
+                          'descriptor': {'workflow': {dt_a: {'service': 'a1', 'constraint': {}}}}})
+    assert ddo_copy.get_service_by_index('sid_1').index == 'sid_1'
+    assert ddo_copy.get_workflow(dt_a) == {'sid_0': ('a0', {'x': 1}), 'sid_1': ('a1', {})}
+    assert ddo.get_workflow(dt_a) == {'sid_0': ('a0', {'x': 1})}
+
+
+def test_lazy_ddo_builds_the_same_lookups():
+    dt_a = DTHelper.generate_new_dt()
+    ddo = _cdt([dt_a], [('sid_0', {dt_a: {'service': 'a0', 'constraint': {'x': 1}}})])
+    lazy_ddo = LazyDDO(dictionary=ddo.to_dict())
+
+    assert not lazy_ddo.services_loaded
+    assert lazy_ddo.get_workflow(dt_a) == ddo.get_workflow(dt_a)
+    assert lazy_ddo.get_service_by_index('sid_0').to_dict() == ddo.services[0].to_dict()
+    assert lazy_ddo.services_loaded
@@ -0,0 +1,140 @@
+"""Decision cache tests, with a fake clock and fake event filters."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from datatoken.core.dt_helper import DTHelper
+from datatoken.service import decision_cache
+from datatoken.service.decision_cache import DecisionCache
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeEventFilter:
+    """Replaces EventFilter, returning the logs queued on the class."""
+
+    logs = []
+
+    def __init__(self, event_name, event, argument_filters, from_block, to_block):
+        self.event_name = event_name
+
+    def get_new_entries(self):
+        logs, FakeEventFilter.logs = FakeEventFilter.logs, []
+        return logs
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(decision_cache, 'time', fake_clock)
+    return fake_clock
+
+
+@pytest.fixture
+def watched(monkeypatch):
+    monkeypatch.setattr(decision_cache, 'EventFilter', FakeEventFilter)
+    FakeEventFilter.logs = []
+    cache = DecisionCache(poll_interval=0)
+    cache.watch('DataTokenGranted', None, '_dt')
+    return cache
+
+
+def _key(cdt, dt):
+    return DecisionCache.make_key('permission', cdt, dt, '0x01')
+
+
+def test_decisions_expire_after_their_ttl(clock):
+    cache = DecisionCache(positive_ttl=60, negative_ttl=5)
+    granted = _key(DTHelper.generate_new_dt(), DTHelper.generate_new_dt())
+    denied = _key(DTHelper.generate_new_dt(), DTHelper.generate_new_dt())
+    cache.put(granted, True)
+    cache.put(denied, False)
+
+    clock.now += 4
+    assert cache.get(granted) is True
+    assert cache.get(denied) is False
+
+    clock.now += 2
+    assert cache.get(granted) is True
+    assert cache.get(denied) is None
+
+    clock.now += 60
+    assert cache.get(granted) is None
+    assert cache._index == {}
+
+
+def test_event_drops_the_decisions_naming_its_dt(watched):
+    cdt, dt, other_dt = (DTHelper.generate_new_dt() for _ in range(3))
+    cache = watched
+    cache.put(_key(cdt, dt), False)
+    cache.put(_key(cdt, other_dt), True)
+
+    FakeEventFilter.logs = [SimpleNamespace(args={'_dt': DTHelper.dt_to_id_bytes(dt)})]
+
+    assert cache.get(_key(cdt, dt)) is None
+    assert cache.get(_key(cdt, other_dt)) is True
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_decision_taken_across_an_invalidation_is_not_kept(watched):
+    cdt, dt = DTHelper.generate_new_dt(), DTHelper.generate_new_dt()
+    cache = watched
+    key = _key(cdt, dt)
+
+    def decide_fn():
+        FakeEventFilter.logs = [SimpleNamespace(args={'_dt': DTHelper.dt_to_id_bytes(dt)})]
+        cache.get(_key(cdt, DTHelper.generate_new_dt()))
+        return False
+
+    assert cache.decide(key, decide_fn) is False
+    assert cache.get(key) is None
+
+
+def test_invalidation_racing_a_put_leaves_no_stale_decision():
+    cache = DecisionCache()
+    cdt, dt = DTHelper.generate_new_dt(), DTHelper.generate_new_dt()
+    key = _key(cdt, dt)
+
+    entries = cache._entries[False]
+    entries_put = entries.put
+    threads = []
+
+    def racing_put(*args):
+        # another thread invalidates the dt right before the decision is stored
+        thread = threading.Thread(target=cache.invalidate, args=(dt,))
+        thread.start()
+        thread.join(0.2)
+        threads.append(thread)
+        entries_put(*args)
+
+    entries.put = racing_put
+    cache.decide(key, lambda: False)
+    for thread in threads:
+        thread.join()
+
+    assert cache.get(key) is None
+    assert cache._index == {}
+
+
+def test_errors_are_raised_and_never_cached():
+    cache = DecisionCache()
+    key = _key(DTHelper.generate_new_dt(), DTHelper.generate_new_dt())
+
+    def decide_fn():
+        raise ConnectionError('rpc is down')
+
+    with pytest.raises(ConnectionError):
+        cache.decide(key, decide_fn)
+    assert cache.get(key) is None
+    assert cache.decide(key, lambda: True) is True
@@ -0,0 +1,221 @@
+"""Document cache tests, on a local blockstore so no ipfs daemon is needed."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import json
+import threading
+
+import pytest
+
+from datatoken.core.ddo import DDO
+from datatoken.core.dt_helper import DTHelper
+from datatoken.core.service import Service
+from datatoken.core.utils import CHECKSUM_LEGACY
+from datatoken.store.asset_resolve import resolve_asset_by_url
+from datatoken.store.doc_cache import CacheProvider, DocCache, MemoryLRU
+from datatoken.store.ipfs_provider import IPFSProvider
+from datatoken.store.local_blockstore import LocalBlockstore
+from datatoken.store.snapshot import dump_snapshot, is_snapshot
+
+
+def _make_ddo(name='test', descriptor=None):
+    ddo = DDO()
+    ddo.add_metadata({'main': {'type': 'Dataset', 'name': name}})
+    ddo.add_creator('0x0000000000000000000000000000000000000001')
+    ddo.add_service({
+        'index': 'sid_0',
+        'endpoint': 'ip',
+        'descriptor': descriptor or {'template': DTHelper.generate_new_dt(), 'constraint': {'x': 1}},
+        'attributes': {'price': 10}
+    })
+    ddo.assign_dt(DTHelper.generate_new_dt())
+    ddo.create_proof()
+    return ddo
+
+
+@pytest.fixture
+def storage(tmp_path):
+    backend, cache = IPFSProvider._backend, CacheProvider._cache
+    IPFSProvider.set_backend(LocalBlockstore(tmp_path / 'blocks'))
+    # a single memory item, so the next document evicts the previous one
+    CacheProvider.set_cache(DocCache(tmp_path / 'cache', max_items=1))
+    yield IPFSProvider()
+    IPFSProvider.set_backend(backend)
+    CacheProvider.set_cache(cache)
+
+
+def _publish(storage, name='test', descriptor=None):
+    ddo = _make_ddo(name, descriptor)
+    return storage.add(ddo.to_dict()), bytes.fromhex(ddo.proof['checksum'])
+
+
+def test_resolved_ddo_is_shared_and_read_only(storage):
+    cid, checksum = _publish(storage)
+
+    ddo = resolve_asset_by_url(cid, checksum)
+    assert ddo.read_only
+    assert resolve_asset_by_url(cid, checksum) is ddo
+
+    with pytest.raises(AssertionError):
+        ddo.create_proof()
+    with pytest.raises(AssertionError):
+        ddo.add_metadata({'main': {'type': 'Dataset'}})
+    with pytest.raises(AssertionError):
+        ddo.add_service({'index': 'sid_1'})
+
+
+def test_copy_is_writable_and_leaves_the_cache_intact(storage):
+    cid, checksum = _publish(storage)
+    ddo = resolve_asset_by_url(cid, checksum)
+
+    ddo_copy = ddo.copy()
+    assert not ddo_copy.read_only
+    assert ddo_copy.to_dict() == ddo.to_dict()
+
+    ddo_copy.metadata['main']['name'] = 'changed'
+    ddo_copy.services[0].descriptor['constraint']['x'] = 2
+    ddo_copy.create_proof()
+
+    cached = resolve_asset_by_url(cid, checksum)
+    assert cached.metadata['main']['name'] == 'test'
+    assert cached.get_service_constraint('sid_0') == {'x': 1}
+    assert cached.proof['checksum'] == checksum.hex()
+
+
+def _disk_file(tmp_path, cid):
+    return tmp_path / 'cache' / cid[-2:] / cid
+
+
+def test_corrupt_disk_file_is_fetched_again(storage, tmp_path):
+    cid, checksum = _publish(storage)
+    resolve_asset_by_url(cid, checksum)
+    resolve_asset_by_url(*_publish(storage, 'other'))
+
+    _disk_file(tmp_path, cid).write_bytes(b'{"dt": ')
+
+    ddo = resolve_asset_by_url(cid, checksum)
+    assert ddo.metadata['main']['name'] == 'test'
+
+
+def test_tampered_disk_file_is_not_trusted(storage, tmp_path):
+    cid, checksum = _publish(storage)
+    doc = resolve_asset_by_url(cid, checksum).to_dict()
+    resolve_asset_by_url(*_publish(storage, 'other'))
+    assert CacheProvider.get_cache().get_proven(cid) == checksum.hex()
+
+    doc['services'][0]['descriptor']['constraint']['x'] = 2
+    _disk_file(tmp_path, cid).write_text(json.dumps(doc))
+
+    ddo = resolve_asset_by_url(cid, checksum)
+    assert ddo.get_service_constraint('sid_0') == {'x': 1}
+
+
+def test_lazy_load_does_not_prove_the_services(storage):
+    doc = _make_ddo().to_dict()
+    service = doc['services'][0]
+    service['endpoint'] = None
+    service['descriptor']['constraint'] = 'none'
+    doc['services'].append(dict(service))
+
+    # a proof over the invalid services, so only their validation fails
+    ddo = DDO()
+    ddo._from_trusted_dict(doc)
+    checksum = ddo._calc_proof([Service.normalize_dict(value) for value in doc['services']],
+                               CHECKSUM_LEGACY)[0]
+    doc['proof'] = {'checksum': checksum}
+
+    cid, checksum = storage.add(doc), bytes.fromhex(checksum)
+    lazy_ddo = resolve_asset_by_url(cid, checksum, lazy=True)
+    assert not lazy_ddo.services_loaded
+    assert CacheProvider.get_cache().get_proven(cid) is None
+
+    resolve_asset_by_url(*_publish(storage, 'other'))
+    with pytest.raises(AssertionError):
+        resolve_asset_by_url(cid, checksum)
+
+
+def test_verified_ddo_is_reloaded_from_its_snapshot(storage, tmp_path):
+    descriptor = {'workflow': None, 'template': DTHelper.generate_new_dt(), 'constraint': {'x': 1}}
+    cid, checksum = _publish(storage, descriptor=descriptor)
+    doc = resolve_asset_by_url(cid, checksum).to_dict()
+    resolve_asset_by_url(*_publish(storage, 'other'))
+    assert is_snapshot(_disk_file(tmp_path, cid).read_bytes())
+
+    ddo = resolve_asset_by_url(cid, checksum)
+    assert CacheProvider.get_cache().stats()['snapshot_hits'] == 1
+    assert ddo.read_only
+    assert ddo.to_dict() == doc
+    assert list(ddo.services[0].descriptor) == list(doc['services'][0]['descriptor'])
+
+
+def test_tampered_snapshot_is_not_trusted(storage, tmp_path):
+    cid, checksum = _publish(storage)
+    doc = resolve_asset_by_url(cid, checksum).to_dict()
+    resolve_asset_by_url(*_publish(storage, 'other'))
+
+    doc['services'][0]['descriptor']['constraint']['x'] = 2
+    tampered = DDO()
+    tampered._from_trusted_dict(doc)
+    _disk_file(tmp_path, cid).write_bytes(dump_snapshot(tampered))
+
+    ddo = resolve_asset_by_url(cid, checksum)
+    assert CacheProvider.get_cache().stats()['snapshot_hits'] == 0
+    assert ddo.get_service_constraint('sid_0') == {'x': 1}
+
+
+
+class _Verified:
+
+    def freeze(self):
+        pass
+
+
+def test_eviction_racing_a_put_verified_leaves_no_orphan():
+    cache = DocCache(max_items=1)
+    cid, other_cid = 'Qm' + 'a' * 44, 'Qm' + 'b' * 44
+    threads = []
+
+    class RacingLRU(MemoryLRU):
+
+        def __contains__(self, key):
+            contained = super().__contains__(key)
+            # another thread evicts the document right after it is found
+            thread = threading.Thread(target=cache.put, args=(other_cid, {}))
+            thread.start()
+            thread.join(0.2)
+            threads.append(thread)
+            return contained
+
+    cache._memory = RacingLRU(1, on_evict=cache._drop_verified)
+    cache.put(cid, {})
+    cache.put_verified(cid, 'aa', _Verified(), proven=False)
+    for thread in threads:
+        thread.join()
+
+    assert cid not in cache._memory
+    assert cache.get_verified(cid) is None
+    assert cache.stats()['verified_items'] == 0
+
+
+def test_counters_add_up_under_concurrent_use():
+    cache = DocCache(max_items=8)
+    cids = ['Qm' + chr(ord('a') + i) * 44 for i in range(16)]
+    rounds = 500
+
+    def worker(seed):
+        for i in range(rounds):
+            cid = cids[(seed + i) % len(cids)]
+            cache.put(cid, {})
+            cache.put_verified(cid, 'aa', _Verified(), proven=False)
+            cache.get(cid)
+            cache.get_verified(cid, 'aa')
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert set(cache._verified) <= set(cache._memory._items)
+    stats = cache.stats()
+    assert stats['hits'] + stats['disk_hits'] + stats['misses'] == 8 * rounds
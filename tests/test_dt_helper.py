@@ -0,0 +1,50 @@
+"""DT helper tests, the batch conversions against the one-by-one ones."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import pytest
+from hexbytes import HexBytes
+from web3 import Web3
+
+from datatoken.core.dt_helper import DTHelper, PREFIX
+
+
+def _dts(count):
+    return [DTHelper.generate_new_dt() for _ in range(count)]
+
+
+def test_ids_to_dts_matches_the_single_conversion():
+    dts = _dts(5)
+    id_bytes = [Web3.toBytes(hexstr=DTHelper.dt_to_id(dt)) for dt in dts]
+
+    assert DTHelper.ids_to_dts(id_bytes) == dts
+    assert DTHelper.ids_to_dts([HexBytes(value) for value in id_bytes]) == dts
+    assert DTHelper.ids_to_dts(id_bytes) == [DTHelper.id_bytes_to_dt(value) for value in id_bytes]
+    assert DTHelper.ids_to_dts([b'']) == [f'{PREFIX}0']
+    assert DTHelper.ids_to_dts([]) == []
+
+
+def test_dts_to_ids_matches_the_single_conversion():
+    dts = _dts(5)
+
+    assert DTHelper.dts_to_ids(dts) == [dt[len(PREFIX):] for dt in dts]
+    assert DTHelper.dts_to_ids(dts) == [DTHelper.dt_to_id(dt) for dt in dts]
+
+
+def test_dts_to_id_bytes_accepts_dts_and_id_bytes():
+    dts = _dts(3)
+    id_bytes = [DTHelper.dt_to_id_bytes(dt) for dt in dts]
+
+    assert id_bytes == [bytes.fromhex(dt[len(PREFIX):]) for dt in dts]
+    assert DTHelper.dts_to_id_bytes(dts) == id_bytes
+    assert DTHelper.dts_to_id_bytes([dts[0], id_bytes[1]]) == id_bytes[:2]
+    assert DTHelper.ids_to_dts(DTHelper.dts_to_id_bytes(dts)) == dts
+
+
+def test_invalid_dts_are_rejected():
+    with pytest.raises(ValueError):
+        DTHelper.dts_to_id_bytes(['abcdef'])
+    with pytest.raises(ValueError):
+        DTHelper.dts_to_id_bytes(['not a dt'])
+    with pytest.raises(TypeError):
+        DTHelper.dts_to_id_bytes([1])
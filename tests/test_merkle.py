@@ -0,0 +1,119 @@
+"""Merkle proof tests, down to a single service checked against the DDO root."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import pytest
+
+from datatoken.core.ddo import DDO, LazyDDO, verify_service_proof
+from datatoken.core.dt_helper import DTHelper
+from datatoken.core.merkle import LEFT, RIGHT, hash_leaf, merkle_root, merkle_path, verify_path
+from datatoken.core.utils import CHECKSUM_MERKLE
+
+
+def _leaves(count):
+    return [hash_leaf({'leaf': i}) for i in range(count)]
+
+
+def test_merkle_root_of_a_single_leaf_is_the_leaf():
+    leaf = hash_leaf({'leaf': 0})
+    assert merkle_root([leaf]) == leaf
+
+    with pytest.raises(AssertionError):
+        merkle_root([])
+
+
+def test_merkle_root_depends_on_every_leaf_and_their_order():
+    leaves = _leaves(5)
+    root = merkle_root(leaves)
+
+    assert merkle_root(leaves[:4]) != root
+    assert merkle_root(leaves[1:] + leaves[:1]) != root
+    assert merkle_root(leaves[:4] + [hash_leaf({'leaf': 5})]) != root
+
+
+@pytest.mark.parametrize('count', range(1, 10))
+def test_every_leaf_path_leads_to_the_root(count):
+    leaves = _leaves(count)
+    root = merkle_root(leaves)
+
+    for position, leaf in enumerate(leaves):
+        assert verify_path(leaf, merkle_path(leaves, position), root)
+
+    with pytest.raises(AssertionError):
+        merkle_path(leaves, count)
+
+
+def test_tampered_leaf_is_rejected():
+    leaves = _leaves(6)
+    root = merkle_root(leaves)
+
+    assert not verify_path(hash_leaf({'leaf': 'x'}), merkle_path(leaves, 3), root)
+    # a leaf is never taken for an inner node
+    assert not verify_path(leaves[2], merkle_path(leaves, 3), root)
+
+
+def test_tampered_path_is_rejected():
+    leaves = _leaves(6)
+    root = merkle_root(leaves)
+    path = merkle_path(leaves, 3)
+
+    sibling = [[side, hash_leaf({'sibling': 1})] for side, _ in path[:1]] + path[1:]
+    flipped = [[RIGHT if side == LEFT else LEFT, node] for side, node in path]
+
+    assert not verify_path(leaves[3], sibling, root)
+    assert not verify_path(leaves[3], flipped, root)
+    assert not verify_path(leaves[3], path[:-1], root)
+    assert not verify_path(leaves[3], [['X', path[0][1]]] + path[1:], root)
+    assert not verify_path(leaves[3], [[LEFT, 'not hex']] + path[1:], root)
+
+
+def _merkle_cdt(child_dt, constraints):
+    ddo = DDO()
+    ddo.add_metadata({'main': {'type': 'Dataset', 'name': 'cdt'}}, [child_dt])
+    ddo.add_creator('0x0000000000000000000000000000000000000001')
+    for i, constraint in enumerate(constraints):
+        ddo.add_service({
+            'index': f'sid_{i}',
+            'endpoint': 'ip',
+            'descriptor': {'workflow': {child_dt: {'service': 'sid_0', 'constraint': constraint}}},
+            'attributes': {'price': i}
+        })
+    ddo.assign_dt(DTHelper.generate_new_dt())
+    ddo.create_proof(CHECKSUM_MERKLE)
+    return ddo
+
+
+def test_service_is_verified_alone_against_the_root():
+    child_dt = DTHelper.generate_new_dt()
+    ddo = _merkle_cdt(child_dt, [{'x': 1}, {'x': 2}, {'x': 3}])
+    root = ddo.proof['checksum']
+
+    service = ddo.to_dict()['services'][1]
+    service_proof = ddo.get_service_proof('sid_1')
+    assert verify_service_proof(service, service_proof, root)
+
+    service['descriptor']['workflow'][child_dt]['constraint'] = {'x': 4}
+    assert not verify_service_proof(service, service_proof, root)
+    assert ddo.get_service_proof('sid_9') is None
+
+
+def test_lazy_fulfills_only_read_the_workflow_entries():
+    child_dt = DTHelper.generate_new_dt()
+    ddo = _merkle_cdt(child_dt, [{'x': 1}, {'x': 2}])
+
+    lazy_ddo = LazyDDO(dictionary=ddo.to_dict())
+    assert lazy_ddo.get_fulfills(child_dt) == [('sid_0', {'x': 1}), ('sid_0', {'x': 2})]
+    assert lazy_ddo.get_fulfills(DTHelper.generate_new_dt()) is None
+    assert not lazy_ddo.services_loaded
+    assert ddo.get_fulfills(child_dt) == lazy_ddo.get_fulfills(child_dt)
+
+
+def test_lazy_fulfills_reject_a_tampered_service():
+    child_dt = DTHelper.generate_new_dt()
+    doc = _merkle_cdt(child_dt, [{'x': 1}, {'x': 2}]).to_dict()
+    doc['services'][1]['descriptor']['workflow'][child_dt]['constraint'] = {'x': 3}
+
+    # the service leaves are only checked once the services are used
+    lazy_ddo = LazyDDO(dictionary=doc)
+    with pytest.raises(AssertionError):
+        lazy_ddo.get_fulfills(child_dt)
@@ -0,0 +1,132 @@
+"""Registry cache tests, with a fake clock, fake event filters and a fake registry."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+from types import SimpleNamespace
+
+import pytest
+
+from datatoken.model import registry_cache
+from datatoken.model.registry_cache import RegistryCache
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeEventFilter:
+    """Replaces EventFilter, returning the logs queued for its event."""
+
+    logs = {}
+
+    def __init__(self, event_name, event, argument_filters, from_block, to_block):
+        self.event_name = event_name
+
+    def get_new_entries(self):
+        logs = FakeEventFilter.logs.pop(self.event_name, [])
+        if isinstance(logs, Exception):
+            raise logs
+        return logs
+
+
+class FakeRegistry:
+
+    def __init__(self):
+        self.blocks = {}
+        self.reads = 0
+
+    def read(self, key):
+        self.reads += 1
+        return (key, self.blocks[key])
+
+    def block(self, key):
+        return self.blocks[key]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(registry_cache, 'time', fake_clock)
+    monkeypatch.setattr(registry_cache, 'EventFilter', FakeEventFilter)
+    FakeEventFilter.logs = {}
+    return fake_clock
+
+
+def _watched_cache(registry, **kwargs):
+    cache = RegistryCache(registry.read, registry.block, max_age=10, poll_interval=0, **kwargs)
+    cache.watch('DataTokenMinted', None, '_dt')
+    cache.watch('CDTMinted', None, '_cdt')
+    return cache
+
+
+def test_entries_are_revalidated_by_block_while_watching(clock):
+    registry = FakeRegistry()
+    registry.blocks[b'a'] = 1
+    cache = _watched_cache(registry)
+
+    assert cache.get(b'a') == (b'a', 1)
+    clock.now += 5
+    assert cache.get(b'a') == (b'a', 1)
+    assert registry.reads == 1
+
+    # an update whose event was missed is still seen once the entry is too old
+    registry.blocks[b'a'] = 2
+    assert cache.get(b'a') == (b'a', 1)
+    clock.now += 10
+    assert cache.get(b'a') == (b'a', 2)
+    assert registry.reads == 2
+
+    clock.now += 20
+    assert cache.get(b'a') == (b'a', 2)
+    assert registry.reads == 2
+    assert cache.stats()['revalidations'] == 1
+
+
+def test_every_watched_event_drops_its_entry(clock):
+    registry = FakeRegistry()
+    registry.blocks.update({b'a': 1, b'b': 1, b'c': 1})
+    cache = _watched_cache(registry)
+    for key in (b'a', b'b', b'c'):
+        cache.get(key)
+
+    registry.blocks.update({b'a': 2, b'b': 2})
+    FakeEventFilter.logs = {
+        'DataTokenMinted': [SimpleNamespace(args={'_dt': b'a'})],
+        'CDTMinted': [SimpleNamespace(args={'_cdt': b'b'})]
+    }
+
+    assert cache.get(b'a') == (b'a', 2)
+    assert cache.get(b'b') == (b'b', 2)
+    assert cache.get(b'c') == (b'c', 1)
+    assert registry.reads == 5
+
+
+def test_lost_event_filter_drops_every_entry(clock):
+    registry = FakeRegistry()
+    registry.blocks[b'a'] = 1
+    cache = _watched_cache(registry)
+    cache.get(b'a')
+
+    FakeEventFilter.logs = {'CDTMinted': ValueError('filter not found')}
+    cache.get(b'a')
+
+    assert registry.reads == 2
+    assert cache.watching
+    assert len(cache._watches) == 1
+
+
+def test_entries_are_bounded(clock):
+    registry = FakeRegistry()
+    cache = _watched_cache(registry, max_items=2)
+    for key in (b'a', b'b', b'c'):
+        registry.blocks[key] = 1
+        cache.get(key)
+
+    assert cache.stats()['items'] == 2
+    cache.get(b'a')
+    assert registry.reads == 4
@@ -0,0 +1,77 @@
+"""Signature tests, the local signer recovery against the web3 one."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+import pytest
+from eth_account import Account
+from eth_account.messages import encode_defunct
+from web3 import Web3
+
+from datatoken.web3 import utils
+from datatoken.web3.utils import (
+    personal_ec_recover, recover_personal_signer, recover_personal_signers)
+from datatoken.web3.web3_provider import Web3Provider
+
+KEYS = ['0x' + f'{i:02x}' * 32 for i in range(1, 4)]
+
+
+@pytest.fixture(params=['coincurve', 'eth_keys'])
+def backend(request, monkeypatch):
+    if request.param == 'coincurve':
+        if utils.coincurve is None:
+            pytest.skip('coincurve is not installed')
+    else:
+        monkeypatch.setattr(utils, 'coincurve', None)
+
+    web3 = Web3Provider._web3
+    Web3Provider.set_web3(Web3())
+    utils._recover_personal_signer.cache_clear()
+    yield request.param
+    utils._recover_personal_signer.cache_clear()
+    Web3Provider.set_web3(web3)
+
+
+def _sign(key, message):
+    return Account.sign_message(encode_defunct(text=message), key).signature.hex()
+
+
+def test_local_recovery_matches_web3(backend):
+    for key in KEYS:
+        address = Account.from_key(key).address
+        for message in ['0xabc' + 'dt:ownership:01', '']:
+            signature = _sign(key, message)
+            assert recover_personal_signer(message, signature) == address
+            assert personal_ec_recover(message, signature) == address
+            assert recover_personal_signer(message, bytes.fromhex(signature[2:])) == address
+
+        # both prefix the text with its length in characters, not in bytes
+        signature = _sign(key, 'héllo')
+        assert recover_personal_signer('héllo', signature) == personal_ec_recover(
+            'héllo', signature)
+
+
+def test_v_in_recovery_id_form_is_accepted(backend):
+    signature = bytearray.fromhex(_sign(KEYS[0], 'msg')[2:])
+    signature[-1] -= 27
+
+    assert recover_personal_signer('msg', bytes(signature)) == Account.from_key(KEYS[0]).address
+
+
+def test_wrong_message_recovers_another_signer(backend):
+    signature = _sign(KEYS[0], 'msg')
+    assert recover_personal_signer('other msg', signature) != Account.from_key(KEYS[0]).address
+
+
+def test_invalid_signatures(backend):
+    signature = _sign(KEYS[0], 'msg')
+
+    with pytest.raises(AssertionError):
+        recover_personal_signer('msg', signature[:-2])
+
+    signers = recover_personal_signers([
+        ('msg', signature),
+        ('msg', signature[:-2]),
+        ('msg', '0x' + '00' * 65),
+        ('msg', 'not hex')
+    ])
+    assert signers == [Account.from_key(KEYS[0]).address, None, None, None]
@@ -0,0 +1,60 @@
+"""Verifier tests, with the child checks stubbed out so no chain is needed."""
+# Copyright 2021 The DataToken Authors
+# SPDX-License-Identifier: LGPL-2.1-only
+
+from types import SimpleNamespace
+
+import pytest
+
+from datatoken.service.verifier import VerificationContext, VerifierService
+
+
+def _verifier(verdicts):
+    verifier = VerifierService.__new__(VerifierService)
+
+    def verify_child(ddo, dt, integrity_check, context):
+        verdict = verdicts[dt]
+        if isinstance(verdict, Exception):
+            raise verdict
+        return verdict
+
+    verifier._verify_child = verify_child
+    return verifier
+
+
+def _cdt_ddo(child_dts):
+    return SimpleNamespace(dt='cdt', is_cdt=True, child_dts=child_dts)
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_verify_services_gives_the_verdict_of_every_child(max_workers):
+    verifier = _verifier({'a': True, 'b': True, 'c': False})
+    ddo = _cdt_ddo(['a', 'b', 'c'])
+
+    assert verifier.verify_services(ddo, ['a', 'b'], max_workers=max_workers)
+    assert not verifier.verify_services(ddo, max_workers=max_workers)
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_verify_services_raises_a_child_error(max_workers):
+    verifier = _verifier({'a': True, 'b': ConnectionError('ipfs is down')})
+
+    with pytest.raises(ConnectionError):
+        verifier.verify_services(_cdt_ddo(['a', 'b']), max_workers=max_workers)
+
+
+def test_context_runs_each_check_once_per_document():
+    context = VerificationContext()
+    ddo = SimpleNamespace(dt='dt', proof={'checksum': 'aa'})
+    calls = []
+
+    def check_fn():
+        calls.append(1)
+        return True
+
+    assert context.verdict('template', ddo, check_fn)
+    assert context.verdict('template', ddo, check_fn)
+    assert context.verdict('composed', ddo, check_fn)
+    assert context.verdict('template', SimpleNamespace(dt='dt', proof={'checksum': 'bb'}), check_fn)
+    assert len(calls) == 3
+    assert context.stats() == {'hits': 1, 'misses': 3, 'items': 3}